@@ -104,52 +104,43 @@ def main():
 		print("Resolviendo grupo {} ({}/{})...".format(sheet,sheets_name.index(sheet)+1,len(sheets_name)),end='')
 		sys.stdout.flush()
 		start = time.time()
-		# correr el modelo
-		status, variables = model.model_problem(
+		# correr el modelo (sin guardar los objetos de PuLP: alcanza con los arrays)
+		resultado = model.model_problem(
 			n_d, n_s, n_p,
 			route_branches_csv, cost_routes_csv, cash_in_branch_csv,
 			box_amounts_csv, business_days_csv, collection_csv,
 			last_days_collection=l_d_c, extra_box_percent=extra_box, daily_interest_rate=daily_rate,
-			debug=False, scip=False, n_thr=num_thr
+			debug=False, n_thr=num_thr, keep_problems=False
 		)
-		if not (all_solved and all([s=='Resuelto' for s in status])):
+		status = resultado.status if resultado.status is not None else ['Error de datos']
+		if not (all_solved and resultado.optimal):
 			all_solved = False
 		print("Terminado! Tiempo transcurrido: {:.2f} s. Estado: {}".format(time.time()-start, status))
-		# parsear la salida
+		# parsear la salida: t[s,d,p] > 0 si la sucursal s se visita el día d con la ruta p
 		salida[sheet] = {}
 		salida[sheet]['params'] = [n_d,n_s,nombres,status]
 		salida[sheet]['rutas'] = nombres_rutas
-		for var in variables:
-			var_id = var.name.split('_')[0]
-			if var_id == 't' and var.varValue > 0:
-				suc,dia,ruta = var.name.split('_')[1:]
-				if dia not in salida[sheet].keys():
-					salida[sheet][dia] = {}
-				if suc not in salida[sheet][dia].keys():
-					salida[sheet][dia][suc] = []
-				salida[sheet][dia][suc].append(ruta)
-
-				suc_key = sheet+'-'+suc
-				if suc_key not in totales.keys():
-					totales[suc_key]={}
-					totales[suc_key]['recaudacion'] = 0
-					totales[suc_key]['paradas'] = 0
-					totales[suc_key]['logístico'] = 0
-					totales[suc_key]['financiero'] = e_zero[int(suc)+28]
-				totales[suc_key]['recaudacion'] += var.varValue
-				totales[suc_key]['paradas']+=1
-				totales[suc_key]['logístico'] += costs[int(ruta)+2]
-			elif var_id == 'e':
-				suc,dia = var.name.split('_')[1:]
-				suc_key = sheet+'-'+suc
-				if suc_key not in totales.keys():
-					totales[suc_key]={}
-					totales[suc_key]['recaudacion'] = 0
-					totales[suc_key]['paradas'] = 0
-					totales[suc_key]['logístico'] = 0
-					totales[suc_key]['financiero'] = e_zero[int(suc)+28]
-				if dia != n_d-1:
-					totales[suc_key]['financiero'] += var.varValue
+		t = np.nan_to_num(resultado.t) if resultado.t is not None else np.zeros((n_s, n_d, n_p))
+		e = np.nan_to_num(resultado.e) if resultado.e is not None else np.zeros((n_s, n_d))
+		for j in range(n_s):
+			suc_key = sheet+'-'+str(j)
+			totales[suc_key]={}
+			totales[suc_key]['recaudacion'] = 0
+			totales[suc_key]['paradas'] = 0
+			totales[suc_key]['logístico'] = 0
+			totales[suc_key]['financiero'] = e_zero[j+28] + e[j, :n_d-1].sum()
+		for s, d, p in zip(*np.nonzero(t > 0)):
+			suc, dia, ruta = str(s), str(d), str(p)
+			if dia not in salida[sheet].keys():
+				salida[sheet][dia] = {}
+			if suc not in salida[sheet][dia].keys():
+				salida[sheet][dia][suc] = []
+			salida[sheet][dia][suc].append(ruta)
+
+			suc_key = sheet+'-'+suc
+			totales[suc_key]['recaudacion'] += t[s, d, p]
+			totales[suc_key]['paradas']+=1
+			totales[suc_key]['logístico'] += costs[int(ruta)+2]
 
 	if not all_solved:
 		print("Algunos problemas no fueron resueltos, revisar el log para más detalles")
@@ -214,7 +205,7 @@ def main():
 						rutas_str = [salida[sheet]['rutas'][int(ruta)+2] for ruta in salida[sheet][dia][suc]]
 						rutas_str = map(str,rutas_str)
 						hoja[2+i,2+j] = ', '.join(rutas_str)
-					if not (status_list == ["Resuelto"] or (len(status_list) > 1 and status_list[j] == "Resuelto")):
+					if not ((len(status_list) == 1 and status_list[0].startswith("Resuelto")) or (len(status_list) > 1 and status_list[j].startswith("Resuelto"))):
 						hoja[2+i,2+j] = 'N/A'
 					
 					
@@ -225,7 +216,7 @@ def main():
 		hoja[n_d+8,0] = 'Costo Financiero'
 		hoja[n_d+10,0] = 'Costo Total'
 		for i in range(n_s):
-			if not (status_list == ["Resuelto"] or (len(status_list) > 1 and status_list[i] == "Resuelto")):
+			if not ((len(status_list) == 1 and status_list[0].startswith("Resuelto")) or (len(status_list) > 1 and status_list[i].startswith("Resuelto"))):
 				hoja[n_d+3,2+i] = 'N/A'
 				hoja[n_d+4,2+i] = 'N/A'
 				hoja[n_d+5,2+i] = 'N/A'
@@ -248,8 +239,8 @@ def main():
 
 if __name__ == '__main__':
 	os.chdir(os.path.realpath(sys.path[0]))
-	from helpers import generate_csvs
-	sys.path.append('../solverpulp')
-	import model
+	sys.path.insert(0, '../src')
+	from cash_transportation.helpers import generate_csvs
+	from cash_transportation.solvers.solverpulp import model
 	main()
 
@@ -0,0 +1,192 @@
+#!/usr/bin/env python
+"""
+Benchmark of the dynamic-programming engine against MIP solvers on the MPS corpus.
+
+The corpus instances (cash_transportation/problems) are not separable: they mix
+single-branch routes with multi-branch ones. For each file the instance data is read
+back from the MPS and restricted to its separable part (for every branch, its
+cheapest single-branch route), which is then solved with model_problem_arrays using
+the DP (dp=True) and each requested MIP solver (dp=False).
+"""
+import argparse
+import csv
+import glob
+import os
+import re
+import statistics
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pulp
+
+_repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_src_path = os.path.join(_repo_root, "src")
+if _src_path not in sys.path:
+    sys.path.insert(0, _src_path)
+from bench_mps_solvers import load_problem_from_mps
+from cash_transportation.solvers.solverpulp.dp import dp_solution
+from cash_transportation.solvers.solverpulp.model import make_solver, model_problem_arrays
+
+_NAME = re.compile(r"^([xet])_(\d+)_(\d+)(?:_(\d+))?$")
+
+
+def instance_from_mps(prob: pulp.LpProblem) -> Dict[str, Any]:
+    """
+    Recovers the model_problem_arrays data from a problem written by model.py
+    (x_d_p, e_s_d and t_s_d_p columns). Works both with the box and business-day
+    limits written as rows (older MPS files) and as column bounds. MPS files do not
+    keep the objective constant (rate * sum(e0)), so objectives here include it.
+    """
+    cols = {"x": {}, "e": {}, "t": {}}
+    for var in prob.variables():
+        match = _NAME.match(var.name)
+        if match:
+            kind, a, b, c = match.groups()
+            key = (int(a), int(b)) if c is None else (int(a), int(b), int(c))
+            cols[kind][key] = var
+    n_d = 1 + max(d for d, _ in cols["x"])
+    n_p = 1 + max(p for _, p in cols["x"])
+    n_s = 1 + max(s for s, _ in cols["e"])
+    objective = prob.objective
+
+    cost = np.array([objective.get(cols["x"][(0, p)], 0.0) for p in range(n_p)])
+    rate = float(objective.get(cols["e"][(0, 0)], 0.0))
+    box = np.array([np.inf if cols["e"][(s, 0)].upBound is None else cols["e"][(s, 0)].upBound for s in range(n_s)])
+    h = np.array([[1.0 if cols["x"][(d, p)].upBound is None else cols["x"][(d, p)].upBound for d in range(n_d)] for p in range(n_p)])
+    route_branches = np.zeros((n_p, n_s))
+    balance = np.zeros((n_s, n_d))
+    e0 = np.zeros(n_s)
+
+    names = {var.name: (kind, key) for kind in cols for key, var in cols[kind].items()}
+    for constraint in prob.constraints.values():
+        rhs = -constraint.constant
+        items = [(names[var.name], coef) for var, coef in constraint.items() if var.name in names]
+        kinds = {kind for (kind, _), _ in items}
+        if len(items) == 1 and constraint.sense == pulp.LpConstraintLE:
+            (kind, key), _ = items[0]
+            if kind == "e":
+                box[key[0]] = min(box[key[0]], rhs)
+            elif kind == "x":
+                h[key[1], key[0]] = min(h[key[1], key[0]], rhs)
+        elif constraint.sense == pulp.LpConstraintEQ and "e" in kinds:
+            s, d = max(key for (kind, key), coef in items if kind == "e" and coef > 0)
+            balance[s, d] = rhs
+        elif constraint.sense == pulp.LpConstraintLE and "x" in kinds:
+            p = next(key[1] for (kind, key), _ in items if kind == "x")
+            for (kind, key), coef in items:
+                if kind == "t" and coef > 0:
+                    route_branches[p, key[0]] = coef
+        elif constraint.sense == pulp.LpConstraintLE and kinds == {"t"} and all(key[1] == 0 for _, key in (i[0] for i in items)):
+            e0[items[0][0][1][0]] = rhs
+
+    collection = balance.copy()
+    collection[:, 0] -= e0
+    return dict(route_branches=route_branches, cost_routes=cost, cash_in_branch=e0, box_amounts=box,
+                business_days=h, collection=collection, daily_interest_rate=rate)
+
+
+def separable_part(data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """For every branch its cheapest single-branch route, or None if some branch has none."""
+    m = data["route_branches"]
+    single = np.count_nonzero(m, axis=1) == 1
+    routes = []
+    for s in range(m.shape[1]):
+        candidates = np.nonzero(single & (m[:, s] == 1))[0]
+        if candidates.size == 0:
+            return None
+        routes.append(int(candidates[np.argmin(data["cost_routes"][candidates])]))
+    return dict(data, route_branches=np.eye(len(routes)), cost_routes=data["cost_routes"][routes],
+                business_days=data["business_days"][routes])
+
+
+def total_objective(status, problems) -> Optional[float]:
+    if status is None or any(not s.startswith("Resuelto") for s in status):
+        return None
+    return float(sum(p.objective.value() for p in problems))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the DP engine vs MIP solvers on the separable part of the MPS corpus")
+    parser.add_argument("problems_dir", nargs="?", default=os.path.join(_repo_root, "cash_transportation", "problems"), help="Directory containing .mps files")
+    parser.add_argument("--pattern", default="*.mps", help="Glob pattern for files (default: *.mps)")
+    parser.add_argument("--solvers", default="cbc,HiGHS", help="Comma separated MIP solvers to compare against (default: cbc,HiGHS)")
+    parser.add_argument("--threads", type=int, default=1, help="Threads for the MIP solvers")
+    parser.add_argument("--repeats", type=int, default=5, help="Repetitions of the DP timing (the minimum is reported)")
+    parser.add_argument("--csv", default=None, help="Optional path to write CSV results")
+    args = parser.parse_args()
+
+    files = sorted(glob.glob(os.path.join(os.path.abspath(args.problems_dir), args.pattern)))
+    if not files:
+        print(f"No MPS files found in {args.problems_dir} matching {args.pattern}")
+        return 2
+    solvers = []
+    for name in [s for s in args.solvers.split(",") if s]:
+        if make_solver(name).available():
+            solvers.append(name)
+        else:
+            print(f"[SKIP] solver {name} not available")
+
+    rows: List[Dict[str, Any]] = []
+    for mps_path in files:
+        rel = os.path.basename(mps_path)
+        try:
+            data = separable_part(instance_from_mps(load_problem_from_mps(mps_path, "min")))
+        except Exception as e:
+            print(f"[SKIP] {rel}: failed to read instance: {e}")
+            continue
+        if data is None:
+            print(f"[SKIP] {rel}: some branch has no single-branch route")
+            continue
+        row: Dict[str, Any] = {"file": rel}
+
+        # DP core (no PuLP) and full model_problem_arrays path
+        core = []
+        for _ in range(args.repeats):
+            start = time.perf_counter()
+            dp_solution(**data)
+            core.append(time.perf_counter() - start)
+        row["dp_core_s"] = min(core)
+        start = time.perf_counter()
+        status, _, problems = model_problem_arrays(**data, dp=True)
+        row["dp_s"] = time.perf_counter() - start
+        row["dp_obj"] = total_objective(status, problems)
+
+        for name in solvers:
+            start = time.perf_counter()
+            status, _, problems = model_problem_arrays(**data, solver=name, n_thr=args.threads, dp=False)
+            row[f"{name}_s"] = time.perf_counter() - start
+            row[f"{name}_obj"] = total_objective(status, problems)
+            if row["dp_obj"] is not None and row[f"{name}_obj"] is not None:
+                row[f"{name}_diff"] = row[f"{name}_obj"] - row["dp_obj"]
+        rows.append(row)
+        print(" ".join(f"{k}={v:.6g}" if isinstance(v, float) else f"{k}={v}" for k, v in row.items()))
+
+    if rows:
+        print(f"\nInstances: {len(rows)}")
+        print(f"DP core median: {statistics.median(r['dp_core_s'] for r in rows) * 1e3:.3f} ms, "
+              f"DP via model_problem_arrays median: {statistics.median(r['dp_s'] for r in rows) * 1e3:.1f} ms")
+        for name in solvers:
+            times = [r[f"{name}_s"] for r in rows]
+            diffs = [r[f"{name}_diff"] for r in rows if f"{name}_diff" in r]
+            line = f"{name}: median {statistics.median(times):.3f} s, speedup x{statistics.median(times) / statistics.median(r['dp_s'] for r in rows):.1f}"
+            if diffs:
+                line += f", max |obj - dp| {max(abs(d) for d in diffs):.3g}, MIP worse than DP in {sum(d > 1e-9 for d in diffs)} instances"
+            mismatched = sum((r["dp_obj"] is None) != (r[f"{name}_obj"] is None) for r in rows)
+            if mismatched:
+                line += f", feasibility mismatch in {mismatched} instances"
+            print(line)
+
+    if args.csv and rows:
+        fieldnames = sorted({k for r in rows for k in r}, key=lambda k: (k != "file", k))
+        with open(args.csv, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=fieldnames)
+            writer.writeheader()
+            writer.writerows(rows)
+        print(f"Wrote CSV: {args.csv}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+"""
+Benchmark of the schedule heuristic against MIP solvers on the MPS corpus.
+
+For each file the instance data is read back from the MPS (see bench_dp.py) and solved
+with the heuristic (solver='heuristic', greedy construction plus iterated local search
+over batches of schedules, see solverpulp/heuristic.py) and with each requested MIP
+solver. The heuristic gives no bound, so its quality is reported as the gap to the MIP
+optimum: (heuristic - MIP) / MIP. With --warm-start each MIP solver that accepts an
+initial solution is also run from the heuristic schedule (warm_start='heuristic' in
+the model template; the reported time includes the heuristic).
+"""
+import argparse
+import csv
+import glob
+import os
+import statistics
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+_repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_src_path = os.path.join(_repo_root, "src")
+if _src_path not in sys.path:
+    sys.path.insert(0, _src_path)
+from bench_dp import instance_from_mps
+from bench_mps_solvers import load_problem_from_mps
+from cash_transportation.solvers.solverpulp import template
+from cash_transportation.solvers.solverpulp.heuristic import heuristic_solution
+from cash_transportation.solvers.solverpulp.highs import is_inproc
+from cash_transportation.solvers.solverpulp.model import HEURISTIC_STATUS, make_solver, model_problem_arrays
+
+# solvers that take an initial solution (see make_solver)
+_WARM_START = ("cbc", "gurobi", "cuopt", "HiGHS")
+
+
+def objective(result, statuses=("Resuelto (Óptimo)",)) -> Optional[float]:
+    if not result.status or any(s not in statuses for s in result.status):
+        return None
+    return float(result.objective)
+
+
+def solve_warm(data: Dict[str, Any], solver: str, threads: int, time_limit: Optional[float]) -> Any:
+    """MIP started from the heuristic schedule, through a model template."""
+    plantilla = template.get_template(data["route_branches"], data["business_days"])
+    plantilla.update(collections=data["collection"], e0=data["cash_in_branch"], box=data["box_amounts"],
+                     rate=data["daily_interest_rate"], cost_routes=data["cost_routes"])
+    return plantilla.solve(solver=solver, n_thr=threads, warm_start="heuristic", dp=False, cache=False, time_limit=time_limit)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the schedule heuristic vs MIP solvers on the MPS corpus")
+    parser.add_argument("problems_dir", nargs="?", default=os.path.join(_repo_root, "cash_transportation", "problems"), help="Directory containing .mps files")
+    parser.add_argument("--pattern", default="*.mps", help="Glob pattern for files (default: *.mps)")
+    parser.add_argument("--solvers", default="cbc,highs-inproc", help="Comma separated MIP solvers to compare against (default: cbc,highs-inproc)")
+    parser.add_argument("--threads", type=int, default=1, help="Threads for the MIP solvers")
+    parser.add_argument("--time-limit", type=float, default=0, help="Seconds per MIP solve (0 = no limit); instances stopped by the limit get no gap")
+    parser.add_argument("--starts", type=int, default=8, help="Schedules built and improved in parallel by the heuristic")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the heuristic")
+    parser.add_argument("--warm-start", action="store_true", help="Also run each MIP solver that accepts it from the heuristic schedule")
+    parser.add_argument("--csv", default=None, help="Optional path to write CSV results")
+    args = parser.parse_args()
+    time_limit = args.time_limit or None
+
+    files = sorted(glob.glob(os.path.join(os.path.abspath(args.problems_dir), args.pattern)))
+    if not files:
+        print(f"No MPS files found in {args.problems_dir} matching {args.pattern}")
+        return 2
+    solvers = []
+    for name in [s for s in args.solvers.split(",") if s]:
+        if is_inproc(name) or make_solver(name).available():
+            solvers.append(name)
+        else:
+            print(f"[SKIP] solver {name} not available")
+
+    rows: List[Dict[str, Any]] = []
+    for mps_path in files:
+        rel = os.path.basename(mps_path)
+        try:
+            data = instance_from_mps(load_problem_from_mps(mps_path, "min"))
+        except Exception as e:
+            print(f"[SKIP] {rel}: failed to read instance: {e}")
+            continue
+        row: Dict[str, Any] = {"file": rel}
+
+        # heuristic core (no PuLP) and full model_problem_arrays path
+        start = time.perf_counter()
+        heuristic_solution(**data, n_starts=args.starts, seed=args.seed)
+        row["heur_core_s"] = time.perf_counter() - start
+        start = time.perf_counter()
+        result = model_problem_arrays(**data, solver="heuristic", dp=False, cache=False)
+        row["heur_s"] = time.perf_counter() - start
+        row["heur_obj"] = objective(result, (HEURISTIC_STATUS,))
+
+        for name in solvers:
+            start = time.perf_counter()
+            result = model_problem_arrays(**data, solver=name, n_thr=args.threads, dp=False, cache=False, time_limit=time_limit)
+            row[f"{name}_s"] = time.perf_counter() - start
+            row[f"{name}_obj"] = objective(result)
+            if row["heur_obj"] is not None and row[f"{name}_obj"] is not None:
+                row[f"{name}_gap"] = (row["heur_obj"] - row[f"{name}_obj"]) / abs(row[f"{name}_obj"])
+            if args.warm_start and name in _WARM_START:
+                start = time.perf_counter()
+                result = solve_warm(data, name, args.threads, time_limit)
+                row[f"{name}_ws_s"] = time.perf_counter() - start
+                row[f"{name}_ws_obj"] = objective(result)
+        rows.append(row)
+        print(" ".join(f"{k}={v:.6g}" if isinstance(v, float) else f"{k}={v}" for k, v in row.items()), flush=True)
+
+    if rows:
+        heur_times = [r["heur_s"] for r in rows]
+        print(f"\nInstances: {len(rows)}, heuristic feasible in {sum(r['heur_obj'] is not None for r in rows)}")
+        print(f"Heuristic core median: {statistics.median(r['heur_core_s'] for r in rows) * 1e3:.1f} ms, "
+              f"via model_problem_arrays median: {statistics.median(heur_times) * 1e3:.1f} ms")
+        for name in solvers:
+            times = [r[f"{name}_s"] for r in rows]
+            line = f"{name}: median {statistics.median(times):.3f} s, speedup x{statistics.median(times) / statistics.median(heur_times):.1f}"
+            gaps = np.array([r[f"{name}_gap"] for r in rows if f"{name}_gap" in r])
+            if gaps.size:
+                line += (f", gap median {np.median(gaps):.2%} mean {gaps.mean():.2%} max {gaps.max():.2%}, "
+                         f"optimal in {int((gaps <= 1e-6).sum())}/{gaps.size}")
+            unsolved = sum(r[f"{name}_obj"] is None for r in rows)
+            if unsolved:
+                line += f", no optimum in {unsolved}"
+            warm = [r[f"{name}_ws_s"] for r in rows if f"{name}_ws_s" in r]
+            if warm:
+                line += f", from the heuristic median {statistics.median(warm):.3f} s"
+            print(line)
+
+    if args.csv and rows:
+        fieldnames = sorted({k for r in rows for k in r}, key=lambda k: (k != "file", k))
+        with open(args.csv, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=fieldnames)
+            writer.writeheader()
+            writer.writerows(rows)
+        print(f"Wrote CSV: {args.csv}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -2,25 +2,22 @@
 import argparse
 import glob
 import os
+import sys
 import time
 from typing import Optional, Tuple, Any, Dict, List
 
 import pulp
 
+_repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_src_path = os.path.join(_repo_root, "src")
+if _src_path not in sys.path:
+    sys.path.insert(0, _src_path)
+from cash_transportation.solvers.solverpulp.mps import read_mps
+
 
 def load_problem_from_mps(mps_path: str, sense: str) -> pulp.LpProblem:
-    sense = sense.lower()
-    lp_sense = pulp.LpMinimize if sense in ("min", "minimize", "minimise") else pulp.LpMaximize
-    loaded = pulp.LpProblem.fromMPS(mps_path, sense=lp_sense)
-    # fromMPS may return (name, problem) or (problem, aux) depending on PuLP version; handle both
-    if isinstance(loaded, tuple):
-        # Find first element that is an LpProblem
-        for item in loaded:
-            if isinstance(item, pulp.LpProblem):
-                return item
-        # Fallback to first element
-        return loaded[0]
-    return loaded
+    # read_mps parses the file straight into arrays; the LpProblem is built from them
+    return read_mps(mps_path, sense).to_pulp()
 
 
 def make_solver(name: str, threads: Optional[int], time_limit: Optional[float], msg: bool):
@@ -84,20 +81,16 @@ def main() -> int:
     for mps_path in files:
         rel = os.path.relpath(mps_path, root)
         try:
-            prob_cbc = load_problem_from_mps(mps_path, args.sense)
+            model = read_mps(mps_path, args.sense)
         except Exception as e:
             print(f"[SKIP] {rel}: failed to load MPS: {e}")
             continue
 
         # Solve with CBC
-        status_cbc, obj_cbc, t_cbc = solve_with_solver(prob_cbc, "highs", args.threads, args.cbc_time_limit, args.msg)
+        status_cbc, obj_cbc, t_cbc = solve_with_solver(model.to_pulp(), "highs", args.threads, args.cbc_time_limit, args.msg)
 
-        # Reload fresh problem for CUOPT to avoid any solver-side persistent state
-        try:
-            prob_cu = load_problem_from_mps(mps_path, args.sense)
-        except Exception as e:
-            print(f"[SKIP] {rel}: failed to reload MPS for cuOpt: {e}")
-            continue
+        # Fresh problem for CUOPT (built from the parsed arrays) to avoid any solver-side persistent state
+        prob_cu = model.to_pulp()
 
         status_cu, obj_cu, t_cu = solve_with_solver(prob_cu, "cuopt", None, args.cuopt_time_limit, args.msg)
 
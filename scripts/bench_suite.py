@@ -0,0 +1,359 @@
+#!/usr/bin/env python
+"""
+Regression benchmark suite over the MPS corpus (cash_transportation/problems).
+
+    python scripts/bench_suite.py refs                      # reference optima (once)
+    python scripts/bench_suite.py run --solvers highs-inproc,cbc --label before
+    python scripts/bench_suite.py compare --base before --head after
+
+run: every instance is read once (not timed) with the array MPS reader
+(solverpulp/mps.py), then for each solver it is solved --warmup times untimed and
+--repeats times timed. The median and IQR of the solve times
+and the objective are appended as one JSON line per (instance, solver) to the history
+file, with the commit (git rev-parse --short HEAD, '+dirty' if there are uncommitted
+changes), the label, the solver and its version. The objective is checked against the
+stored reference optimum (|obj - ref| <= rtol * |ref| + ATOL; corpus objectives are
+small, around 1e-3, so the tolerance is relative).
+
+Times are wall-clock seconds of the solve call only: for PuLP command-line solvers that
+includes writing the MPS and reading the solution back (the PuLP problem is built once
+per instance and solver, only for those solvers); highs-inproc gets the parsed arrays
+directly and solves in the process.
+
+run --memory: after the timed solves, one more untimed pass per instance and solver
+reads the MPS, builds the PuLP problem (PuLP solvers only) and solves under cash_transportation.instrument in
+memory mode. The Python allocation peak (tracemalloc) and the process peak RSS of each
+phase go into the history record ('memory'), with the top allocation sites when
+--memory-sites > 0, and --memory-report writes a CSV with one row per instance size
+(rows x cols x nnz) and solver holding the largest peaks of each phase.
+
+compare: --base and --head select history records by commit, label or solver version
+(the latest record per instance and solver wins). A (solver, instance) pair is a
+regression when the head median is more than --threshold slower (relative) and more than
+--min-seconds slower (absolute, to ignore noise on fast instances). Exits with 1 when
+there are regressions or head objectives that do not match the references.
+"""
+import argparse
+import csv
+import datetime
+import glob
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pulp
+
+_repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_src_path = os.path.join(_repo_root, "src")
+if _src_path not in sys.path:
+    sys.path.insert(0, _src_path)
+from cash_transportation import instrument
+from cash_transportation.solvers.solverpulp.highs import is_inproc, solve_arrays
+from cash_transportation.solvers.solverpulp.model import make_solver
+from cash_transportation.solvers.solverpulp.mps import MpsModel, read_mps
+
+DEFAULT_PROBLEMS = os.path.join(_repo_root, "cash_transportation", "problems")
+DEFAULT_HISTORY = os.path.join(_repo_root, "artifacts", "bench", "history.jsonl")
+DEFAULT_REFERENCES = os.path.join(_repo_root, "artifacts", "bench", "references.json")
+DEFAULT_MEMORY_REPORT = os.path.join(_repo_root, "artifacts", "bench", "memory_report.csv")
+ATOL = 1e-9
+
+
+def solver_version(name: str) -> str:
+    if is_inproc(name):
+        import scipy
+        return f"scipy {scipy.__version__}"
+    return f"pulp {pulp.__version__}"
+
+
+def git_commit() -> Optional[str]:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=_repo_root,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=_repo_root,
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return commit + ("+dirty" if dirty else "")
+
+
+def solve_once(prob: Optional[pulp.LpProblem], arrays: Optional[MpsModel], name: str, threads: int,
+               time_limit: Optional[float], gap_rel: Optional[float]):
+    """
+    (seconds, objective) of one solve, in process on arrays when given, else with PuLP on
+    prob; objective is None unless solved to optimality.
+    """
+    if arrays is not None:
+        start = time.perf_counter()
+        lp_status, sol_status, _, objective, _ = solve_arrays(arrays, time_limit=time_limit, gap_rel=gap_rel)
+        elapsed = time.perf_counter() - start
+        optimal = lp_status == pulp.LpStatusOptimal and sol_status == pulp.LpSolutionOptimal
+        return elapsed, objective if optimal else None
+    solver = make_solver(name, False, threads, time_limit=time_limit, gap_rel=gap_rel)
+    start = time.perf_counter()
+    prob.solve(solver)
+    elapsed = time.perf_counter() - start
+    optimal = prob.status == pulp.LpStatusOptimal and prob.sol_status != pulp.LpSolutionIntegerFeasible
+    return elapsed, float(pulp.value(prob.objective)) if optimal else None
+
+
+def problem_size(model: MpsModel) -> Dict[str, int]:
+    rows, cols = model.shape
+    return {"rows": rows, "cols": cols, "nnz": int(model.A.nnz)}
+
+
+MEMORY_PHASES = ("read_mps", "to_pulp", "solve")
+
+
+def profile_memory(mps_path: str, name: str, threads: int, time_limit: Optional[float], gap_rel: Optional[float],
+                   sites: int) -> Dict[str, Any]:
+    """Peaks per phase of one untimed read + PuLP build + solve (instrument snapshot fields)."""
+    instrument.enable(memoria=True, sitios=sites)
+    try:
+        with instrument.medir() as measured:
+            with instrument.timer("read_mps"):
+                model = read_mps(mps_path, "min")
+            prob = None
+            if not is_inproc(name):
+                with instrument.timer("to_pulp"):
+                    prob = model.to_pulp()
+            with instrument.timer("solve"):
+                solve_once(prob, model if prob is None else None, name, threads, time_limit, gap_rel)
+    finally:
+        instrument.disable()
+    memory = {"peak": measured.datos["picos"], "rss": measured.datos["rss"]}
+    if sites:
+        memory["sites"] = measured.datos.get("sitios", {})
+    return memory
+
+
+def write_memory_report(records: List[Dict[str, Any]], path: str) -> None:
+    # one row per (instance size, solver): largest peak of each phase over its instances
+    groups: Dict[tuple, List[Dict[str, Any]]] = {}
+    for record in records:
+        key = (record["rows"], record["cols"], record["nnz"], record["solver"])
+        groups.setdefault(key, []).append(record)
+    fieldnames = ["rows", "cols", "nnz", "solver", "instances"]
+    fieldnames += [f"{phase}_{kind}_mb" for phase in MEMORY_PHASES for kind in ("peak", "rss")]
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        for (rows, cols, nnz, solver), group in sorted(groups.items()):
+            row = {"rows": rows, "cols": cols, "nnz": nnz, "solver": solver, "instances": len(group)}
+            for phase in MEMORY_PHASES:
+                for kind in ("peak", "rss"):
+                    values = [r["memory"][kind][phase] for r in group if phase in r["memory"][kind]]
+                    row[f"{phase}_{kind}_mb"] = f"{max(values) / 2**20:.1f}" if values else ""
+            writer.writerow(row)
+            print(" ".join(f"{k}={v}" for k, v in row.items() if v != ""))
+    print(f"Wrote memory report: {path}")
+
+
+def iqr(times: List[float]) -> float:
+    if len(times) < 2:
+        return 0.0
+    q1, _, q3 = statistics.quantiles(times, n=4, method="inclusive")
+    return q3 - q1
+
+
+def matches(objective: Optional[float], reference: Optional[float], rtol: float) -> Optional[bool]:
+    if reference is None:
+        return None
+    return objective is not None and abs(objective - reference) <= rtol * abs(reference) + ATOL
+
+
+def corpus(args) -> List[str]:
+    files = sorted(glob.glob(os.path.join(os.path.abspath(args.problems_dir), args.pattern)))
+    if not files:
+        print(f"No MPS files found in {args.problems_dir} matching {args.pattern}")
+    return files
+
+
+def load_references(path: str) -> Dict[str, float]:
+    if not os.path.isfile(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f).get("objectives", {})
+
+
+def cmd_refs(args) -> int:
+    files = corpus(args)
+    if not files:
+        return 2
+    objectives = load_references(args.references) if args.update else {}
+    for mps_path in files:
+        rel = os.path.basename(mps_path)
+        elapsed, objective = solve_once(None, read_mps(mps_path, "min"), "highs-inproc", 1, None, args.gap)
+        if objective is None:
+            print(f"[SKIP] {rel}: not solved to optimality")
+            continue
+        objectives[rel] = objective
+        print(f"{rel} objective={objective:.10g} t={elapsed:.2f}s")
+    os.makedirs(os.path.dirname(os.path.abspath(args.references)), exist_ok=True)
+    with open(args.references, "w", encoding="utf-8") as f:
+        json.dump({"solver": "highs-inproc", "solver_version": solver_version("highs-inproc"), "gap_rel": args.gap,
+                   "objectives": dict(sorted(objectives.items()))}, f, indent=2)
+        f.write("\n")
+    print(f"Wrote {len(objectives)} references: {args.references}")
+    return 0
+
+
+def cmd_run(args) -> int:
+    files = corpus(args)
+    if not files:
+        return 2
+    solvers = []
+    for name in [s for s in args.solvers.split(",") if s]:
+        if is_inproc(name) or make_solver(name).available():
+            solvers.append(name)
+        else:
+            print(f"[SKIP] solver {name} not available")
+    references = load_references(args.references)
+    base = {"timestamp": datetime.datetime.now().isoformat(timespec="seconds"), "commit": git_commit(),
+            "label": args.label, "python": platform.python_version(), "warmup": args.warmup,
+            "repeats": args.repeats, "time_limit": args.time_limit, "gap_rel": args.gap}
+    os.makedirs(os.path.dirname(os.path.abspath(args.history)), exist_ok=True)
+    failures = 0
+    profiled: List[Dict[str, Any]] = []
+    with open(args.history, "a", encoding="utf-8") as history:
+        for mps_path in files:
+            rel = os.path.basename(mps_path)
+            try:
+                model = read_mps(mps_path, "min")
+            except Exception as e:
+                print(f"[SKIP] {rel}: failed to read: {e}")
+                continue
+            size = problem_size(model)
+            for name in solvers:
+                arrays = model if is_inproc(name) else None
+                prob = None if arrays is not None else model.to_pulp()
+                for _ in range(args.warmup):
+                    solve_once(prob, arrays, name, args.threads, args.time_limit, args.gap)
+                times, objective = [], None
+                for _ in range(args.repeats):
+                    elapsed, objective = solve_once(prob, arrays, name, args.threads, args.time_limit, args.gap)
+                    times.append(elapsed)
+                reference = references.get(rel)
+                ok = matches(objective, reference, args.rtol)
+                failures += ok is False
+                record = dict(base, solver=name, solver_version=solver_version(name), instance=rel, **size,
+                              times=times, median=statistics.median(times), iqr=iqr(times),
+                              objective=objective, reference=reference, ok=ok)
+                if args.memory:
+                    record["memory"] = profile_memory(mps_path, name, args.threads, args.time_limit, args.gap,
+                                                      args.memory_sites)
+                    profiled.append(record)
+                history.write(json.dumps(record) + "\n")
+                history.flush()
+                flag = {True: "ok", False: "OBJECTIVE MISMATCH", None: "no reference"}[ok]
+                print(f"{rel} {name}: median={record['median']:.3f}s iqr={record['iqr']:.3f}s objective={objective} {flag}")
+    print(f"Appended to {args.history}")
+    if profiled and args.memory_report:
+        write_memory_report(profiled, args.memory_report)
+    if failures:
+        print(f"{failures} objective mismatches")
+        return 1
+    return 0
+
+
+def select(records: List[Dict[str, Any]], key: str, solver: Optional[str]) -> Dict[tuple, Dict[str, Any]]:
+    # latest record per (solver, instance) whose commit, label or solver version is key
+    selected = {}
+    for record in records:
+        if key not in (record.get("commit"), record.get("label"), record.get("solver_version")):
+            continue
+        if solver and record["solver"] != solver:
+            continue
+        selected[(record["solver"], record["instance"])] = record
+    return selected
+
+
+def cmd_compare(args) -> int:
+    if not os.path.isfile(args.history):
+        print(f"No history file: {args.history}")
+        return 2
+    with open(args.history, "r", encoding="utf-8") as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    base = select(records, args.base, args.solver)
+    head = select(records, args.head, args.solver)
+    common = sorted(set(base) & set(head))
+    if not common:
+        print(f"No (solver, instance) pairs recorded for both {args.base} and {args.head}")
+        return 2
+    regressions, mismatches = [], []
+    ratios: Dict[str, List[float]] = {}
+    for solver, instance in common:
+        b, h = base[(solver, instance)], head[(solver, instance)]
+        ratio = h["median"] / b["median"] if b["median"] > 0 else float("inf")
+        ratios.setdefault(solver, []).append(ratio)
+        if ratio > 1 + args.threshold and h["median"] - b["median"] > args.min_seconds:
+            regressions.append((solver, instance, b, h, ratio))
+        if h.get("ok") is False:
+            mismatches.append((solver, instance, h))
+    for solver, values in ratios.items():
+        geomean = float(np.exp(np.mean(np.log(values))))
+        print(f"{solver}: {len(values)} instances, head/base median time geomean x{geomean:.3f}")
+    for solver, instance, b, h, ratio in regressions:
+        print(f"[REGRESSION] {solver} {instance}: {b['median']:.3f}s (iqr {b['iqr']:.3f}) -> "
+              f"{h['median']:.3f}s (iqr {h['iqr']:.3f}), x{ratio:.2f}")
+    for solver, instance, h in mismatches:
+        print(f"[OBJECTIVE] {solver} {instance}: {h['objective']} vs reference {h['reference']}")
+    if regressions or mismatches:
+        print(f"{len(regressions)} regressions above {args.threshold:.0%}, {len(mismatches)} objective mismatches")
+        return 1
+    print(f"No regressions above {args.threshold:.0%}")
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Regression benchmark suite over the MPS corpus")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    def corpus_args(p):
+        p.add_argument("problems_dir", nargs="?", default=DEFAULT_PROBLEMS, help="Directory containing .mps files")
+        p.add_argument("--pattern", default="*.mps", help="Glob pattern for files (default: *.mps)")
+        p.add_argument("--references", default=DEFAULT_REFERENCES, help="Reference optima JSON")
+        p.add_argument("--gap", type=float, default=None, help="Relative MIP gap passed to the solvers (default: the solver's)")
+
+    p = sub.add_parser("run", help="Time the corpus and append the results to the history file")
+    corpus_args(p)
+    p.add_argument("--solvers", default="highs-inproc", help="Comma separated solvers (default: highs-inproc)")
+    p.add_argument("--threads", type=int, default=1, help="Threads for the PuLP solvers")
+    p.add_argument("--warmup", type=int, default=1, help="Untimed solves per instance and solver")
+    p.add_argument("--repeats", type=int, default=5, help="Timed solves per instance and solver")
+    p.add_argument("--time-limit", type=float, default=None, help="Time limit (s) per solve")
+    p.add_argument("--rtol", type=float, default=1e-3, help="Relative tolerance of the objective check")
+    p.add_argument("--label", default=None, help="Label stored with the records (to compare runs of the same commit)")
+    p.add_argument("--history", default=DEFAULT_HISTORY, help="History file (JSON lines, appended)")
+    p.add_argument("--memory", action="store_true", help="Add an untimed memory profiling pass per instance and solver")
+    p.add_argument("--memory-sites", type=int, default=0, help="With --memory, keep the N top allocation sites per phase (much slower)")
+    p.add_argument("--memory-report", default=DEFAULT_MEMORY_REPORT, help="With --memory, CSV report per instance size")
+    p.set_defaults(func=cmd_run)
+
+    p = sub.add_parser("refs", help="Solve the corpus to optimality with highs-inproc and write the reference optima")
+    corpus_args(p)
+    p.set_defaults(func=cmd_refs, gap=1e-9)
+    p.add_argument("--update", action="store_true", help="Keep the references of instances not matched by --pattern")
+
+    p = sub.add_parser("compare", help="Flag solve-time regressions between two commits, labels or solver versions")
+    p.add_argument("--base", required=True, help="Commit, label or solver version of the baseline records")
+    p.add_argument("--head", required=True, help="Commit, label or solver version of the records to check")
+    p.add_argument("--solver", default=None, help="Only compare this solver")
+    p.add_argument("--threshold", type=float, default=0.10, help="Relative slowdown flagged as a regression (default: 0.10)")
+    p.add_argument("--min-seconds", type=float, default=0.05, help="Absolute slowdown below which nothing is flagged (default: 0.05)")
+    p.add_argument("--history", default=DEFAULT_HISTORY, help="History file (JSON lines)")
+    p.set_defaults(func=cmd_compare)
+
+    args = parser.parse_args()
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Cola de trabajo para correr barridos de experimentos en paralelo, en uno o varios hosts.
+
+Un coordinador (`init`) expande la grilla de data/experiments.csv en tareas
+(experimento, seed, interés, buzón) guardadas en una base SQLite sobre un directorio
+compartido. Cualquier cantidad de workers (`worker`) toma tareas, las resuelve con
+la misma semántica por celda que agregar_resultado y guarda el resultado de forma
+atómica. `export` arma los JSON de experiments/runs con la misma estructura que
+experimento_2, por lo que tabla_exp_1 y plot_exp_1 funcionan sin cambios.
+"""
+import argparse
+import json
+import os
+import socket
+import sqlite3
+import sys
+import time
+
+_repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_scripts_path = os.path.join(_repo_root, "scripts")
+if _scripts_path not in sys.path:
+    sys.path.insert(0, _scripts_path)
+import numpy as np
+import pandas as pd
+from experimento_2 import datos_experimento
+from cash_transportation.helpers import BUZONES_SIZES, INTERESES_ANUALES, escenario_aleatorio, resolver_celda
+from cash_transportation.solvers.solverpulp.cache import set_solve_cache
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS experiments (
+    name TEXT PRIMARY KEY,
+    params TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY,
+    experiment TEXT NOT NULL,
+    seed INTEGER NOT NULL,
+    interes TEXT NOT NULL,
+    buzon INTEGER NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    worker TEXT,
+    claimed_at REAL,
+    finished_at REAL,
+    runtime REAL,
+    result TEXT,
+    limite TEXT,
+    UNIQUE (experiment, seed, interes, buzon)
+);
+CREATE INDEX IF NOT EXISTS tasks_state ON tasks (state, experiment, seed, buzon);
+"""
+
+
+def conectar(db_path):
+    # isolation_level=None: las transacciones se manejan a mano (BEGIN IMMEDIATE)
+    con = sqlite3.connect(db_path, timeout=120, isolation_level=None)
+    con.executescript(ESQUEMA)
+    # bases creadas antes de la columna limite (cota y gap de celdas cortadas por el límite)
+    if 'limite' not in [col[1] for col in con.execute("PRAGMA table_info(tasks)")]:
+        con.execute("ALTER TABLE tasks ADD COLUMN limite TEXT")
+    return con
+
+
+def init(args):
+    csv_file = args.csv_file
+    if os.path.sep not in csv_file and not csv_file.startswith('/'):
+        csv_file = os.path.join(_repo_root, 'data', csv_file)
+    experiment_parameters = pd.read_csv(csv_file)
+    con = conectar(args.db)
+    con.execute("BEGIN IMMEDIATE")
+    n_tareas = 0
+    for row in experiment_parameters.itertuples():
+        base_name = f"{row.Perfil}_{row.Std}_{row.Route_cost}_{row.V_max}_{row.V_day}"
+        params = {
+            "profile": row.Perfil, "std": float(row.Std), "V_profile_max": float(row.V_max),
+            "V_max_day": int(row.V_day), "route_cost_mult": float(row.Route_cost),
+            "collection_mult": args.collection_mult, "solver": args.solver,
+            "time_limit": args.time_limit or None, "gap": args.gap or None,
+        }
+        con.execute("INSERT OR REPLACE INTO experiments (name, params) VALUES (?, ?)", (base_name, json.dumps(params)))
+        tareas = [
+            (base_name, seed, str(interes_anual), b)
+            for seed in range(args.n_seeds)
+            for b in range(len(BUZONES_SIZES))
+            for interes_anual in INTERESES_ANUALES
+        ]
+        cur = con.executemany(
+            "INSERT OR IGNORE INTO tasks (experiment, seed, interes, buzon) VALUES (?, ?, ?, ?)", tareas)
+        n_tareas += cur.rowcount
+    con.execute("COMMIT")
+    print(f"{n_tareas} tareas nuevas en {args.db}")
+    return 0
+
+
+def tomar_tarea(con, worker, lease):
+    # Toma una tarea pendiente (o una en curso cuyo lease venció) de forma atómica
+    ahora = time.time()
+    con.execute("BEGIN IMMEDIATE")
+    try:
+        row = con.execute(
+            "SELECT t.id, t.experiment, t.seed, t.interes, t.buzon, e.params FROM tasks t "
+            "JOIN experiments e ON e.name = t.experiment "
+            "WHERE t.state = 'pending' OR (t.state = 'running' AND t.claimed_at < ?) "
+            "ORDER BY t.experiment, t.seed, t.buzon, t.id LIMIT 1", (ahora - lease,)).fetchone()
+        if row is not None:
+            con.execute(
+                "UPDATE tasks SET state = 'running', worker = ?, claimed_at = ? WHERE id = ?",
+                (worker, ahora, row[0]))
+        con.execute("COMMIT")
+    except Exception:
+        con.execute("ROLLBACK")
+        raise
+    return row
+
+
+def worker(args):
+    con = conectar(args.db)
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    if args.cache_dir:
+        set_solve_cache(args.cache_dir, args.cache_max_mb * 2**20)
+    datos = {}
+    escenarios = {}
+    n_hechas = 0
+    while args.max_tasks == 0 or n_hechas < args.max_tasks:
+        row = tomar_tarea(con, worker_id, args.lease)
+        if row is None:
+            print("No quedan tareas pendientes")
+            break
+        task_id, experiment, seed, interes, b, params = row
+        params = json.loads(params)
+        if experiment not in datos:
+            datos[experiment] = datos_experimento(
+                params["profile"], params["std"], params["V_profile_max"], params["V_max_day"],
+                params["route_cost_mult"], params["collection_mult"])
+        rutas, costos_rutas, dias_habiles, collection_profile, std = datos[experiment]
+        if (experiment, seed) not in escenarios:
+            escenarios.clear()
+            escenarios[(experiment, seed)] = escenario_aleatorio(collection_profile, std, seed)
+        collections, e_zero = escenarios[(experiment, seed)]
+        celda, _, tiempo, _, limite = resolver_celda(
+            seed, float(interes), b, collections, e_zero,
+            np.asarray(rutas, dtype=float), np.asarray(costos_rutas, dtype=float).reshape(-1),
+            np.asarray(dias_habiles, dtype=float), args.threads, params["solver"],
+            time_limit=params.get("time_limit"), gap_rel=params.get("gap"))
+        con.execute(
+            "UPDATE tasks SET state = 'done', result = ?, runtime = ?, finished_at = ?, worker = ?, limite = ? "
+            "WHERE id = ? AND state != 'done'",
+            (json.dumps(celda), tiempo, time.time(), worker_id, None if limite is None else json.dumps(limite), task_id))
+        n_hechas += 1
+    return 0
+
+
+def status(args):
+    con = conectar(args.db)
+    rows = con.execute(
+        "SELECT experiment, state, COUNT(*), COALESCE(SUM(runtime), 0) FROM tasks "
+        "GROUP BY experiment, state ORDER BY experiment, state").fetchall()
+    for experiment, state, n, runtime in rows:
+        print(f"{experiment:40} {state:8} {n:8d} {runtime:10.1f} s")
+    return 0
+
+
+def export(args):
+    con = conectar(args.db)
+    runs_dir = args.runs_dir or os.path.join(_repo_root, 'experiments', 'runs')
+    os.makedirs(runs_dir, exist_ok=True)
+    n_celdas = len(BUZONES_SIZES) * len(INTERESES_ANUALES)
+    for (experiment,) in con.execute("SELECT name FROM experiments ORDER BY name").fetchall():
+        celdas = {}
+        for seed, interes, b, result, runtime, limite in con.execute(
+                "SELECT seed, interes, buzon, result, runtime, limite FROM tasks "
+                "WHERE experiment = ? AND state = 'done'", (experiment,)):
+            celdas.setdefault(seed, {})[(interes, b)] = (json.loads(result), runtime or 0.0, limite and json.loads(limite))
+        # solo seeds completas y contiguas desde 0, para que experimento_2 pueda continuar la corrida
+        exp_dict = {'_meta': {"total_runtime_seconds": 0.0}}
+        seed = 0
+        while len(celdas.get(seed, {})) == n_celdas:
+            seed_dict = {}
+            tiempos = {}
+            limites = {}
+            seed_runtime = 0.0
+            for interes_anual in INTERESES_ANUALES:
+                seed_dict[str(interes_anual)] = {}
+                tiempos[str(interes_anual)] = {}
+                for b in range(len(BUZONES_SIZES)):
+                    celda, runtime, limite = celdas[seed][(str(interes_anual), b)]
+                    seed_dict[str(interes_anual)][str(b)] = celda
+                    tiempos[str(interes_anual)][str(b)] = runtime
+                    if limite:
+                        limites.setdefault(str(interes_anual), {})[str(b)] = limite
+                    seed_runtime += runtime
+            seed_dict['_tiempos'] = tiempos
+            if limites:
+                seed_dict['_limites'] = limites
+            seed_dict['_runtime_seconds'] = seed_runtime
+            exp_dict[str(seed)] = seed_dict
+            exp_dict['_meta']['total_runtime_seconds'] += seed_runtime
+            seed += 1
+        exp_path = os.path.join(runs_dir, f"exp_{experiment}.json")
+        tmp_path = exp_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(exp_dict, f, indent=2)
+        os.replace(tmp_path, exp_path)
+        print(f"{exp_path}: {seed} seeds completas")
+    return 0
+
+
+def main(args_list=None):
+    parser = argparse.ArgumentParser(description="Cola de trabajo (SQLite) para barridos de experimentos")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    p_init = sub.add_parser("init", help="expandir la grilla de experimentos en tareas")
+    p_init.add_argument("--db", required=True, help="base SQLite de la cola (en un directorio compartido)")
+    p_init.add_argument("--csv-file", type=str, default="experiments.csv", help="csv de experimentos (nombre simple se busca en data/)")
+    p_init.add_argument("--n-seeds", type=int, default=150, help="cantidad de seeds por experimento (se puede ampliar volviendo a correr init)")
+    p_init.add_argument("--solver", type=str, default="HiGHS", help="solver a utilizar")
+    p_init.add_argument("--collection-mult", type=float, default=1.0, help="multiplicador de recaudación total")
+    p_init.add_argument("--time-limit", type=float, default=0, help="segundos máximos por celda (0 = sin límite); las celdas cortadas guardan la mejor solución encontrada, su cota y su gap")
+    p_init.add_argument("--gap", type=float, default=0, help="gap relativo con el que se detiene el solver (0 = el del solver)")
+
+    p_worker = sub.add_parser("worker", help="tomar y resolver tareas hasta vaciar la cola")
+    p_worker.add_argument("--db", required=True, help="base SQLite de la cola")
+    p_worker.add_argument("--threads", type=int, default=1, help="hilos del solver por worker")
+    p_worker.add_argument("--lease", type=float, default=3600.0, help="segundos tras los cuales una tarea tomada y no terminada vuelve a estar disponible")
+    p_worker.add_argument("--max-tasks", type=int, default=0, help="máximo de tareas a resolver (0 = sin tope)")
+    p_worker.add_argument("--cache-dir", type=str, default=None, help="directorio del cache de resoluciones (puede ser compartido); sin cache por defecto")
+    p_worker.add_argument("--cache-max-mb", type=float, default=512, help="tamaño máximo del cache en MB (se borran las entradas usadas hace más tiempo)")
+
+    p_status = sub.add_parser("status", help="resumen de tareas por estado")
+    p_status.add_argument("--db", required=True, help="base SQLite de la cola")
+
+    p_export = sub.add_parser("export", help="escribir los JSON de experiments/runs con las seeds completas")
+    p_export.add_argument("--db", required=True, help="base SQLite de la cola")
+    p_export.add_argument("--runs-dir", type=str, default=None, help="directorio de salida (por defecto experiments/runs)")
+
+    args = parser.parse_args(args_list)
+    comandos = {"init": init, "worker": worker, "status": status, "export": export}
+    return comandos[args.comando](args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Convierte JSONs de experimentos (experiments/runs/exp_*.json) al almacén columnar
+(directorio .store, ver cash_transportation/store.py), una semilla a la vez. Los JSONs
+con las semillas anidadas por perfil ('constant', 'V') dan un almacén por perfil,
+<nombre>_<perfil>.store.
+"""
+import argparse
+import glob
+import os
+import shutil
+import sys
+import time
+
+_repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_src_path = os.path.join(_repo_root, "src")
+if _src_path not in sys.path:
+    sys.path.insert(0, _src_path)
+from cash_transportation.store import SUFIJO, convertir_json, perfiles_json
+
+
+def main(args_list=None):
+    parser = argparse.ArgumentParser(description="Convierte JSONs de experimentos al almacén columnar (.store)")
+    parser.add_argument("json_files", nargs="*", help="JSONs a convertir (por defecto experiments/runs/exp_*.json)")
+    parser.add_argument("--out-dir", type=str, default=None, help="directorio de salida (por defecto, junto a cada JSON)")
+    parser.add_argument("--force", action="store_true", help="reemplazar almacenes existentes")
+    args = parser.parse_args(args_list)
+
+    json_files = args.json_files or sorted(glob.glob(os.path.join(_repo_root, 'experiments', 'runs', 'exp_*.json')))
+    errores = 0
+    for json_path in json_files:
+        try:
+            perfiles = perfiles_json(json_path)
+        except (ValueError, OSError) as e:
+            print(f"ERROR: {json_path}: {e}")
+            errores += 1
+            continue
+        base = os.path.splitext(os.path.basename(json_path))[0]
+        for perfil in perfiles or [None]:
+            nombre = base + ('' if perfil is None else f'_{perfil}') + SUFIJO
+            store_path = os.path.join(args.out_dir or os.path.dirname(json_path), nombre)
+            if os.path.exists(store_path):
+                if not args.force:
+                    print(f"{store_path}: ya existe (usar --force para reemplazarlo)")
+                    continue
+                shutil.rmtree(store_path)
+            start = time.time()
+            try:
+                store = convertir_json(json_path, store_path, perfil=perfil)
+            except (ValueError, OSError) as e:
+                print(f"ERROR: {json_path}: {e}")
+                errores += 1
+                continue
+            print(f"{store_path}: {store.n_seeds} seeds ({time.time() - start:.2f} s)")
+    return 1 if errores else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -9,56 +9,23 @@ _src_path = _os.path.join(_repo_root, "src")
 if _src_path not in sys.path:
     sys.path.insert(0, _src_path)
 from cash_transportation.helpers import *
+from cash_transportation.solvers.solverpulp.presolve import structural_presolve
+from cash_transportation.store import ResultStore, es_store
+from cash_transportation.scenarios import STD_POR_DEFECTO, perfil_recaudacion
+from cash_transportation.journal import compactar_journal, journal_path
+from cash_transportation.solvers.solverpulp.cache import set_solve_cache
+from cash_transportation import instrument
 import json
 import argparse
 import os
 import time
 
 
-def main(args_list=None):
-	########################################################################
-	# Parámetros configurables (via CLI)
-
-	parser = argparse.ArgumentParser(description="Experimento 2 - corridas con distintos perfiles/solvers")
-	parser.add_argument("--threads", type=int, default=8, help="cantidad de hilos")
-	parser.add_argument("--n-min", type=int, default=3, help="mínimo de iteraciones por escenario")
-	parser.add_argument("--n-max", type=int, default=0, help="máximo de iteraciones por escenario (0 = sin tope)")
-	parser.add_argument("--solver", type=str, default="HiGHS", help="solver a utilizar (ej. HiGHS, fscip)")
-	parser.add_argument("--collection-mult", type=float, default=1.0, help="multiplicador de recaudación total")
-	parser.add_argument("--exp-id", type=str, default="exp_test.json", help="archivo JSON del experimento (nombre simple se guarda en experiments/runs)")
-	parser.add_argument("--data-dir", type=str, default="./data/generated/", help="directorio donde escribir CSVs de entrada generados")
-	parser.add_argument("--V-profile-max", type=float, default=2.0, help="Cuánto más grande es la recaudación máxima respecto a la mínima en el perfil V. Por defecto: 2.0")
-	parser.add_argument("--V-max-day", type=int, default=10, help="Qué día se realiza la máxima recaudación. Por defecto: 10")
-	parser.add_argument("--route-cost-mult", type=float, default=1.5e-3, help="Multiplicador de costo de rutas. Por defecto: 1.5e-3")
-	parser.add_argument("--profile", type=str, default="C", help="Perfil de recaudación (C: constante, V: wedge)")
-	parser.add_argument("--std", type=float, default=-1.0, help="Desviación estándar. Por defecto: .525 para perfil constante y .3444 para perfil V")
-	args = parser.parse_args(args_list)
-
-	n_thr = args.threads
-	N_min = args.n_min + 1
-	if args.n_max != 0:
-		N_max = args.n_max
-	else:
-		N_max = np.inf
-	solver = args.solver
-	COLLECTION_MULT = args.collection_mult
-	exp_id = args.exp_id
-	V_profile_max = args.V_profile_max
-	V_max_day = args.V_max_day
-	route_cost_mult = args.route_cost_mult
-	if os.path.sep not in exp_id and not exp_id.startswith('/'):
-		# guardar por defecto en experiments/runs si es un nombre simple
-		exp_id = os.path.join(_repo_root, 'experiments', 'runs', exp_id)
-	exp_dir = os.path.dirname(exp_id)
-	if exp_dir:
-		os.makedirs(exp_dir, exist_ok=True)
-	if not os.path.exists(exp_id):
-		with open(exp_id, 'w', encoding='utf-8') as _f:
-			json.dump({}, _f)
-	profile = args.profile
-
-	########################################################################
-	# Parámetros fijos
+def datos_experimento(profile, std=-1.0, V_profile_max=2.0, V_max_day=10, route_cost_mult=1.5e-3, collection_mult=1.0):
+	"""
+	Arma los datos fijos de un experimento a partir de sus parámetros (ver --help).
+	Devuelve (rutas, costos_rutas, dias_habiles, collection_profile, std).
+	"""
 
 	n_s = 4 # número de sucursales
 	n_p = 8 # número de rutas
@@ -106,7 +73,7 @@ def main(args_list=None):
 	#		1.5e-03 = (total costo logisticio mensual) / (total recaudacion mensual)
 	# (total recaudacion mensual) = 1
 
-	costos_rutas = COLLECTION_MULT*costos_rutas * route_cost_mult / (4 * np.average(costos_rutas))
+	costos_rutas = collection_mult*costos_rutas * route_cost_mult / (4 * np.average(costos_rutas))
 	costos_rutas = pd.DataFrame(costos_rutas)
 
 	# días hábiles
@@ -118,45 +85,129 @@ def main(args_list=None):
 	prop_suc = np.ones(n_s)
 	prop_suc = pd.DataFrame(prop_suc)
 
-	if args.profile == "C":
-		if args.std == -1.0:
-			std = .525
-		else:
-			std = args.std
-		collections_profile_constant = np.array(dias_habiles_profile)
-		collections_profile_constant = collections_profile_constant / np.sum(collections_profile_constant)
-		collections_constant = np.tile(collections_profile_constant,(n_s,1))*COLLECTION_MULT
-		collection_profile = collections_constant
-	elif args.profile == "V":
-		if args.std == -1.0:
-			std = .3444
-		else:
-			std = args.std
-		collections_profile_V = np.hstack([np.linspace(1,V_profile_max,V_max_day-1,endpoint=False),np.linspace(V_profile_max,1,30-V_max_day+1,endpoint=False)])
-		collections_profile_V = collections_profile_V*np.array(dias_habiles_profile)
-		collections_profile_V /= np.sum(collections_profile_V)
-		collections_V = np.tile(collections_profile_V,(n_s,1))*COLLECTION_MULT
-		collection_profile = collections_V
+	# perfiles C y V (ver scenarios.py)
+	collection_profile = perfil_recaudacion(profile, dias_habiles_profile, n_s, V_profile_max, V_max_day, collection_mult)
+	if std == -1.0:
+		std = STD_POR_DEFECTO[profile]
+
+	return rutas, costos_rutas, dias_habiles, collection_profile, std
+
+
+def main(args_list=None):
+	########################################################################
+	# Parámetros configurables (via CLI)
+
+	parser = argparse.ArgumentParser(description="Experimento 2 - corridas con distintos perfiles/solvers")
+	parser.add_argument("--threads", type=int, default=8, help="cantidad de hilos")
+	parser.add_argument("--n-min", type=int, default=3, help="mínimo de iteraciones por escenario")
+	parser.add_argument("--n-max", type=int, default=0, help="máximo de iteraciones por escenario (0 = sin tope)")
+	parser.add_argument("--solver", type=str, default="HiGHS", help="solver a utilizar (ej. HiGHS, highs-inproc, fscip; heuristic: cronograma factible de la heurística, sin garantía de optimalidad)")
+	parser.add_argument("--collection-mult", type=float, default=1.0, help="multiplicador de recaudación total")
+	parser.add_argument("--exp-id", type=str, default="exp_test.json", help="archivo JSON del experimento, o directorio terminado en .store para el almacén columnar (nombre simple se guarda en experiments/runs)")
+	parser.add_argument("--data-dir", type=str, default="./data/generated/", help="directorio donde escribir CSVs de entrada generados")
+	parser.add_argument("--V-profile-max", type=float, default=2.0, help="Cuánto más grande es la recaudación máxima respecto a la mínima en el perfil V. Por defecto: 2.0")
+	parser.add_argument("--V-max-day", type=int, default=10, help="Qué día se realiza la máxima recaudación. Por defecto: 10")
+	parser.add_argument("--route-cost-mult", type=float, default=1.5e-3, help="Multiplicador de costo de rutas. Por defecto: 1.5e-3")
+	parser.add_argument("--profile", type=str, default="C", help="Perfil de recaudación (C: constante, V: wedge)")
+	parser.add_argument("--std", type=float, default=-1.0, help="Desviación estándar. Por defecto: .525 para perfil constante y .3444 para perfil V")
+	parser.add_argument("--workers", type=int, default=1, help="procesos en paralelo (cada uno con un hilo de solver); 1 = secuencial")
+	parser.add_argument("--warm-start", type=str, default="off", choices=["off", "on", "audit", "heuristic"], help="usar la solución de la tasa anterior como solución inicial (audit: además mide el tiempo ahorrado; heuristic: usar en cada celda la solución de la heurística)")
+	parser.add_argument("--formulation", type=str, default="standard", choices=["standard", "compact", "cumulative"], help="formulación del modelo (compact: sin retiros fuera de ruta; cumulative: además sin variables de efectivo)")
+	parser.add_argument("--big-m", type=str, default="tight", choices=["tight", "global"], help="cota de las restricciones de enlace (tight: calculada por sucursal y día a partir de los datos; global: BIG_M fijo)")
+	parser.add_argument("--linking", type=str, default="aggregated", choices=["aggregated", "disaggregated"], help="restricciones de enlace por ruta (aggregated) o por sucursal y ruta (disaggregated)")
+	parser.add_argument("--presolve", type=str, default="off", choices=["off", "on"], help="armar el modelo sin rutas dominadas, sin x de días no hábiles y con los días sin rutas agrupados")
+	parser.add_argument("--journal", type=str, default="on", choices=["on", "off"], help="agregar cada celda a una bitácora (<exp-id>.journal.jsonl) apenas termina y retomar desde ahí")
+	parser.add_argument("--cache-dir", type=str, default=None, help="directorio del cache de resoluciones (las celdas ya resueltas con los mismos datos, solver y opciones no se vuelven a resolver); sin cache por defecto")
+	parser.add_argument("--cache-max-mb", type=float, default=512, help="tamaño máximo del cache en MB (se borran las entradas usadas hace más tiempo)")
+	parser.add_argument("--time-limit", type=float, default=0, help="segundos máximos por celda (0 = sin límite); las celdas cortadas guardan la mejor solución encontrada, su cota y su gap")
+	parser.add_argument("--time-limit-factor", type=float, default=0, help="límite adaptativo: cada vuelta usa este factor por el cuantil 95%% de los tiempos de celda ya observados (sin pasar de --time-limit); 0 = límite fijo")
+	parser.add_argument("--gap", type=float, default=0, help="gap relativo con el que se detiene el solver (0 = el del solver)")
+	parser.add_argument("--instrument", type=str, default="off", choices=["off", "on", "memory"], help="medir cada fase (armado, actualización, resolución, extracción, cache, guardado) y guardar los tiempos y contadores de cada celda en '_meta' (memory: además picos de memoria de Python y de RSS por fase y un reporte <exp-id>.memoria.json, más lento)")
+	parser.add_argument("--memory-sites", type=int, default=0, help="con --instrument memory, guardar las N líneas de código con más memoria asignada por fase (mucho más lento); 0 = no")
+	parser.add_argument("--allocation", type=str, default="seeds", choices=["seeds", "adaptive"], help="seeds: cada vuelta agrega seeds completas hasta delta_std < 0.01; adaptive: después de --n-min seeds solo se resuelven las celdas (interés, buzón) cuyo intervalo de confianza es más ancho que --ci-rel")
+	parser.add_argument("--scenario-entropy", type=int, default=0, help="entropía de los escenarios aleatorios de una corrida nueva (la seed k usa el stream k de numpy.random.SeedSequence(entropía)); las corridas existentes siguen con el generador con el que empezaron")
+	parser.add_argument("--ci-rel", type=float, default=0.05, help="con --allocation adaptive, semiancho máximo del intervalo de confianza del 95%% de la media de cada celda, relativo a la media. Por defecto: 0.05")
+	parser.add_argument("--interest-mode", type=str, default="grid", choices=["grid", "parametric"], help="grid: resolver cada una de las 11 tasas; parametric: buscar los quiebres exactos del costo óptimo en la tasa (un cronograma por tramo, 2 resoluciones por tramo menos una) y el umbral desde el que el plan financiero le gana al logístico, y armar las 11 celdas con esos cronogramas")
+	args = parser.parse_args(args_list)
+
+	n_thr = args.threads
+	N_min = args.n_min + 1
+	if args.n_max != 0:
+		N_max = args.n_max
 	else:
-		print("Perfil no válido")
-		sys.exit(1)     
+		N_max = np.inf
+	solver = args.solver
+	COLLECTION_MULT = args.collection_mult
+	exp_id = args.exp_id
+	V_profile_max = args.V_profile_max
+	V_max_day = args.V_max_day
+	route_cost_mult = args.route_cost_mult
+	if os.path.sep not in exp_id and not exp_id.startswith('/'):
+		# guardar por defecto en experiments/runs si es un nombre simple
+		exp_id = os.path.join(_repo_root, 'experiments', 'runs', exp_id)
+	exp_dir = os.path.dirname(exp_id)
+	if exp_dir:
+		os.makedirs(exp_dir, exist_ok=True)
+	# almacén columnar si exp-id termina en .store (o ya es uno), JSON en otro caso
+	store = ResultStore(exp_id) if es_store(exp_id) else None
+	if store is None and not os.path.exists(exp_id):
+		with open(exp_id, 'w', encoding='utf-8') as _f:
+			json.dump({}, _f)
+	profile = args.profile
+	warm_start = {"off": False, "on": True, "audit": "audit", "heuristic": "heuristic"}[args.warm_start]
+	n_workers = args.workers
+	formulation = args.formulation
+	big_m = args.big_m
+	linking = args.linking
+	presolve = args.presolve == "on"
+	journal_on = args.journal == "on"
+	time_limit = args.time_limit or None
+	time_limit_factor = args.time_limit_factor or None
+	gap_rel = args.gap or None
+	adaptativa = args.allocation == "adaptive"
+	ic_rel = args.ci_rel
+	parametrico = args.interest_mode == "parametric"
+	instrumentar = {"off": False, "on": True, "memory": "memoria"}[args.instrument]
+	if instrumentar == "memoria" and args.memory_sites:
+		# los procesos del pool la habilitan con estos sitios (ver instrument.enable)
+		os.environ[instrument.ENV_SITIOS] = str(args.memory_sites)
+	if instrumentar:
+		# en el proceso principal (con --workers > 1 cada proceso la habilita para sus celdas)
+		instrument.enable(memoria=instrumentar == "memoria", sitios=args.memory_sites if instrumentar == "memoria" else 0)
+	if args.cache_dir:
+		# antes de crear el pool: los procesos hijos lo toman de la variable de entorno
+		set_solve_cache(args.cache_dir, args.cache_max_mb * 2**20)
+
+	########################################################################
+	# Parámetros fijos
+
+	try:
+		rutas, costos_rutas, dias_habiles, collection_profile, std = datos_experimento(
+			profile, args.std, V_profile_max, V_max_day, route_cost_mult, COLLECTION_MULT)
+	except ValueError as e:
+		print(e)
+		sys.exit(1)
 
 	profile_name = args.profile
 
 	data_dir = args.data_dir
 	os.makedirs(data_dir, exist_ok=True)
 
-	# Dias habiles por ruta
-	habiles_csv_path = os.path.join(data_dir, "habiles.csv")
-	dias_habiles.to_csv(habiles_csv_path, header=False, index=False)
+	with instrument.timer('escribir_csv'):
+		# Dias habiles por ruta
+		habiles_csv_path = os.path.join(data_dir, "habiles.csv")
+		dias_habiles.to_csv(habiles_csv_path, header=False, index=False)
+
+		# Datos de rutas
+		rutas_csv_path = os.path.join(data_dir, "rutas.csv")
+		rutas.to_csv(rutas_csv_path, header=False, index=False)
 
-	# Datos de rutas
-	rutas_csv_path = os.path.join(data_dir, "rutas.csv")
-	rutas.to_csv(rutas_csv_path, header=False, index=False)
+		# Costos por ruta
+		costo_rutas_csv_path = os.path.join(data_dir, "costo_rutas.csv")
+		costos_rutas.to_csv(costo_rutas_csv_path, header=False, index=False)
 
-	# Costos por ruta
-	costo_rutas_csv_path = os.path.join(data_dir, "costo_rutas.csv")
-	costos_rutas.to_csv(costo_rutas_csv_path, header=False, index=False)
+	if presolve:
+		print(structural_presolve(np.asarray(rutas, dtype=float), np.asarray(costos_rutas, dtype=float).reshape(-1), np.asarray(dias_habiles, dtype=float)).report())
 
 	########################################################################
 
@@ -172,31 +223,103 @@ def main(args_list=None):
 	#	- costo financiero sin interés
 
 	# abrir archivo
-	with open(exp_id,'r',encoding='utf-8') as f:
-		exp_dict = json.load(f)
-
-	# mientras N < N_min
-	while len(exp_dict) < N_min:
-		# agregar una corrida
-		exp_dict = agregar_resultado(exp_dict, collection_profile, std, profile_name, n_thr, solver, data_dir=data_dir)
-		# guardar dict
-		with open(exp_id,'w',encoding='utf-8') as f:
-			json.dump(exp_dict,f,indent=2)
-
-	# calcular delta_std 
-	delta_std = calcula_delta_std(exp_dict)
-	print(f"{delta_std = }")
-
-	# mientras delta_std > 0.01 y N < N_max
-	while delta_std > 0.01 and len(exp_dict) < N_max:
-		# agregar una corrida
-		exp_dict = agregar_resultado(exp_dict, collection_profile, std, profile_name, n_thr, solver, data_dir=data_dir)
-		# guardar dict
-		with open(exp_id,'w',encoding='utf-8') as f:
-			json.dump(exp_dict,f,indent=2)
-		# calcular delta_std
-		delta_std = calcula_delta_std(exp_dict)
-		print(f"{delta_std = }")
+	if store is not None:
+		exp_dict = store.to_exp_dict()
+	else:
+		with open(exp_id,'r',encoding='utf-8') as f:
+			exp_dict = json.load(f)
+
+	# bitácora de celdas: lo resuelto de una vuelta interrumpida no se vuelve a resolver
+	journal = journal_path(exp_id) if journal_on else None
+
+	def guardar(exp_dict):
+		with instrument.medir() as medicion:
+			# estadísticas acumuladas al día (se guardan con la corrida, ver stats.py)
+			with instrument.timer('estadisticas'):
+				actualizar_estadisticas(exp_dict)
+			# con el almacén solo se escriben las semillas nuevas; el JSON se reescribe entero
+			with instrument.timer('guardar'):
+				if store is not None:
+					store.append_new_seeds(exp_dict)
+				else:
+					with open(exp_id,'w',encoding='utf-8') as f:
+						json.dump(exp_dict,f,indent=2)
+			# las semillas guardadas ya no hacen falta en la bitácora
+			if journal is not None:
+				with instrument.timer('compactar_bitacora'):
+					compactar_journal(journal, len(exp_dict)-1)
+		if medicion.datos:
+			# queda en '_meta' para el guardado siguiente (el de la última vuelta no se escribe)
+			exp_dict['_meta'].setdefault('instrumentacion', []).append(
+				{'fase': 'guardar', 'seed': len(exp_dict)-2, **medicion.datos})
+
+	# con varios procesos se agregan varias semillas por vuelta para ocupar a todos
+	# (cada semilla aporta una tarea por buzón)
+	seeds_por_vuelta = max(1, n_workers // len(BUZONES_SIZES))
+	executor = None
+	if n_workers > 1:
+		from concurrent.futures import ProcessPoolExecutor
+		executor = ProcessPoolExecutor(max_workers=n_workers)
+	datos = dict(data_dir=data_dir, rutas=rutas, costos_rutas=costos_rutas, dias_habiles=dias_habiles, warm_start=warm_start, n_workers=n_workers, executor=executor, formulation=formulation, big_m=big_m, linking=linking, presolve=presolve, journal=journal, time_limit=time_limit, gap_rel=gap_rel, time_limit_factor=time_limit_factor, instrumentar=instrumentar, entropia=args.scenario_entropy, parametrico=parametrico)
+
+	try:
+		# mientras N < N_min
+		while len(exp_dict) < N_min:
+			# agregar corridas
+			n_seeds = int(min(seeds_por_vuelta, N_min - len(exp_dict)))
+			exp_dict = agregar_resultados(exp_dict, n_seeds, collection_profile, std, profile_name, n_thr, solver, **datos)
+			# guardar dict
+			guardar(exp_dict)
+
+		if adaptativa:
+			# solo las celdas con el intervalo de confianza todavía ancho, hasta que no quede ninguna o N = N_max
+			abiertas, semiancho = celdas_abiertas(exp_dict, ic_rel)
+			print(f"celdas abiertas: {int(abiertas.sum())} de {abiertas.size}, {semiancho = :.4f}")
+			while abiertas.any() and len(exp_dict) < N_max:
+				# cada semilla aporta una tarea por buzón con celdas abiertas
+				n_seeds = int(min(max(1, n_workers // int(abiertas.any(axis=0).sum())), N_max - len(exp_dict)))
+				exp_dict = agregar_resultados(exp_dict, n_seeds, collection_profile, std, profile_name, n_thr, solver, celdas=abiertas, **datos)
+				guardar(exp_dict)
+				abiertas, semiancho = celdas_abiertas(exp_dict, ic_rel)
+				print(f"celdas abiertas: {int(abiertas.sum())} de {abiertas.size}, {semiancho = :.4f}")
+		else:
+			# calcular delta_std 
+			delta_std = calcula_delta_std(exp_dict)
+			print(f"{delta_std = }")
+
+			# mientras delta_std > 0.01 y N < N_max
+			while delta_std > 0.01 and len(exp_dict) < N_max:
+				# agregar corridas
+				n_seeds = int(min(seeds_por_vuelta, N_max - len(exp_dict)))
+				exp_dict = agregar_resultados(exp_dict, n_seeds, collection_profile, std, profile_name, n_thr, solver, **datos)
+				# guardar dict
+				guardar(exp_dict)
+				# calcular delta_std
+				delta_std = calcula_delta_std(exp_dict)
+				print(f"{delta_std = }")
+
+		if parametrico:
+			# tasa anual desde la que el plan financiero le gana al logístico, por buzón
+			valores = umbrales(exp_dict)
+			for b, buzon in enumerate(BUZONES_SIZES):
+				columna = valores[:, b][~np.isnan(valores[:, b])]
+				if columna.size:
+					en_rango = columna[np.isfinite(columna)]
+					mediana = f"{np.median(en_rango):.3f}%" if en_rango.size else "-"
+					print(f"umbral buzón {buzon:.2f}: mediana {mediana}, {columna.size - en_rango.size} de {columna.size} seeds sin umbral hasta {INTERESES_ANUALES[-1]:g}%")
+	finally:
+		if executor is not None:
+			executor.shutdown()
+		if instrumentar:
+			# totales del proceso principal (con --workers > 1, sin las celdas)
+			print(instrument.resumen())
+			if instrumentar == "memoria" and exp_dict:
+				reporte = reporte_memoria(exp_dict, rutas, dias_habiles, formulation, big_m, linking, presolve)
+				reporte_path = exp_id.rstrip(os.sep) + ".memoria.json"
+				with open(reporte_path, 'w', encoding='utf-8') as f:
+					json.dump(reporte, f, indent=2, ensure_ascii=False)
+				print(f"Reporte de memoria: {reporte_path}")
+			instrument.disable()
 
 if __name__ == "__main__":
     main()
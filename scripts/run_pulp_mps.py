@@ -6,6 +6,13 @@ from typing import Optional
 
 import pulp
 
+_repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_src_path = os.path.join(_repo_root, "src")
+if _src_path not in sys.path:
+    sys.path.insert(0, _src_path)
+from cash_transportation.solvers.solverpulp.highs import is_inproc, solve_arrays
+from cash_transportation.solvers.solverpulp.mps import read_mps
+
 
 def make_solver(name: str, threads: Optional[int], time_limit: Optional[float], msg: bool):
     name = (name or "cbc").lower()
@@ -25,23 +32,13 @@ def make_solver(name: str, threads: Optional[int], time_limit: Optional[float],
     return pulp.PULP_CBC_CMD(msg=msg, presolve=1, threads=threads, timeLimit=time_limit)
 
 
-def load_problem_from_mps(path: str, sense: str):
-    sense = sense.lower()
-    lp_sense = pulp.LpMinimize if sense in ("min", "minimize", "minimise") else pulp.LpMaximize
-    # PuLP supports reading MPS via fromMPS. Some versions may return (problem, aux_data).
-    loaded = pulp.LpProblem.fromMPS(path, sense=lp_sense)
-    if isinstance(loaded, tuple) and len(loaded) >= 1:
-        return loaded[1]
-    return loaded
-
-
 def main() -> int:
     parser = argparse.ArgumentParser(description="Solve an MPS model with PuLP")
     parser.add_argument("mps", help="Path to .mps model")
-    parser.add_argument("--solver", default="cbc", help="cbc|fscip|scip|gurobi|cuopt (default: cbc)")
+    parser.add_argument("--solver", default="cbc", help="cbc|fscip|scip|gurobi|cuopt|highs|highs-inproc (default: cbc)")
     parser.add_argument("--sense", default="min", help="Objective sense: min|max (default: min)")
     parser.add_argument("--threads", type=int, default=None, help="Threads (CBC only)")
-    parser.add_argument("--time-limit", type=float, default=None, help="Time limit seconds (CBC only)")
+    parser.add_argument("--time-limit", type=float, default=None, help="Time limit seconds (CBC and highs-inproc)")
     parser.add_argument("--msg", action="store_true", help="Enable solver messages")
     parser.add_argument("--print-vars", action="store_true", help="Print non-zero variable values")
 
@@ -53,11 +50,25 @@ def main() -> int:
         return 2
 
     try:
-        prob = load_problem_from_mps(mps_path, args.sense)
+        model = read_mps(mps_path, args.sense)
     except Exception as e:
         print(f"ERROR: Failed to load MPS: {e}")
         return 3
 
+    if is_inproc(args.solver):
+        # HiGHS on the parsed arrays, without building the PuLP problem
+        lp_status, _, values, obj_val, _ = solve_arrays(model.as_minimization(), msg=args.msg, time_limit=args.time_limit)
+        status_code = lp_status
+        print(f"Status: {pulp.LpStatus.get(status_code, str(status_code))}")
+        if obj_val is not None:
+            print(f"Objective: {obj_val if model.sense == pulp.LpMinimize else -obj_val}")
+        if args.print_vars:
+            for name, val in zip(model.names, values.tolist()):
+                if abs(val) > 1e-12:
+                    print(f"{name} = {val}")
+        return 0 if status_code == 1 else 1
+
+    prob = model.to_pulp()
     solver = make_solver(args.solver, args.threads, args.time_limit, args.msg)
 
     status_code = prob.solve(solver)
@@ -7,6 +7,10 @@ import numpy as np
 import argparse
 import os
 import sys
+_src_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+if _src_path not in sys.path:
+    sys.path.insert(0, _src_path)
+from cash_transportation.store import ESTADO_OK, ResultStore, es_store
 
 
 def ver_tabla(tabla, std_output=False, csv_file=None):
@@ -69,6 +73,7 @@ def parse_experiment(exp_id):
     """
     Parsea el archivo de experimento y retorna el diccionario.
     Si exp_id es solo un nombre, busca en experiments/runs/.
+    Si es un almacén columnar (directorio .store), arma el diccionario a partir de los arrays.
     """
     # Si es solo un nombre, buscar en experiments/runs
     if os.path.sep not in exp_id and not exp_id.startswith('/'):
@@ -78,12 +83,125 @@ def parse_experiment(exp_id):
     if not os.path.exists(exp_id):
         raise FileNotFoundError(f"Archivo de experimento no encontrado: {exp_id}")
     
+    if es_store(exp_id):
+        return ResultStore(exp_id, solo_lectura=True).to_exp_dict()
+    
     with open(exp_id, 'r', encoding='utf-8') as f:
         exp_dict = json.load(f)
     
     return exp_dict
 
 
+INTERESES = np.linspace(0, 10, 11)
+BUZONES_SIZES = [1, 3/4, 1/2, 1/3, 1/4]
+
+
+def dict_a_arrays(exp_dict):
+    """
+    Pasa el diccionario del experimento a un array enmascarado (seeds x intereses x
+    buzones x 2) con [costo_total, costo_financiero_sin_interes]. Se enmascaran las celdas
+    sin solución (sin los dos costos). Las celdas con solución factible sin óptimo
+    ([costo_total, costo_financiero, estado]: 'Factible (límite alcanzado)' o 'Factible (heurística)')
+    se usan como las óptimas, igual que en el criterio de parada (stats.RunningStats).
+    Devuelve (valores, invalidas, factibles): {estado: cantidad de celdas} de las
+    enmascaradas y de las factibles sin óptimo.
+    """
+    seed_keys = [k for k in exp_dict.keys() if k != '_meta']
+    valores = np.full((len(seed_keys), len(INTERESES), len(BUZONES_SIZES), 2), np.nan)
+    invalidas = {}
+    factibles = {}
+    for s, seed in enumerate(seed_keys):
+        for i, interes in enumerate(INTERESES):
+            celdas = exp_dict[seed].get(str(interes), {})
+            for b in range(len(BUZONES_SIZES)):
+                celda = celdas.get(str(b))
+                if celda is not None and len(celda) >= 2 and None not in celda[:2]:
+                    valores[s, i, b] = celda[:2]
+                    if len(celda) > 2 and celda[2] != ESTADO_OK:
+                        factibles[str(celda[2])] = factibles.get(str(celda[2]), 0) + 1
+                else:
+                    estado = 'Sin datos' if not celda else str(celda[-1])
+                    invalidas[estado] = invalidas.get(estado, 0) + 1
+    return np.ma.masked_invalid(valores), invalidas, factibles
+
+
+def store_a_arrays(store):
+    """Como dict_a_arrays, pero leyendo los arrays de un almacén columnar (sin armar el dict)."""
+    valores = np.stack([store['costo_total'], store['costo_financiero']], axis=-1)
+    estado = store['estado']
+    ok = (estado >= 0) & ~np.isnan(valores).any(axis=-1)
+    codigos, cantidades = np.unique(estado[~ok], return_counts=True)
+    invalidas = {('Sin datos' if c < 0 else store.estados[c]): int(n) for c, n in zip(codigos, cantidades)}
+    codigos, cantidades = np.unique(estado[ok & (estado > 0)], return_counts=True)
+    factibles = {store.estados[c]: int(n) for c, n in zip(codigos, cantidades)}
+    return np.ma.masked_array(valores, mask=np.repeat(~ok[..., None], 2, axis=-1)), invalidas, factibles
+
+
+def cargar_experimento(exp_id):
+    """
+    Carga el experimento (JSON o almacén .store) como array enmascarado, ver dict_a_arrays.
+    Si exp_id es solo un nombre, busca en experiments/runs/.
+    """
+    if os.path.sep not in exp_id and not exp_id.startswith('/'):
+        repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        exp_id = os.path.join(repo_root, 'experiments', 'runs', exp_id)
+    if es_store(exp_id) and os.path.exists(exp_id):
+        return store_a_arrays(ResultStore(exp_id, solo_lectura=True))
+    return dict_a_arrays(parse_experiment(exp_id))
+
+
+def tabla_resumen(valores):
+    """
+    Tabla de 50 filas (5 buzones x 10 intereses) y 16 columnas (buzon, interes, 7
+    estadísticas con mean y std) a partir del array enmascarado de dict_a_arrays.
+    En cada fila se usan las seeds con solución tanto con interés 0 (caso logístico)
+    como con el interés de la fila (caso financiero). Las filas sin seeds quedan en 0.
+    """
+    # interés diario de las filas (intereses anuales 1..10)
+    interes_anual = INTERESES[1:]
+    interes = (1+interes_anual/100)**(1/365)-1
+    n_b = valores.shape[2]
+    datos = np.ma.getdata(valores)
+    # seeds que cuentan en cada fila: con solución con interés 0 y con el de la fila
+    ok = ~np.ma.getmaskarray(valores).any(axis=-1)
+    ok = ok[:, :1, :] & ok[:, 1:, :]
+    # caso logístico: solución con interés 0, (seeds x 1 x buzones)
+    ct0 = datos[:, :1, :, 0]
+    cf0 = datos[:, :1, :, 1]
+    # caso financiero: solución con el interés de la fila, (seeds x intereses x buzones)
+    cti = datos[:, 1:, :, 0]
+    cfi = datos[:, 1:, :, 1]
+    r = interes[None, :, None]
+    costo_logistico_logistico = np.broadcast_to(ct0, ok.shape)
+    costo_financiero_logistico = cf0 * r
+    costo_total_logistico = costo_logistico_logistico + costo_financiero_logistico
+    costo_financiero_financiero = cfi * r
+    costo_total_financiero = cti
+    costo_logistico_financiero = costo_total_financiero - costo_financiero_financiero
+    with np.errstate(invalid='ignore', divide='ignore'):
+        ganancia = (costo_total_logistico - costo_total_financiero) / costo_total_logistico
+    # columnas en el orden de ver_tabla: (seeds x intereses x buzones x 7)
+    columnas = np.stack([
+        costo_logistico_logistico, costo_financiero_logistico, costo_total_logistico,
+        costo_logistico_financiero, costo_financiero_financiero, costo_total_financiero, ganancia], axis=-1)
+
+    # mean y std (poblacional, como np.std) sobre las seeds válidas, en una pasada
+    w = ok[..., None]
+    n = ok.sum(axis=0)[..., None]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.where(w, columnas, 0.0).sum(axis=0) / n
+        std = np.sqrt((np.where(w, columnas - mean, 0.0) ** 2).sum(axis=0) / n)
+    estadisticas = np.stack([mean, std], axis=-1).reshape(mean.shape[:2] + (14,))
+    estadisticas[np.broadcast_to(n == 0, estadisticas.shape)] = 0.0
+
+    tabla = np.zeros((n_b * interes_anual.size, 16))
+    tabla[:, 0] = np.repeat(np.arange(n_b), interes_anual.size)
+    tabla[:, 1] = np.tile(interes_anual, n_b)
+    # filas ordenadas por buzón y dentro de cada buzón por interés
+    tabla[:, 2:] = estadisticas.transpose(1, 0, 2).reshape(-1, 14)
+    return tabla
+
+
 def generate_tables(exp_dict, std_output=False, csv_file=None):
     """
     Genera las tablas de resumen para cada perfil.
@@ -91,6 +209,7 @@ def generate_tables(exp_dict, std_output=False, csv_file=None):
     Estructura esperada del exp_dict:
     - Llaves: rand_seed (string) -> interés -> buzón -> [costo_total, costo_financiero_sin_interes]
     - Excluye '_meta' del conteo de seeds
+    También acepta el resultado de cargar_experimento / dict_a_arrays (valores, invalidas, factibles).
     
     Args:
         exp_dict: Diccionario con los resultados del experimento
@@ -98,116 +217,20 @@ def generate_tables(exp_dict, std_output=False, csv_file=None):
         csv_file: (opcional): Archivo de texto donde escribir la tabla. Por defecto no se escribe la tabla.
     """
     
-    # Get actual seed keys, excluding _meta
-    seed_keys = [k for k in exp_dict.keys() if k != '_meta']
-    N_exp = len(seed_keys)
+    valores, invalidas, factibles = dict_a_arrays(exp_dict) if isinstance(exp_dict, dict) else exp_dict
     
-    if N_exp == 0:
+    if valores.shape[0] == 0:
         print("Error: No se encontraron seeds en el experimento (posiblemente vacío)")
         return
     
-    # 50 filas (5 buzones × 10 intereses)
-    # 16 columnas (buzon, interes, 7 estadísticas con 2 columnas cada una)
-    # Tabla vacía
-    tabla = np.zeros((50, 16))
-    # Tamaños de buzones nuevos: [1, 3/4, 1/2, 1/3, 1/4]
-    buzones_sizes = [1, 3/4, 1/2, 1/3, 1/4]
-    for buzon_idx, buzon_size in enumerate(buzones_sizes):
-        for interes_anual in np.linspace(1, 10, 10):
-            cur_fila = int(buzon_idx*10 + (interes_anual-1))
-            interes = (1+interes_anual/100)**(1/365)-1
-            
-            # caso logístico
-            # costo logístico
-            costos_logisticos_logistico = []
-            for seed in seed_keys:
-                try:
-                    if len(exp_dict[seed]['0.0'][str(buzon_idx)]) == 2:
-                        costos_logisticos_logistico.append(exp_dict[seed]['0.0'][str(buzon_idx)][0])
-                    else:
-                        print(exp_dict[seed]['0.0'][str(buzon_idx)][2])
-                except (KeyError, IndexError):
-                    continue
-            
-            if len(costos_logisticos_logistico) == 0:
-                continue
-            
-            mean = np.mean(costos_logisticos_logistico)
-            std = np.std(costos_logisticos_logistico)
-            tabla[cur_fila, 0] = buzon_idx  # buzon
-            tabla[cur_fila, 1] = interes_anual  # interes
-            tabla[cur_fila, 2] = mean
-            tabla[cur_fila, 3] = std
-            
-            # costo financiero
-            costos_financieros_logistico = []
-            for seed in seed_keys:
-                try:
-                    if len(exp_dict[seed]['0.0'][str(buzon_idx)]) == 2:
-                        costos_financieros_logistico.append(exp_dict[seed]['0.0'][str(buzon_idx)][1]*interes)
-                    else:
-                        print(exp_dict[seed]['0.0'][str(buzon_idx)][2])
-                except (KeyError, IndexError):
-                    continue
-            
-            mean = np.mean(costos_financieros_logistico)
-            std = np.std(costos_financieros_logistico)
-            tabla[cur_fila, 4] = mean
-            tabla[cur_fila, 5] = std
-            
-            # costo total
-            costos_total_logistico = [c_log + c_fin for c_log, c_fin in zip(costos_logisticos_logistico, costos_financieros_logistico)]
-            mean = np.mean(costos_total_logistico)
-            std = np.std(costos_total_logistico)
-            tabla[cur_fila, 6] = mean
-            tabla[cur_fila, 7] = std
-            
-            # caso financiero
-            # costo financiero
-            costos_financieros_financiero = []
-            for seed in seed_keys:
-                try:
-                    if len(exp_dict[seed]['0.0'][str(buzon_idx)]) == 2:
-                        costos_financieros_financiero.append(exp_dict[seed][str(interes_anual)][str(buzon_idx)][1]*interes)
-                    else:
-                        print(exp_dict[seed]['0.0'][str(buzon_idx)][2])
-                except (KeyError, IndexError):
-                    continue
-            
-            mean = np.mean(costos_financieros_financiero)
-            std = np.std(costos_financieros_financiero)
-            tabla[cur_fila, 10] = mean
-            tabla[cur_fila, 11] = std
-            
-            # costo total
-            costos_total_financiero = []
-            for seed in seed_keys:
-                try:
-                    if len(exp_dict[seed]['0.0'][str(buzon_idx)]) == 2:
-                        costos_total_financiero.append(exp_dict[seed][str(interes_anual)][str(buzon_idx)][0])
-                    else:
-                        print(exp_dict[seed]['0.0'][str(buzon_idx)][2])
-                except (KeyError, IndexError):
-                    continue
-            
-            mean = np.mean(costos_total_financiero)
-            std = np.std(costos_total_financiero)
-            tabla[cur_fila, 12] = mean
-            tabla[cur_fila, 13] = std
-            
-            # costo logístico
-            costos_logistico_financiero = [c_tot - c_fin for c_tot, c_fin in zip(costos_total_financiero, costos_financieros_financiero)]
-            mean = np.mean(costos_logistico_financiero)
-            std = np.std(costos_logistico_financiero)
-            tabla[cur_fila, 8] = mean
-            tabla[cur_fila, 9] = std
-            
-            # ganancia
-            ganancias = [(c_log - c_fin) / c_log for c_log, c_fin in zip(costos_total_logistico, costos_total_financiero)]
-            mean = np.mean(ganancias)
-            std = np.std(ganancias)
-            tabla[cur_fila, 14] = mean
-            tabla[cur_fila, 15] = std
+    if invalidas:
+        detalle = ", ".join(f"{estado}: {n}" for estado, n in sorted(invalidas.items()))
+        print(f"Celdas sin solución: {sum(invalidas.values())} de {valores[..., 0].size} ({detalle})", file=sys.stderr)
+    if factibles:
+        detalle = ", ".join(f"{estado}: {n}" for estado, n in sorted(factibles.items()))
+        print(f"Celdas factibles sin óptimo (incluidas en la tabla): {sum(factibles.values())} de {valores[..., 0].size} ({detalle})", file=sys.stderr)
+    
+    tabla = tabla_resumen(valores)
     
     if csv_file:
         with open(csv_file, 'w', encoding='utf-8') as f:
@@ -224,7 +247,7 @@ def main(args_list=None):
         "--exp-id",
         type=str,
         default="exp_test.json",
-        help="Archivo JSON del experimento (si es nombre simple, se busca en experiments/runs/)"
+        help="Archivo JSON o almacén .store del experimento (si es nombre simple, se busca en experiments/runs/)"
     )
     parser.add_argument(
         "--std-output", 
@@ -242,7 +265,7 @@ def main(args_list=None):
     args = parser.parse_args(args_list)
     
     try:
-        exp_dict = parse_experiment(args.exp_id)
+        exp_dict = cargar_experimento(args.exp_id)
         
         # Determine output path
         csv_file = args.csv_output
@@ -252,7 +275,7 @@ def main(args_list=None):
             output_dir = os.path.join(repo_root, 'artifacts', 'reports')
             os.makedirs(output_dir, exist_ok=True)
             # Generate base filename from exp_id if not specified
-            base_name = os.path.splitext(os.path.basename(args.exp_id))[0]
+            base_name = os.path.splitext(os.path.basename(args.exp_id.rstrip(os.sep)))[0]
             csv_file = os.path.join(output_dir, f"tabla_{base_name}.csv")
         
         generate_tables(exp_dict, args.std_output, csv_file)
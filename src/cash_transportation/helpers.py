@@ -2,12 +2,18 @@ import os
 import sys
 import time
 import itertools
+from dataclasses import dataclass, field
 from scipy.special import comb
 import numpy as np
 import pandas as pd
 
 # Use the packaged solverpulp model from the new location
-from cash_transportation.solvers.solverpulp import model
+from cash_transportation.solvers.solverpulp import model, template
+from cash_transportation import instrument
+from cash_transportation.journal import ANALISIS, Journal, leer_journal
+from cash_transportation.stats import RunningStats
+from cash_transportation.scenarios import Escenarios, recortar
+from cash_transportation.parametric import analisis_parametrico, tasa_diaria
 
 
 def calculo_recaudaciones(prop_suc, collections, e_zero, buzones):
@@ -16,70 +22,30 @@ def calculo_recaudaciones(prop_suc, collections, e_zero, buzones):
 
 
 def calculo_ganancia(business_days, rutas, costos_rutas, interes, prop_suc, collections, e_zero, buzones, n_thr=4, solver='cbc', debug=False, data_dir: str = './data/generated/'):
-    os.makedirs(data_dir, exist_ok=True)
-
-    # Dias habiles por ruta
-    habiles_csv_path = os.path.join(data_dir, "habiles.csv")
-    business_days.to_csv(habiles_csv_path, header=False, index=False)
-
-    # Datos de rutas
-    rutas_csv_path = os.path.join(data_dir, "rutas.csv")
-    rutas.to_csv(rutas_csv_path, header=False, index=False)
-
-    # Costos por ruta
-    costo_rutas_csv_path = os.path.join(data_dir, "costo_rutas.csv")
-    costos_rutas.to_csv(costo_rutas_csv_path, header=False, index=False)
-
+    # data_dir se mantiene por compatibilidad: los datos se pasan en memoria al modelo
     collections, e_zero, buzones = calculo_recaudaciones(prop_suc, collections, e_zero, buzones)
 
-    # Recaudaciones por sucursal
-    recaudacion_csv_path = os.path.join(data_dir, "recaudacion.csv")
-    collections.to_csv(recaudacion_csv_path, header=False, index=False, sep="\t")
-
-    # Recaudacion inicial
-    e_zero_csv_path = os.path.join(data_dir, "e0.csv")
-    e_zero.to_csv(e_zero_csv_path, header=False, index=False)
-
-    # Datos de buzones
-    buzones_csv_path = os.path.join(data_dir, "buzon.csv")
-    buzones.to_csv(buzones_csv_path, header=False, index=False)
-
-    _, n_d = business_days.shape
-    n_p, n_s = rutas.shape
+    datos = (
+        np.asarray(rutas, dtype=float), np.asarray(costos_rutas, dtype=float), np.asarray(e_zero, dtype=float),
+        np.asarray(buzones, dtype=float), np.asarray(business_days, dtype=float), np.asarray(collections, dtype=float),
+    )
+    plantilla = template.get_template(datos[0], datos[4])
+    plantilla.update(collections=datos[5], e0=datos[2], box=datos[3], cost_routes=datos[1])
 
     # Calcular con costo financiero
-    status, variables, Problems = model.model_problem(
-        n_d, n_s, n_p,
-        rutas_csv_path, costo_rutas_csv_path, e_zero_csv_path,
-        buzones_csv_path, habiles_csv_path, recaudacion_csv_path,
-        daily_interest_rate=interes, n_thr=n_thr, solver=solver, debug=debug
-    )
-    try:
-        costos_total_caso_financiero = sum([prob.objective.value() for prob in Problems])
-    except Exception:
+    resultado = plantilla.update(rate=interes).solve(solver=solver, n_thr=n_thr, debug=debug)
+    if resultado.objective is None:
         return -1
+    costos_total_caso_financiero = resultado.objective
 
     # Calcular sin costo financiero
-    status, variables, Problems = model.model_problem(
-        n_d, n_s, n_p,
-        rutas_csv_path, costo_rutas_csv_path, e_zero_csv_path,
-        buzones_csv_path, habiles_csv_path, recaudacion_csv_path,
-        daily_interest_rate=0.0, n_thr=n_thr, solver=solver, debug=debug
-    )
-    try:
-        costos_logístico_sin_financiero = sum([prob.objective.value() for prob in Problems])
-    except Exception:
+    resultado = plantilla.update(rate=0.0).solve(solver=solver, n_thr=n_thr, debug=debug)
+    if resultado.objective is None:
         return -1
+    costos_logístico_sin_financiero = resultado.objective
 
-    # Calcular costo financiero del caso logístico
-    costos_financiero_logístico = e_zero.values.sum()
-    for var in variables:
-        var_id = var.name.split('_')[0]
-        if var_id == 'e':
-            suc, dia = var.name.split('_')[1:]
-            if dia != n_d-1:
-                costos_financiero_logístico += var.varValue
-    costos_financiero_logístico *= interes
+    # Calcular costo financiero del caso logístico (e0 + e de los días 0..n_d-2)
+    costos_financiero_logístico = resultado.idle_cash * interes
 
     costos_total_caso_logistico = costos_financiero_logístico + costos_logístico_sin_financiero
 
@@ -117,154 +83,532 @@ def generar_escenarios(n_s, n_p, n):
     return escenarios
 
 
-def agregar_resultado(exp_dict, collection_profile, std, profile_name, n_thr, solver, debug=False, data_dir: str = './data/generated/'):
-    os.makedirs(data_dir, exist_ok=True)
-    rutas_csv_path = os.path.join(data_dir, "rutas.csv")
-    costo_rutas_csv_path = os.path.join(data_dir, "costo_rutas.csv")
-    habiles_csv_path = os.path.join(data_dir, "habiles.csv")
-    buzones_sizes = [1, 3/4, 1/2, 1/3, 1/4]
+BUZONES_SIZES = [1, 3/4, 1/2, 1/3, 1/4]
+INTERESES_ANUALES = np.linspace(0, 10, 11)
+
+# límite adaptativo por celda (ver presupuesto_tiempo)
+LIMITE_CUANTIL = 0.95
+LIMITE_MIN_CELDAS = 20
+LIMITE_MIN_SEGUNDOS = 1.0
+
+# estado de las celdas que la asignación adaptativa no resolvió en una semilla (ver agregar_resultados)
+NO_ASIGNADA = 'No asignada'
+
+
+def escenario_aleatorio(collection_profile, std, rand_seed):
+    # genera el perfil aleatorio (recaudaciones y efectivo inicial, sin recortar) de una
+    # semilla con el generador anterior (np.random.default_rng(rand_seed), ver scenarios.py)
+    return Escenarios(collection_profile, std, entropia=None).semilla(rand_seed)
+
+
+def escenarios_corrida(exp_dict, collection_profile, std, entropia=0):
+    # Generador de escenarios de la corrida (ver scenarios.py), registrado en
+    # exp_dict['_meta']['escenarios']. Una corrida que ya tiene semillas sin ese registro se
+    # generó con np.random.default_rng(semilla) y lo sigue usando; una nueva usa
+    # SeedSequence con entropia. Una vez registrado, entropia se ignora.
+    meta = exp_dict.setdefault('_meta', {"total_runtime_seconds": 0.0})
+    if 'escenarios' not in meta:
+        if any(k != '_meta' for k in exp_dict):
+            meta['escenarios'] = {'generador': 'default_rng'}
+        else:
+            meta['escenarios'] = {'generador': 'seedsequence', 'entropia': int(entropia)}
+    registro = meta['escenarios']
+    return Escenarios(collection_profile, std, entropia=registro.get('entropia') if registro['generador'] == 'seedsequence' else None)
+
+
+def resolver_celda(rand_seed, interes_anual, b, collections, e_zero, rutas, costos_rutas, dias_habiles, n_thr, solver, debug=False, inicial=None, formulation='standard', big_m='tight', linking='aggregated', presolve=False, time_limit=None, gap_rel=None, recortadas=None, cache=None):
+    # Resuelve una celda (semilla, interés, buzón). Devuelve (celda, estado, tiempo, plantilla, limite):
+    # celda = [costo_total, costo_financiero], [None, None, estado] o, si se alcanzó
+    # time_limit con una solución factible, [costo_total, costo_financiero, estado] con
+    # los costos de la incumbente y limite = {'cota', 'gap'} (None si no se alcanzó).
+    # inicial: valores de columnas a usar como solución inicial (None = sin solución inicial).
+    # formulation: 'standard' o 'compact' (ver solverpulp/matrix.py).
+    # big_m, linking: cota de las restricciones de enlace (ver solverpulp/model.py).
+    # presolve: armar el modelo reducido (ver solverpulp/presolve.py).
+    # time_limit, gap_rel: segundos máximos y gap relativo del solver (None = sin límite).
+    # recortadas: (collections, e_zero) ya recortados al buzón (ver scenarios.recortar).
+    # cache: SolveCache, False o None (cache por defecto), como en ModelTemplate.solve.
+    n_s, n_d = collections.shape
+    plantilla = template.get_template(rutas, dias_habiles, formulation=formulation, big_m=big_m, linking=linking, presolve=presolve)
+    interes = (1+interes_anual/100)**(1/365)-1
+    buzones = np.ones(n_s)*BUZONES_SIZES[b]
+    if recortadas is None:
+        recortadas = (np.clip(collections, 0.0, BUZONES_SIZES[b]), np.clip(e_zero, 0.0, BUZONES_SIZES[b]))
+    collections_clip, e_zero_clip = recortadas
+    with instrument.timer('actualizar'):
+        plantilla.update(collections=collections_clip, e0=e_zero_clip, box=buzones, rate=interes, cost_routes=costos_rutas)
+    start = time.time()
+    # Resolver problema
+    # con Gurobi, otra solución óptima del pool elegida por la semilla (ver ModelTemplate.solve)
+    resultado = plantilla.solve(solver=solver, n_thr=n_thr, debug=debug, warm_start=inicial, pool_seed=rand_seed,
+                                time_limit=time_limit, gap_rel=gap_rel, cache=cache)
+    status = resultado.status
+    tiempo = time.time()-start
+    print(f"Resolviendo caso {rand_seed} {interes_anual} {b} t={tiempo:.2f}")
+    if status[0] not in ('Resuelto (Óptimo)', model.LIMIT_STATUS, model.HEURISTIC_STATUS):
+        return [None, None, status[0]], status[0], tiempo, plantilla, None
+    try:
+        # Calcular costo total
+        costo_total = resultado.objective
+        # Calcular costo financiero sin interés
+        costo_financiero = e_zero.sum() + resultado.e[:, :n_d-1].sum()
+        # es sin interés, porque para el costo financiero real
+        # se necesita la siguiente linea:
+        # costos_financiero_logístico *= interes
+        if status[0] == model.LIMIT_STATUS:
+            # se guarda la incumbente, marcada con el estado, con su cota y gap
+            return [costo_total, costo_financiero, status[0]], status[0], tiempo, plantilla, {'cota': resultado.bound, 'gap': resultado.gap}
+        if status[0] == model.HEURISTIC_STATUS:
+            # solución de la heurística: marcada con el estado, sin cota
+            return [costo_total, costo_financiero, status[0]], status[0], tiempo, plantilla, None
+        return [costo_total, costo_financiero], status[0], tiempo, plantilla, None
+    except Exception as e:
+        return [None, None, f"Error: {str(e)}"], status[0], tiempo, plantilla, None
+
+
+@dataclass
+class OpcionesBuzon:
+    """
+    Opciones de resolver_buzon, las mismas para todas las cadenas de una vuelta (ver
+    agregar_resultados).
+    - solver, n_thr, debug: Como en resolver_celda.
+    - warm_start: False, True, 'audit' o 'heuristic'.
+    - formulation, big_m, linking, presolve: Modelo (ver resolver_celda).
+    - time_limit, gap_rel: Límites de cada celda (None = sin límite).
+    - journal: Ruta de la bitácora donde agregar cada celda (None = sin bitácora).
+    - instrumentar: False, True o 'memoria' (además los picos de memoria, ver instrument.py).
+    - parametrico: Análisis paramétrico en la tasa en lugar de resolver cada tasa.
+    """
+    solver: str = 'cbc'
+    n_thr: int = 4
+    debug: bool = False
+    warm_start: object = False
+    formulation: str = 'standard'
+    big_m: str = 'tight'
+    linking: str = 'aggregated'
+    presolve: bool = False
+    time_limit: float = None
+    gap_rel: float = None
+    journal: str = None
+    instrumentar: object = False
+    parametrico: bool = False
+
+
+@dataclass
+class ResultadoBuzon:
+    """
+    Resultado de resolver_buzon, por tasa anual (str):
+    - celdas: Como en resolver_celda.
+    - ahorros: Segundos ahorrados con solución inicial (solo con 'audit').
+    - tiempos: Segundos de la celda.
+    - limites: {'cota', 'gap'} de las celdas detenidas por time_limit.
+    - mediciones: Snapshot de instrument.py de la celda (solo con instrumentar; el del
+      análisis paramétrico en 'parametrico').
+    - runtime: Segundos invertidos en la cadena.
+    - analisis: AnalisisParametrico.to_dict() (solo con parametrico y óptimo, si no None).
+    """
+    celdas: dict = field(default_factory=dict)
+    ahorros: dict = field(default_factory=dict)
+    tiempos: dict = field(default_factory=dict)
+    limites: dict = field(default_factory=dict)
+    mediciones: dict = field(default_factory=dict)
+    runtime: float = 0.0
+    analisis: dict = None
+
+
+def resolver_buzon(rand_seed, b, collections, e_zero, rutas, costos_rutas, dias_habiles, opciones=None, hechas=None, intereses=None, recortadas=None):
+    # Resuelve las 11 tasas de interés de un buzón para una semilla (o solo las de
+    # intereses, en orden). Es la unidad de trabajo de agregar_resultados (la cadena de
+    # tasas comparte la solución inicial). Devuelve un ResultadoBuzon.
+    # opciones: OpcionesBuzon (None = las de por defecto).
+    # hechas: registros de la bitácora para esta cadena ({interes: registro}); esas celdas
+    # no se vuelven a resolver.
+    # recortadas: recaudaciones y efectivo inicial recortados al buzón (ver resolver_celda).
+    # Con opciones.parametrico, en lugar de resolver cada tasa se buscan los tramos del
+    # costo óptimo entre la menor y la mayor tasa (ver parametric.py) y se arman las celdas
+    # con el cronograma de cada tramo. Si el análisis no llega al óptimo (por ejemplo por
+    # time_limit) se resuelve cada tasa como siempre. El análisis va a la bitácora antes
+    # que sus celdas; al retomar se recupera de ahí (ver journal.py) y solo se agregan las
+    # celdas que faltan (si no estaba, se vuelve a hacer y las celdas ya guardadas se conservan).
+    opciones = opciones or OpcionesBuzon()
+    warm_start = opciones.warm_start
+    resultado = ResultadoBuzon()
+    hechas = hechas or {}
+    bitacora = Journal(opciones.journal) if opciones.journal else None
+    # en un proceso del pool se habilita acá; en el proceso principal puede estar habilitada
+    habilitada = bool(opciones.instrumentar) and not instrument.enabled()
+    if habilitada:
+        instrument.enable(memoria=opciones.instrumentar == 'memoria')
+    # última solución óptima, para usar como solución inicial ('heuristic': la de la
+    # heurística en cada celda, ver solverpulp/heuristic.py)
+    sin_inicial = 'heuristic' if warm_start == 'heuristic' else None
+    inicial = sin_inicial
+    intereses = list(INTERESES_ANUALES if intereses is None else intereses)
+    args = (collections, e_zero, rutas, costos_rutas, dias_habiles, opciones.n_thr, opciones.solver, opciones.debug)
+    modelo = dict(formulation=opciones.formulation, big_m=opciones.big_m, linking=opciones.linking, presolve=opciones.presolve,
+                  time_limit=opciones.time_limit, gap_rel=opciones.gap_rel, recortadas=recortadas)
+    try:
+        if opciones.parametrico:
+            faltan = [interes_anual for interes_anual in intereses if str(interes_anual) not in hechas]
+            registro = hechas.get(ANALISIS)
+            restaurado = registro is not None and all(str(interes_anual) in registro['celdas'] for interes_anual in faltan)
+            if restaurado:
+                # análisis ya en la bitácora: las celdas que faltan salen de su línea
+                resultado.analisis = registro['analisis']
+                celdas_analisis = registro['celdas']
+                tiempo = registro['tiempo']
+            elif faltan:
+                with instrument.medir() as medicion:
+                    analisis, celdas_tramos, tiempo = resolver_parametrico(
+                        rand_seed, b, *args[:-1], intereses, debug=opciones.debug,
+                        warm_start=sin_inicial or bool(warm_start), **modelo)
+                # sin óptimo en alguna tasa se resuelve cada tasa (lo invertido cuenta igual)
+                resultado.runtime += tiempo
+                if analisis.optimo:
+                    if medicion.datos:
+                        resultado.mediciones['parametrico'] = medicion.datos
+                    resultado.analisis = analisis.to_dict()
+                    celdas_analisis = {str(interes_anual): celda for interes_anual, celda in zip(intereses, celdas_tramos)}
+                    if bitacora is not None:
+                        bitacora.append_analisis(rand_seed, b, resultado.analisis, celdas_analisis, tiempo)
+            if resultado.analisis is not None:
+                for interes_anual in faltan:
+                    # el tiempo del análisis se reparte entre las celdas
+                    tiempo_celda = tiempo / len(celdas_analisis)
+                    celda = celdas_analisis[str(interes_anual)]
+                    resultado.celdas[str(interes_anual)] = celda
+                    resultado.tiempos[str(interes_anual)] = tiempo_celda
+                    if restaurado:
+                        resultado.runtime += tiempo_celda
+                    if bitacora is not None:
+                        bitacora.append(rand_seed, interes_anual, b, celda, tiempo_celda, tiempo_celda)
+                # las que ya estaban en la bitácora se toman de ahí
+                intereses = [interes_anual for interes_anual in intereses if str(interes_anual) in hechas]
+        for interes_anual in intereses:
+            clave = str(interes_anual)
+            registro = hechas.get(clave)
+            if registro is not None:
+                # celda ya resuelta; su solución no se guarda, la siguiente arranca sin solución inicial
+                resultado.celdas[clave] = registro['celda']
+                resultado.tiempos[clave] = registro['tiempo']
+                if 'ahorro' in registro:
+                    resultado.ahorros[clave] = registro['ahorro']
+                if 'limite' in registro:
+                    resultado.limites[clave] = registro['limite']
+                resultado.runtime += registro['runtime']
+                inicial = sin_inicial
+                continue
+            tiempo_celda = 0.0
+            auditar = warm_start == 'audit' and inicial is not None
+            with instrument.medir() as medicion:
+                if auditar:
+                    # las dos sin cache: la resolución con solución inicial sería un acierto
+                    # de la primera (warm_start no es parte de la clave) y el ahorro, todo
+                    # su tiempo
+                    _, _, tiempo_sin_inicial, _, _ = resolver_celda(rand_seed, interes_anual, b, *args, cache=False, **modelo)
+                    tiempo_celda += tiempo_sin_inicial
+                with instrument.timer('celda'):
+                    celda, status, tiempo, plantilla, limite = resolver_celda(
+                        rand_seed, interes_anual, b, *args, inicial=inicial, cache=False if auditar else None, **modelo)
+            if medicion.datos:
+                resultado.mediciones[clave] = medicion.datos
+            tiempo_celda += tiempo
+            resultado.runtime += tiempo_celda
+            if auditar:
+                resultado.ahorros[clave] = tiempo_sin_inicial - tiempo
+            if warm_start in (True, 'audit') and status in ('Resuelto (Óptimo)', model.LIMIT_STATUS, model.HEURISTIC_STATUS):
+                # la incumbente también es factible para la tasa siguiente
+                inicial = plantilla.solution()
+            resultado.celdas[clave] = celda
+            resultado.tiempos[clave] = tiempo
+            if limite is not None:
+                resultado.limites[clave] = limite
+            if bitacora is not None:
+                bitacora.append(rand_seed, interes_anual, b, celda, tiempo, tiempo_celda, resultado.ahorros.get(clave), limite)
+    finally:
+        if bitacora is not None:
+            bitacora.close()
+        if habilitada:
+            instrument.disable()
+    return resultado
+
+
+def resolver_parametrico(rand_seed, b, collections, e_zero, rutas, costos_rutas, dias_habiles, n_thr, solver, intereses, debug=False, warm_start=True, formulation='standard', big_m='tight', linking='aggregated', presolve=False, time_limit=None, gap_rel=None, recortadas=None):
+    # Análisis paramétrico de un buzón para una semilla entre la menor y la mayor de las
+    # tasas anuales intereses (ver parametric.py). Devuelve (analisis, celdas, tiempo):
+    # celdas[i] = [costo_total, costo_financiero] de intereses[i] con el cronograma óptimo
+    # de su tramo (como resolver_celda); tiempo = segundos de todas las resoluciones.
+    n_s, n_d = collections.shape
+    plantilla = template.get_template(rutas, dias_habiles, formulation=formulation, big_m=big_m, linking=linking, presolve=presolve)
+    buzones = np.ones(n_s)*BUZONES_SIZES[b]
+    if recortadas is None:
+        recortadas = (np.clip(collections, 0.0, BUZONES_SIZES[b]), np.clip(e_zero, 0.0, BUZONES_SIZES[b]))
+    collections_clip, e_zero_clip = recortadas
+    with instrument.timer('actualizar'):
+        plantilla.update(collections=collections_clip, e0=e_zero_clip, box=buzones, cost_routes=costos_rutas)
+    start = time.time()
+    analisis = analisis_parametrico(plantilla, tasa_diaria(min(intereses)), tasa_diaria(max(intereses)), solver=solver,
+                                    n_thr=n_thr, debug=debug, warm_start=warm_start, pool_seed=rand_seed,
+                                    time_limit=time_limit, gap_rel=gap_rel)
+    tiempo = time.time()-start
+    print(f"Resolviendo caso {rand_seed} paramétrico {b} t={tiempo:.2f} ({analisis.resoluciones} resoluciones, {len(analisis.tramos)} tramos)")
+    celdas = []
+    if analisis.optimo:
+        for interes_anual in intereses:
+            tasa = tasa_diaria(interes_anual)
+            tramo = analisis.tramo(tasa)
+            # costo financiero sin interés, como en resolver_celda
+            celdas.append([tramo.costo(tasa), e_zero.sum() + tramo.resultado.e[:, :n_d-1].sum()])
+    return analisis, celdas, tiempo
+
+
+def _resolver_buzon(tarea):
+    # tarea: argumentos de resolver_buzon por nombre (ver agregar_resultados)
+    return resolver_buzon(**tarea)
+
+
+def presupuesto_tiempo(exp_dict, time_limit=None, factor=None):
+    # Segundos máximos por celda para la próxima vuelta (None = sin límite). Sin factor es
+    # time_limit. Con factor es factor veces el cuantil LIMITE_CUANTIL de los tiempos de
+    # las celdas ya resueltas en exp_dict ('_tiempos'), al menos LIMITE_MIN_SEGUNDOS y sin
+    # pasar de time_limit; mientras haya menos de LIMITE_MIN_CELDAS tiempos, time_limit.
+    # Las celdas cortadas por el límite cuentan con el límite como tiempo: si son más del
+    # 5% el cuantil es el límite anterior y el siguiente crece (hasta time_limit).
+    if not factor:
+        return time_limit
+    tiempos = [tiempo for seed_key, seed_dict in exp_dict.items() if seed_key != '_meta'
+               for celdas in seed_dict.get('_tiempos', {}).values() for tiempo in celdas.values()]
+    if len(tiempos) < LIMITE_MIN_CELDAS:
+        return time_limit
+    limite = max(LIMITE_MIN_SEGUNDOS, factor * float(np.quantile(tiempos, LIMITE_CUANTIL)))
+    return limite if time_limit is None else min(limite, time_limit)
+
+
+def agregar_resultados(exp_dict, n_seeds, collection_profile, std, profile_name, n_thr, solver, debug=False, data_dir: str = './data/generated/', rutas=None, costos_rutas=None, dias_habiles=None, warm_start=False, n_workers=1, executor=None, formulation='standard', big_m='tight', linking='aggregated', presolve=False, journal=None, time_limit=None, gap_rel=None, time_limit_factor=None, instrumentar=False, celdas=None, entropia=0, parametrico=False):
+    # Agrega n_seeds semillas nuevas a exp_dict (ver agregar_resultado).
+    # n_workers > 1: las cadenas (semilla, buzón) se reparten en un pool de procesos con un
+    # hilo de solver cada uno. Se puede pasar un executor ya creado para reutilizarlo.
+    # rutas, costos_rutas y dias_habiles se pasan en memoria; si faltan se leen
+    # una sola vez de los CSVs de data_dir (comportamiento anterior)
+    # warm_start: False, True, 'audit' o 'heuristic'. Con True cada celda arranca desde la
+    # solución de la tasa anterior con el mismo buzón (mismo conjunto factible, solo cambia
+    # el objetivo). Con 'audit' además se resuelve la celda sin solución inicial y se
+    # guarda en exp_dict[seed]['_warm_start'][interes][buzon] los segundos ahorrados.
+    # Con 'heuristic' cada celda arranca desde la solución de solverpulp/heuristic.py.
+    # Los segundos de cada celda quedan en exp_dict[seed]['_tiempos'][interes][buzon].
+    # formulation: 'standard' o 'compact' (mismos resultados, modelo más chico).
+    # big_m: 'tight' (cota por sucursal y día a partir de los datos) o 'global' (BIG_M).
+    # linking: 'aggregated' (una fila por día y ruta) o 'disaggregated' (una por sucursal).
+    # presolve: sin rutas dominadas ni días sin rutas (mismos resultados, modelo más chico).
+    # journal: ruta de la bitácora (ver journal.py). Cada celda se agrega apenas termina y
+    # las celdas de estas semillas que ya están en la bitácora no se vuelven a resolver.
+    # time_limit, gap_rel, time_limit_factor: límites de cada celda (ver presupuesto_tiempo).
+    # El límite de la vuelta queda en exp_dict[seed]['_limite_segundos'] y la cota y el gap
+    # de las celdas cortadas por el límite en exp_dict[seed]['_limites'][interes][buzon].
+    # instrumentar: False, True o 'memoria'. Los timers y contadores de instrument.py de
+    # cada celda se agregan a exp_dict['_meta']['instrumentacion'] como registros
+    # {'seed', 'interes', 'buzon', 'timers', 'counters'[, 'picos']}.
+    # celdas: array booleano (intereses x buzones) con las celdas a resolver en estas
+    # semillas (None = todas, ver celdas_abiertas). En cada buzón con alguna celda también
+    # se resuelve la tasa 0, con la que tabla_exp_1 compara cada tasa en la misma semilla.
+    # Las demás quedan como [None, None, NO_ASIGNADA] (misma estructura de exp_dict).
+    # entropia: de los escenarios de una corrida nueva (ver escenarios_corrida). Los
+    # escenarios de todas las semillas se generan juntos y se recortan a los 5 buzones de una vez.
+    # parametrico: cada cadena (semilla, buzón) con el análisis paramétrico en la tasa (ver
+    # resolver_buzon); los quiebres, el umbral y los tramos (tasas anuales en %) quedan en
+    # exp_dict[seed]['_parametrico'][buzon].
+    if rutas is None:
+        rutas = np.loadtxt(os.path.join(data_dir, "rutas.csv"), delimiter=",", ndmin=2)
+    if costos_rutas is None:
+        costos_rutas = np.loadtxt(os.path.join(data_dir, "costo_rutas.csv"), delimiter=",", ndmin=1)
+    if dias_habiles is None:
+        dias_habiles = np.loadtxt(os.path.join(data_dir, "habiles.csv"), delimiter=",", ndmin=2)
+    rutas = np.asarray(rutas, dtype=float)
+    costos_rutas = np.asarray(costos_rutas, dtype=float).reshape(-1)
+    dias_habiles = np.asarray(dias_habiles, dtype=float)
     # ensure meta container for cumulative timing
     if '_meta' not in exp_dict:
         exp_dict['_meta'] = {"total_runtime_seconds": 0.0}
-    # generar semilla
-    rand_seed = len(exp_dict)-1
-    exp_dict[str(rand_seed)] = {}
-    seed_runtime = 0.0
-    # generar perfil aleatorio
-    rng = np.random.default_rng(seed=rand_seed)
-    n_s, n_d = collection_profile.shape
-    #n_p,_ = rutas.shape
-    n_p = 8
-    e_zero = collection_profile[:, 0]
-    mu = e_zero[0]
-    if std == 0:
-        rand_collect = np.zeros(collection_profile.shape)
-        rand_e_zero = np.zeros(e_zero.shape)
+    escenarios = escenarios_corrida(exp_dict, collection_profile, std, entropia)
+    # generar semillas y tareas (una por semilla y buzón)
+    first_seed = len(exp_dict)-1
+    seeds = list(range(first_seed, first_seed + n_seeds))
+    collections_lote, e_zero_lote = escenarios.lote(seeds)
+    collections_clip, e_zero_clip = recortar(collections_lote, e_zero_lote, BUZONES_SIZES)
+    hechas = leer_journal(journal, first_seed) if journal else {}
+    if hechas:
+        n_hechas = sum(len(set(hechas.get((seed, b), {})) - {ANALISIS}) for seed in seeds for b in range(len(BUZONES_SIZES)))
+        print(f"Retomando: {n_hechas} celdas de la bitácora {journal}")
+    limite = presupuesto_tiempo(exp_dict, time_limit, time_limit_factor)
+    if limite is not None:
+        print(f"Límite por celda: {limite:.1f} s")
+    # las mismas opciones para todas las cadenas (en el pool, un hilo de solver por proceso)
+    opciones = OpcionesBuzon(solver=solver, n_thr=1 if n_workers > 1 else n_thr, debug=debug, warm_start=warm_start,
+                             formulation=formulation, big_m=big_m, linking=linking, presolve=presolve,
+                             time_limit=limite, gap_rel=gap_rel, journal=journal, instrumentar=instrumentar,
+                             parametrico=parametrico)
+    tareas = []
+    for i, rand_seed in enumerate(seeds):
+        collections, e_zero = collections_lote[i], e_zero_lote[i]
+        for b in range(len(BUZONES_SIZES)):
+            intereses = None
+            if celdas is not None:
+                abiertas = np.array(celdas, dtype=bool)[:, b]
+                if not abiertas.any():
+                    continue
+                abiertas[0] = True
+                intereses = list(INTERESES_ANUALES[abiertas])
+            tareas.append(dict(rand_seed=rand_seed, b=b, collections=collections, e_zero=e_zero, rutas=rutas,
+                               costos_rutas=costos_rutas, dias_habiles=dias_habiles, opciones=opciones,
+                               hechas=hechas.get((rand_seed, b)), intereses=intereses,
+                               recortadas=(collections_clip[i, b], e_zero_clip[i, b])))
+    if n_workers > 1:
+        if executor is None:
+            from concurrent.futures import ProcessPoolExecutor
+            with ProcessPoolExecutor(max_workers=n_workers) as pool:
+                resultados = list(pool.map(_resolver_buzon, tareas))
+        else:
+            resultados = list(executor.map(_resolver_buzon, tareas))
     else:
-        alpha = 1/(std**2)
-        theta = mu/alpha
-        rand_collect = rng.gamma(alpha, theta, size=collection_profile.shape) - mu
-        rand_e_zero = rng.gamma(alpha, theta, size=e_zero.shape) - mu
-    collections = collection_profile + rand_collect
-    e_zero = e_zero + rand_e_zero
-    collections = pd.DataFrame(collections)
-    e_zero = pd.DataFrame(e_zero)
-    # guardar perfil aleatorio
-    # Recaudaciones por sucursal
-    recaudacion_csv_path = os.path.join(data_dir, "recaudacion.csv")
-    # Recaudacion inicial
-    e_zero_csv_path = os.path.join(data_dir, "e0.csv")
-    for interes_anual in np.linspace(0, 10, 11):
-        interes = (1+interes_anual/100)**(1/365)-1
-        exp_dict[str(rand_seed)][str(interes_anual)] = {}
-        #cantidad de recolecciones mensuales
-        for b in range(5):
-            buzones = np.ones(n_s)*buzones_sizes[b]
-            collections_clip = collections.clip(lower=0.0, upper=buzones_sizes[b])
-            e_zero_clip = e_zero.clip(lower=0.0, upper=buzones_sizes[b])
-            collections_clip.to_csv(recaudacion_csv_path, header=False, index=False, sep="\t")
-            e_zero_clip.to_csv(e_zero_csv_path, header=False, index=False)
-            buzones = pd.DataFrame(buzones)
-            # Datos de buzones
-            buzones_csv_path = os.path.join(data_dir, "buzon.csv")
-            buzones.to_csv(buzones_csv_path, header=False, index=False)
-            print(f"Resolviendo caso {rand_seed} {interes_anual} {b} ", end="")
-            start = time.time()
-            # Resolver problema
-            status, variables, Problems = model.model_problem(
-                n_d, n_s, n_p,
-                rutas_csv_path, costo_rutas_csv_path, e_zero_csv_path,
-                buzones_csv_path, habiles_csv_path, recaudacion_csv_path,
-                daily_interest_rate=interes, n_thr=n_thr, solver=solver, debug=debug
-            )
-            tiempo = time.time()-start
-            print(f"t={tiempo:.2f}")
-            seed_runtime += tiempo
-            if status[0] != 'Resuelto (Óptimo)':
-                exp_dict[str(rand_seed)][str(interes_anual)][str(b)] = [None, None, status[0]]
+        resultados = [resolver_buzon(**tarea) for tarea in tareas]
+    # armar el dict con la misma estructura (y orden de llaves) que la versión secuencial
+    for rand_seed in seeds:
+        seed_dict = {str(interes_anual): {} for interes_anual in INTERESES_ANUALES}
+        if warm_start == 'audit':
+            seed_dict['_warm_start'] = {}
+        seed_dict['_tiempos'] = {}
+        limites_semilla = {}
+        analisis_semilla = {}
+        seed_runtime = 0.0
+        for tarea, resultado in zip(tareas, resultados):
+            if tarea['rand_seed'] != rand_seed:
                 continue
-            else:
-                try:
-                    if solver == "gurobi":
-                        import gurobipy as gp
-                        problem = Problems[0]
-                        gurobi_model = problem.solverModel
-                        num_solutions = gurobi_model.SolCount
-                        if num_solutions > 1:
-                            # print(f"Number of solutions found: {num_solutions}")
-                            gurobi_model.setParam(gp.GRB.Param.SolutionNumber, rand_seed % num_solutions)
-                            variables = []
-                            variables += problem.variables()
-                    # Calcular costo total
-                    costo_total = sum([prob.objective.value() for prob in Problems])
-                    # Calcular costo financiero sin interés
-                    costo_financiero = e_zero.values.sum()
-                    for var in variables:
-                        var_id = var.name.split('_')[0]
-                        if var_id == 'e':
-                            _, dia = var.name.split('_')[1:]
-                            if int(dia) != n_d-1:
-                                costo_financiero += var.solverVar.Xn
-                    exp_dict[str(rand_seed)][str(interes_anual)][str(b)] = [costo_total, costo_financiero]
-                    # es sin interés, porque para el costo financiero real
-                    # se necesita la siguiente linea:
-                    # costos_financiero_logístico *= interes
-                except Exception as e:
-                    exp_dict[str(rand_seed)][str(interes_anual)][str(b)] = [None, None, f"Error: {str(e)}"]
-                    continue
-    # store per-seed runtime and update global meta
-    exp_dict[str(rand_seed)]['_runtime_seconds'] = seed_runtime
-    try:
-        exp_dict['_meta']['total_runtime_seconds'] += seed_runtime
-    except Exception:
-        # if meta was somehow corrupted, reset it safely
-        exp_dict['_meta'] = {"total_runtime_seconds": seed_runtime}
+            b = tarea['b']
+            for interes, celda in resultado.celdas.items():
+                seed_dict[interes][str(b)] = celda
+            for interes, ahorro in resultado.ahorros.items():
+                seed_dict['_warm_start'].setdefault(interes, {})[str(b)] = ahorro
+            for interes, tiempo in resultado.tiempos.items():
+                seed_dict['_tiempos'].setdefault(interes, {})[str(b)] = tiempo
+            for interes, limite_celda in resultado.limites.items():
+                limites_semilla.setdefault(interes, {})[str(b)] = limite_celda
+            for interes, medicion in resultado.mediciones.items():
+                exp_dict['_meta'].setdefault('instrumentacion', []).append(
+                    {'seed': rand_seed, 'interes': interes, 'buzon': b, **medicion})
+            if resultado.analisis is not None:
+                analisis_semilla[str(b)] = resultado.analisis
+            seed_runtime += resultado.runtime
+        if celdas is not None:
+            # las celdas no asignadas completan la grilla, en el orden de buzones de siempre
+            for interes in INTERESES_ANUALES:
+                resueltas = seed_dict[str(interes)]
+                seed_dict[str(interes)] = {str(b): resueltas.get(str(b), [None, None, NO_ASIGNADA])
+                                           for b in range(len(BUZONES_SIZES))}
+        if limites_semilla:
+            seed_dict['_limites'] = limites_semilla
+        if analisis_semilla:
+            seed_dict['_parametrico'] = analisis_semilla
+        if limite is not None:
+            seed_dict['_limite_segundos'] = limite
+        # store per-seed runtime and update global meta
+        seed_dict['_runtime_seconds'] = seed_runtime
+        exp_dict[str(rand_seed)] = seed_dict
+        try:
+            exp_dict['_meta']['total_runtime_seconds'] += seed_runtime
+        except Exception:
+            # if meta was somehow corrupted, reset it safely
+            exp_dict['_meta'] = {"total_runtime_seconds": seed_runtime}
     return exp_dict
 
 
-def calcula_delta_std(exp_dict):
-    # Get actual seed keys, excluding _meta
+def agregar_resultado(exp_dict, collection_profile, std, profile_name, n_thr, solver, debug=False, data_dir: str = './data/generated/', rutas=None, costos_rutas=None, dias_habiles=None, warm_start=False, n_workers=1, executor=None, formulation='standard', big_m='tight', linking='aggregated', presolve=False, journal=None, time_limit=None, gap_rel=None, time_limit_factor=None, instrumentar=False, celdas=None, entropia=0, parametrico=False):
+    # Agrega una semilla nueva (11 tasas x 5 buzones, o solo celdas) a exp_dict
+    return agregar_resultados(
+        exp_dict, 1, collection_profile, std, profile_name, n_thr, solver, debug=debug, data_dir=data_dir,
+        rutas=rutas, costos_rutas=costos_rutas, dias_habiles=dias_habiles, warm_start=warm_start,
+        n_workers=n_workers, executor=executor, formulation=formulation, big_m=big_m, linking=linking, presolve=presolve,
+        journal=journal, time_limit=time_limit, gap_rel=gap_rel, time_limit_factor=time_limit_factor,
+        instrumentar=instrumentar, celdas=celdas, entropia=entropia, parametrico=parametrico)
+
+
+def actualizar_estadisticas(exp_dict):
+    # Lleva las estadísticas acumuladas de exp_dict['_meta']['running_stats'] (ver stats.py)
+    # hasta la última semilla y devuelve el RunningStats. Solo se agregan las semillas
+    # nuevas; si no hay estadísticas guardadas (o no corresponden) se recorre exp_dict.
     seed_keys = [k for k in exp_dict.keys() if k != '_meta']
-    N_seeds = len(seed_keys)
-    delta_std = 0.0  # quiero la máxima delta_std
-    # para cada exp_setup
-    for interes_anual in np.linspace(0, 10, 11):
-        for b in range(5):
-            # recorrer las seeds
-            costos_totales = []
-            costos_financi = []
-            for seed_key in seed_keys:
-                try:
-                    costo_total = exp_dict[seed_key][str(interes_anual)][str(b)][0]
-                    costo_financiero = exp_dict[seed_key][str(interes_anual)][str(b)][1]
-                    
-                    # Verificar que los valores no sean None o inválidos
-                    if costo_total is not None and costo_financiero is not None:
-                        costos_totales.append(costo_total)
-                        costos_financi.append(costo_financiero)
-                except (KeyError, IndexError, TypeError):
-                    # Skip si hay estructura incompleta o valores inválidos
-                    continue
-            # Need at least 2 data points to calculate delta_std
-            if len(costos_totales) < 3:
-                continue
-            # calcular las std
-            std_total_last = np.std(costos_totales)
-            std_finan_last = np.std(costos_financi)
-            std_total_prev = np.std(costos_totales[:-1])
-            std_finan_prev = np.std(costos_financi[:-1])
-            # ver la variación porcentual
-            if std_total_last == 0 or std_total_prev == 0:
-                delta_std_total = 0.0
-            else:
-                delta_std_total = np.abs((std_total_last-std_total_prev)/std_total_last)
-            if std_finan_last == 0 or std_finan_prev == 0:
-                delta_std_finan = 0.0
-            else:
-                delta_std_finan = np.abs((std_finan_last-std_finan_prev)/std_finan_last)
-            current_delta_std = max(delta_std_total, delta_std_finan)
-            delta_std = max(current_delta_std, delta_std)
-    return delta_std
+    meta = exp_dict.get('_meta', {})
+    stats = None
+    if 'running_stats' in meta:
+        try:
+            stats = RunningStats.from_dict(meta['running_stats'])
+        except (KeyError, TypeError, ValueError):
+            stats = None
+    if (stats is None or stats.n_seeds > len(seed_keys) or stats.n_buzones != len(BUZONES_SIZES)
+            or not np.allclose(stats.intereses, INTERESES_ANUALES)):
+        stats = RunningStats(INTERESES_ANUALES, len(BUZONES_SIZES))
+    for seed_key in seed_keys[stats.n_seeds:]:
+        stats.add_seed(exp_dict[seed_key])
+    if '_meta' in exp_dict:
+        exp_dict['_meta']['running_stats'] = stats.to_dict()
+    return stats
+
+
+def reporte_memoria(exp_dict, rutas, dias_habiles, formulation='standard', big_m='tight', linking='aggregated', presolve=False):
+    # Reporte de memoria de una corrida con instrumentar='memoria' (ver agregar_resultados):
+    # tamaño de la instancia (sucursales, días, rutas y filas, columnas y no nulos del
+    # modelo), por fase el mayor pico de tracemalloc y de RSS y las líneas con más memoria
+    # asignada de los registros de exp_dict['_meta']['instrumentacion'] (celdas y
+    # guardados, de todos los procesos), el pico de RSS del proceso y los bytes del JSON.
+    import json
+    rutas = np.asarray(rutas, dtype=float)
+    dias_habiles = np.asarray(dias_habiles, dtype=float)
+    plantilla = template.get_template(rutas, dias_habiles, formulation=formulation, big_m=big_m, linking=linking, presolve=presolve)
+    filas, columnas = plantilla.arrays.shape
+    total = {}
+    registros = exp_dict.get('_meta', {}).get('instrumentacion', [])
+    for registro in registros:
+        instrument.acumular(total, registro)
+    return {
+        'tamaño': {'sucursales': rutas.shape[1], 'dias': dias_habiles.shape[1], 'rutas': rutas.shape[0],
+                   'filas': filas, 'columnas': columnas, 'no_nulos': int(plantilla.arrays.A.nnz)},
+        'seeds': len(exp_dict) - 1,
+        'registros': len(registros),
+        'rss_pico_proceso': instrument.rss_pico(),
+        'json_bytes': len(json.dumps(exp_dict)),
+        'fases': {nombre: {'segundos': segundos, 'llamadas': llamadas,
+                           'pico_bytes': total.get('picos', {}).get(nombre),
+                           'rss_bytes': total.get('rss', {}).get(nombre),
+                           'sitios': total.get('sitios', {}).get(nombre, [])}
+                  for nombre, (segundos, llamadas) in total.get('timers', {}).items()},
+    }
+
+
+def celdas_abiertas(exp_dict, ic_rel):
+    # Celdas (intereses x buzones) cuyo intervalo de confianza del 95% de la media (costo
+    # total y financiero) tiene un semiancho relativo mayor a ic_rel, con las estadísticas
+    # acumuladas (ver stats.RunningStats.abiertas). Devuelve (abiertas, semiancho máximo).
+    stats = actualizar_estadisticas(exp_dict)
+    semiancho = stats.semiancho_relativo()[stats.n >= 3]
+    return stats.abiertas(ic_rel), float(semiancho.max()) if semiancho.size else 0.0
+
+
+def umbrales(exp_dict):
+    # Umbrales del análisis paramétrico (semillas x buzones, tasa anual en %) desde los que
+    # el plan financiero le gana al logístico: inf si el logístico es óptimo en todo el
+    # rango, NaN si la cadena no tiene análisis (ver agregar_resultados con parametrico).
+    seed_keys = [k for k in exp_dict.keys() if k != '_meta']
+    valores = np.full((len(seed_keys), len(BUZONES_SIZES)), np.nan)
+    for i, seed_key in enumerate(seed_keys):
+        for buzon, analisis in exp_dict[seed_key].get('_parametrico', {}).items():
+            valores[i, int(buzon)] = np.inf if analisis['umbral'] is None else analisis['umbral']
+    return valores
+
+
+def calcula_delta_std(exp_dict):
+    # Máxima variación relativa del desvío estándar (costo total y financiero, sobre las
+    # celdas con al menos 3 semillas) al agregar la última semilla. O(celdas) por llamada
+    # con las estadísticas acumuladas (ver actualizar_estadisticas).
+    return actualizar_estadisticas(exp_dict).delta_std()
 
 # From previous main/helpers.py: Excel-to-CSV generator
 def generate_csvs(excel_df, sheet_name, data_dir="./data"):
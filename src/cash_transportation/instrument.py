@@ -0,0 +1,282 @@
+"""
+Instrumentación liviana: temporizadores y contadores con nombre.
+
+    from cash_transportation import instrument
+    instrument.enable()                      # memoria=True agrega picos de tracemalloc
+    with instrument.timer('armar_pulp'):
+        ...
+    instrument.count('resoluciones')
+    instrument.snapshot()  # {'timers': {nombre: [segundos, llamadas]}, 'counters': {...}, 'picos': {...}}
+
+Deshabilitada (por defecto) timer() devuelve un context manager vacío compartido y
+count() vuelve enseguida: en el camino caliente cuesta una llamada y una comparación.
+
+Con memoria=True cada timer registra en 'picos' el máximo de bytes asignados por encima
+de lo que había al entrar (tracemalloc, bastante más lento: solo para perfilar) y en
+'rss' el pico de memoria residente del proceso durante el timer, que incluye lo que
+reservan los solvers en C. En Linux el pico se reinicia al entrar a cada timer
+(/proc/self/clear_refs); si no se puede, es el pico del proceso hasta la salida. Los
+timers anidados se descuentan bien: el pico de un timer incluye el de los de adentro.
+Con sitios=N además se guardan en 'sitios' las N líneas de código que más memoria
+dejaron asignada al salir de cada timer (comparando snapshots de tracemalloc, mucho más
+lento).
+
+medir() separa lo medido en un bloque (por ejemplo una celda) de lo acumulado afuera,
+que igual lo incluye:
+
+    with instrument.medir() as medicion:
+        ...
+    medicion.datos  # snapshot del bloque ({} si está deshabilitada)
+"""
+import os
+import sys
+import time
+import tracemalloc
+
+# sitios por defecto (para los procesos hijos, ver enable)
+ENV_SITIOS = 'CASH_INSTRUMENT_SITIOS'
+
+_activo = False
+_memoria = False
+_sitios = 0
+_timers = {}
+_counters = {}
+_picos = {}
+_rss = {}
+_lineas = {}
+# por cada timer abierto (con memoria): [pico de tracemalloc, pico de RSS] de los timers de adentro ya cerrados
+_pila = []
+_reiniciar_rss = sys.platform.startswith('linux')
+
+
+def rss_pico():
+    """Pico de memoria residente del proceso en bytes (desde el inicio o el último reinicio)."""
+    try:
+        with open('/proc/self/status', 'rb') as f:
+            for linea in f:
+                if linea.startswith(b'VmHWM:'):
+                    return int(linea.split()[1]) * 1024
+    except OSError:
+        pass
+    import resource
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kB en Linux, bytes en macOS
+    return pico if sys.platform == 'darwin' else pico * 1024
+
+
+def _reiniciar_pico_rss():
+    global _reiniciar_rss
+    if _reiniciar_rss:
+        try:
+            with open('/proc/self/clear_refs', 'w') as f:
+                f.write('5')
+        except OSError:
+            _reiniciar_rss = False
+
+
+def _foto():
+    # sin las asignaciones del propio tracemalloc
+    return tracemalloc.take_snapshot().filter_traces((tracemalloc.Filter(False, tracemalloc.__file__),))
+
+
+def _sitio(stat):
+    frame = stat.traceback[0]
+    partes = frame.filename.replace(os.sep, '/').split('/')
+    return f"{'/'.join(partes[-2:])}:{frame.lineno}"
+
+
+class _Nulo:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULO = _Nulo()
+
+
+class _Timer:
+    __slots__ = ('nombre', 'inicio', 'base', 'foto')
+
+    def __init__(self, nombre):
+        self.nombre = nombre
+
+    def __enter__(self):
+        if _memoria:
+            self.foto = _foto() if _sitios else None
+            actual, pico = tracemalloc.get_traced_memory()
+            if _pila:
+                # reiniciar los picos borra los del timer de afuera: se guardan antes
+                _pila[-1][0] = max(_pila[-1][0], pico)
+                _pila[-1][1] = max(_pila[-1][1], rss_pico())
+            tracemalloc.reset_peak()
+            _reiniciar_pico_rss()
+            _pila.append([0, 0])
+            self.base = actual
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        segundos = time.perf_counter() - self.inicio
+        acumulado = _timers.get(self.nombre)
+        if acumulado is None:
+            _timers[self.nombre] = [segundos, 1]
+        else:
+            acumulado[0] += segundos
+            acumulado[1] += 1
+        if _memoria and _pila:
+            adentro = _pila.pop()
+            pico = max(adentro[0], tracemalloc.get_traced_memory()[1])
+            rss = max(adentro[1], rss_pico())
+            if _pila:
+                _pila[-1][0] = max(_pila[-1][0], pico)
+                _pila[-1][1] = max(_pila[-1][1], rss)
+            _picos[self.nombre] = max(_picos.get(self.nombre, 0), pico - self.base)
+            _rss[self.nombre] = max(_rss.get(self.nombre, 0), rss)
+            if self.foto is not None:
+                lineas = _lineas.setdefault(self.nombre, {})
+                for stat in _foto().compare_to(self.foto, 'lineno')[:_sitios]:
+                    if stat.size_diff > 0:
+                        sitio = _sitio(stat)
+                        lineas[sitio] = max(lineas.get(sitio, 0), stat.size_diff)
+        return False
+
+
+def enable(memoria=False, sitios=None):
+    """
+    Habilita la instrumentación. memoria: picos de tracemalloc y de RSS por timer;
+    sitios: cantidad de líneas con más memoria asignada a guardar por timer (implica
+    memoria; None = variable de entorno CASH_INSTRUMENT_SITIOS o 0).
+    """
+    global _activo, _memoria, _sitios
+    _activo = True
+    _sitios = int(os.environ.get(ENV_SITIOS, 0)) if sitios is None else int(sitios)
+    _memoria = bool(memoria) or _sitios > 0
+    if _memoria and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def disable():
+    global _activo, _memoria, _sitios
+    if _memoria and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    _activo = False
+    _memoria = False
+    _sitios = 0
+    _pila.clear()
+
+
+def enabled():
+    return _activo
+
+
+def reset():
+    """Borra lo acumulado (no cambia si está habilitada)."""
+    _timers.clear()
+    _counters.clear()
+    _picos.clear()
+    _rss.clear()
+    _lineas.clear()
+
+
+def timer(nombre):
+    """Context manager que suma los segundos (y las llamadas) del bloque a nombre."""
+    if not _activo:
+        return _NULO
+    return _Timer(nombre)
+
+
+def count(nombre, n=1):
+    """Suma n al contador nombre."""
+    if _activo:
+        _counters[nombre] = _counters.get(nombre, 0) + n
+
+
+def snapshot():
+    """Copia de lo acumulado: {'timers', 'counters'[, 'picos', 'rss'[, 'sitios']]} ({} si está deshabilitada)."""
+    if not _activo:
+        return {}
+    datos = {'timers': {nombre: list(valor) for nombre, valor in _timers.items()},
+             'counters': dict(_counters)}
+    if _memoria:
+        datos['picos'] = dict(_picos)
+        datos['rss'] = dict(_rss)
+    if _sitios:
+        datos['sitios'] = {nombre: sorted(lineas.items(), key=lambda item: -item[1])[:_sitios]
+                           for nombre, lineas in _lineas.items()}
+    return datos
+
+
+def acumular(destino, datos):
+    """Suma un snapshot a otro (dict, se modifica): segundos, llamadas y contadores se suman, picos máximo."""
+    for nombre, (segundos, llamadas) in datos.get('timers', {}).items():
+        acumulado = destino.setdefault('timers', {}).setdefault(nombre, [0.0, 0])
+        acumulado[0] += segundos
+        acumulado[1] += llamadas
+    for nombre, n in datos.get('counters', {}).items():
+        destino.setdefault('counters', {})[nombre] = destino.get('counters', {}).get(nombre, 0) + n
+    for campo in ('picos', 'rss'):
+        for nombre, pico in datos.get(campo, {}).items():
+            destino.setdefault(campo, {})[nombre] = max(destino.get(campo, {}).get(nombre, 0), pico)
+    for nombre, lineas in datos.get('sitios', {}).items():
+        sitios = dict(destino.setdefault('sitios', {}).get(nombre, []))
+        for sitio, size in lineas:
+            sitios[sitio] = max(sitios.get(sitio, 0), size)
+        destino['sitios'][nombre] = sorted(sitios.items(), key=lambda item: -item[1])[:max(len(lineas), _sitios)]
+    return destino
+
+
+class medir:
+    """
+    Mide un bloque por separado (ver el comienzo del módulo). Al salir, datos tiene el
+    snapshot del bloque y lo medido se suma a lo acumulado antes de entrar.
+    """
+
+    def __init__(self):
+        self.datos = {}
+        self._afuera = None
+
+    def __enter__(self):
+        global _timers, _counters, _picos, _rss, _lineas
+        if _activo:
+            self._afuera = (_timers, _counters, _picos, _rss, _lineas)
+            _timers, _counters, _picos, _rss, _lineas = {}, {}, {}, {}, {}
+        return self
+
+    def __exit__(self, *exc):
+        global _timers, _counters, _picos, _rss, _lineas
+        if self._afuera is not None:
+            self.datos = snapshot()
+            _timers, _counters, _picos, _rss, _lineas = self._afuera
+            self._afuera = None
+            afuera = {'timers': _timers, 'counters': _counters, 'picos': _picos, 'rss': _rss}
+            for nombre, lineas in self.datos.get('sitios', {}).items():
+                for sitio, size in lineas:
+                    _lineas.setdefault(nombre, {})[sitio] = max(_lineas.get(nombre, {}).get(sitio, 0), size)
+            acumular(afuera, {campo: valor for campo, valor in self.datos.items() if campo != 'sitios'})
+        return False
+
+
+def resumen(datos=None):
+    """Tabla de texto de un snapshot (por defecto lo acumulado), timers de mayor a menor tiempo."""
+    datos = snapshot() if datos is None else datos
+    lineas = []
+    timers = sorted(datos.get('timers', {}).items(), key=lambda item: -item[1][0])
+    picos = datos.get('picos', {})
+    rss = datos.get('rss', {})
+    sitios = datos.get('sitios', {})
+    for nombre, (segundos, llamadas) in timers:
+        linea = f"{nombre:24} {segundos:10.3f} s {llamadas:8d} llamadas"
+        if nombre in picos:
+            linea += f" {picos[nombre] / 2**20:10.1f} MB pico"
+        if nombre in rss:
+            linea += f" {rss[nombre] / 2**20:10.1f} MB RSS"
+        lineas.append(linea)
+        for sitio, size in sitios.get(nombre, [])[:3]:
+            lineas.append(f"    {sitio:56} {size / 2**20:10.2f} MB")
+    for nombre, n in sorted(datos.get('counters', {}).items()):
+        lineas.append(f"{nombre:24} {n:10d}")
+    return '\n'.join(lineas)
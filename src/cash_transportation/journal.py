@@ -0,0 +1,132 @@
+"""
+Bitácora de celdas resueltas (JSONL de solo agregado).
+
+experimento_2 guarda una semilla recién cuando terminan sus 55 celdas: si el proceso se
+corta a mitad de una vuelta se pierde todo lo resuelto en ella. Con la bitácora cada
+celda se agrega como una línea apenas termina (desde el proceso que la resolvió, con
+una sola escritura O_APPEND, por lo que varios procesos pueden compartir el archivo) y
+al volver a empezar agregar_resultados solo resuelve las celdas que faltan.
+
+Línea: {"seed", "interes", "buzon", "celda", "tiempo", "runtime"[, "ahorro"][, "limite"]}
+- celda: Lo que queda en exp_dict[seed][interes][buzon].
+- tiempo: Segundos de la celda; runtime: Segundos invertidos en la celda (con
+  --warm-start audit incluye la resolución sin solución inicial); ahorro: Segundos
+  ahorrados con solución inicial (solo con audit); limite: {"cota", "gap"} si la celda
+  se detuvo por el límite de tiempo.
+
+Con el análisis paramétrico cada cadena (semilla, buzón) agrega antes de sus celdas una
+línea {"seed", "interes": ANALISIS, "buzon", "analisis", "celdas", "tiempo"}:
+- analisis: AnalisisParametrico.to_dict(); celdas: {interes: celda} armadas con los
+  tramos; tiempo: Segundos del análisis.
+Al retomar, el análisis vuelve a exp_dict[seed]['_parametrico'] y las celdas que falten en
+la bitácora salen de esa línea sin volver a resolver.
+
+Las escrituras llegan al sistema operativo en cada celda (sobreviven a que se mate el
+proceso); fsync se hace cada fsync_cada líneas o fsync_segundos segundos y al cerrar,
+para cubrir también un corte del sistema sin pagar un fsync por línea.
+"""
+import json
+import os
+import time
+
+# "interes" de la línea del análisis paramétrico de una cadena
+ANALISIS = '_parametrico'
+
+
+def journal_path(exp_id):
+    """Bitácora correspondiente a un JSON o almacén de experimento."""
+    return exp_id.rstrip(os.sep) + '.journal.jsonl'
+
+
+class Journal:
+    """
+    Bitácora abierta para agregar líneas (se crea si no existe).
+    - fsync_cada: Líneas entre fsync.
+    - fsync_segundos: Segundos máximos entre fsync.
+    """
+
+    def __init__(self, path, fsync_cada=8, fsync_segundos=30.0):
+        self.path = path
+        self.fsync_cada = fsync_cada
+        self.fsync_segundos = fsync_segundos
+        self._fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self._pendientes = 0
+        self._ultimo_fsync = time.time()
+
+    def append(self, seed, interes, buzon, celda, tiempo, runtime, ahorro=None, limite=None):
+        registro = {'seed': int(seed), 'interes': str(interes), 'buzon': int(buzon),
+                    'celda': celda, 'tiempo': tiempo, 'runtime': runtime}
+        if ahorro is not None:
+            registro['ahorro'] = ahorro
+        if limite is not None:
+            registro['limite'] = limite
+        self._escribir(registro)
+
+    def append_analisis(self, seed, buzon, analisis, celdas, tiempo):
+        registro = {'seed': int(seed), 'interes': ANALISIS, 'buzon': int(buzon),
+                    'analisis': analisis, 'celdas': celdas, 'tiempo': tiempo}
+        self._escribir(registro)
+
+    def _escribir(self, registro):
+        os.write(self._fd, (json.dumps(registro) + '\n').encode('utf-8'))
+        self._pendientes += 1
+        if self._pendientes >= self.fsync_cada or time.time() - self._ultimo_fsync >= self.fsync_segundos:
+            self.sync()
+
+    def sync(self):
+        if self._pendientes:
+            os.fsync(self._fd)
+            self._pendientes = 0
+        self._ultimo_fsync = time.time()
+
+    def close(self):
+        if self._fd is not None:
+            self.sync()
+            os.close(self._fd)
+            self._fd = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def leer_journal(path, desde_seed=0):
+    """
+    Celdas de la bitácora con seed >= desde_seed: dict (seed, buzon) -> {interes: registro}
+    (el análisis paramétrico de la cadena, si está, con interes ANALISIS).
+    Las líneas incompletas o dañadas (corte en medio de una escritura) se ignoran; si una
+    celda aparece más de una vez vale la última.
+    """
+    hechas = {}
+    if not os.path.exists(path):
+        return hechas
+    with open(path, 'r', encoding='utf-8') as f:
+        for linea in f:
+            try:
+                registro = json.loads(linea)
+                seed, buzon, interes = int(registro['seed']), int(registro['buzon']), registro['interes']
+            except (ValueError, KeyError, TypeError):
+                continue
+            if seed >= desde_seed:
+                hechas.setdefault((seed, buzon), {})[interes] = registro
+    return hechas
+
+
+def compactar_journal(path, desde_seed):
+    """
+    Deja en la bitácora solo las celdas con seed >= desde_seed (las anteriores ya están
+    guardadas en el experimento). Se llama entre vueltas, sin procesos escribiendo.
+    """
+    if not os.path.exists(path):
+        return
+    hechas = leer_journal(path, desde_seed)
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        for registros in hechas.values():
+            for registro in registros.values():
+                f.write(json.dumps(registro) + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
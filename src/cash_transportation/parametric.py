@@ -0,0 +1,195 @@
+"""
+Análisis paramétrico exacto en la tasa de interés.
+
+Para un cronograma fijo el objetivo del modelo es costo logístico + tasa diaria x
+efectivo inmovilizado (e0 + e de los días 0..n_d-2, ver result.SolveResult), una recta
+en la tasa. El costo óptimo V(tasa) es el mínimo de esas rectas: cóncavo y lineal por
+tramos, con un cronograma óptimo en cada tramo. En lugar de resolver en una grilla de
+tasas, analisis_parametrico encuentra los quiebres exactos con el método de Eisner y
+Severance: resuelve en los extremos del rango, en la intersección de las rectas de los
+dos cronogramas, y si ahí no hay nada mejor la intersección es un quiebre; si hay, se
+repite a cada lado con el cronograma nuevo. Con k tramos son 2k - 1 resoluciones.
+
+    analisis = analisis_parametrico(plantilla, tasa_diaria(0), tasa_diaria(10), solver='cbc')
+    analisis.quiebres          # tasas diarias donde cambia el cronograma óptimo
+    analisis.umbral            # desde dónde el plan financiero le gana al logístico (None = en todo el rango no)
+    analisis.tramo(tasa)       # Tramo con el cronograma óptimo (resultado.x) y su recta
+    analisis.to_dict()         # tasas anuales en %, para guardar en el JSON
+
+El plan logístico es el del primer tramo: el de menor costo logístico y, entre esos, el
+de menor efectivo inmovilizado (con tasa 0 el solver puede devolver cualquiera de ellos;
+calculo_ganancia compara con el que devuelva).
+"""
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from cash_transportation import instrument
+
+ESTADO_OK = 'Resuelto (Óptimo)'
+
+
+def tasa_diaria(interes_anual):
+    """Tasa diaria equivalente a una tasa anual en % (como resolver_celda)."""
+    return (1 + interes_anual/100)**(1/365) - 1
+
+
+def tasa_anual(tasa):
+    """Tasa anual en % equivalente a una tasa diaria (inversa de tasa_diaria)."""
+    return ((1 + tasa)**365 - 1) * 100
+
+
+@dataclass
+class Tramo:
+    """
+    Intervalo de tasas diarias [desde, hasta] con un mismo cronograma óptimo.
+    - logistico, inmovilizado: Recta del cronograma (costo = logistico + tasa * inmovilizado).
+    - resultado: SolveResult del cronograma (sin objetos de PuLP): x, e, t y costos.
+    """
+    desde: float
+    hasta: float
+    logistico: float
+    inmovilizado: float
+    resultado: object = None
+
+    def costo(self, tasa):
+        return self.logistico + tasa * self.inmovilizado
+
+
+@dataclass
+class AnalisisParametrico:
+    """
+    Resultado de analisis_parametrico.
+    - tramos: Tramos en orden de tasa (vacío si estado no es ESTADO_OK).
+    - resoluciones: Cantidad de resoluciones.
+    - estado: ESTADO_OK o el estado de la primera resolución sin óptimo.
+    """
+    tramos: list = field(default_factory=list)
+    resoluciones: int = 0
+    estado: str = ESTADO_OK
+
+    @property
+    def optimo(self):
+        return self.estado == ESTADO_OK and bool(self.tramos)
+
+    @property
+    def quiebres(self):
+        return [tramo.desde for tramo in self.tramos[1:]]
+
+    @property
+    def umbral(self):
+        """Tasa diaria desde la que el plan financiero le gana al logístico (None si no pasa en el rango)."""
+        return self.tramos[1].desde if len(self.tramos) > 1 else None
+
+    def tramo(self, tasa):
+        """Tramo de la tasa (en un quiebre, el de la izquierda; fuera del rango, el del extremo)."""
+        for tramo in self.tramos:
+            if tasa <= tramo.hasta:
+                return tramo
+        return self.tramos[-1]
+
+    def valor(self, tasa):
+        """Costo óptimo V(tasa)."""
+        return self.tramo(tasa).costo(tasa)
+
+    def ganancia(self, tasa):
+        """Ahorro relativo del plan óptimo respecto del logístico a la tasa (como calculo_ganancia)."""
+        logistico = self.tramos[0].costo(tasa)
+        return (logistico - self.valor(tasa)) / logistico
+
+    def to_dict(self):
+        """Quiebres, umbral y tramos con tasas anuales en %, serializable a JSON."""
+        umbral = self.umbral
+        return {
+            'quiebres': [tasa_anual(tasa) for tasa in self.quiebres],
+            'umbral': None if umbral is None else tasa_anual(umbral),
+            'tramos': [{'desde': tasa_anual(tramo.desde), 'hasta': tasa_anual(tramo.hasta),
+                        'logistico': tramo.logistico, 'inmovilizado': tramo.inmovilizado}
+                       for tramo in self.tramos],
+            'resoluciones': self.resoluciones,
+            'estado': self.estado,
+        }
+
+
+def analisis_parametrico(plantilla, tasa_min, tasa_max, solver='cbc', n_thr=4, debug=False, warm_start=False,
+                         pool_seed=None, time_limit=None, gap_rel=None, tol=1e-7, max_resoluciones=64):
+    """
+    Tramos del costo óptimo de plantilla (ver template.ModelTemplate, con los datos ya
+    cargados) entre las tasas diarias tasa_min y tasa_max. Deja la plantilla con la
+    tasa de la última resolución.
+    - warm_start: Arrancar cada resolución desde la solución anterior (el conjunto
+      factible no depende de la tasa); 'heuristic' para arrancar cada una desde la de la
+      heurística (ver ModelTemplate.solve).
+    - pool_seed, time_limit, gap_rel: Como en ModelTemplate.solve. Los quiebres son
+      exactos hasta el gap del solver; si una resolución no llega al óptimo (por ejemplo
+      por time_limit) el análisis se detiene con su estado.
+    - tol: Tolerancia relativa para decidir que la intersección es un quiebre (al menos
+      gap_rel).
+    - max_resoluciones: Tope de resoluciones; al alcanzarlo los intervalos pendientes se
+      toman como quiebres.
+    """
+    tol = max(tol, gap_rel or 0.0)
+    analisis = AnalisisParametrico()
+    inicial = 'heuristic' if warm_start == 'heuristic' else None
+
+    def resolver(tasa):
+        # (tasa, logistico, inmovilizado, resultado) del óptimo a la tasa, None sin óptimo
+        nonlocal inicial
+        with instrument.timer('actualizar'):
+            plantilla.update(rate=tasa)
+        resultado = plantilla.solve(solver=solver, n_thr=n_thr, debug=debug, warm_start=inicial,
+                                    pool_seed=pool_seed, time_limit=time_limit, gap_rel=gap_rel)
+        analisis.resoluciones += 1
+        instrument.count('resoluciones_parametrico')
+        if not resultado.optimal:
+            analisis.estado = resultado.status[0] if resultado.status else 'Sin resultado'
+            return None
+        if warm_start is True:
+            inicial = plantilla.solution()
+        return tasa, resultado.logistic_cost, resultado.idle_cash, resultado.drop_problems()
+
+    izquierda = resolver(tasa_min)
+    if izquierda is None:
+        return analisis
+    rectas = [izquierda]
+    quiebres = []
+    if tasa_max > tasa_min:
+        derecha = resolver(tasa_max)
+        if derecha is None:
+            return analisis
+        rectas.append(derecha)
+        pendientes = [(izquierda, derecha)]
+        while pendientes:
+            a, b = pendientes.pop()
+            if abs(a[2] - b[2]) <= tol * max(abs(a[2]), abs(b[2])):
+                # rectas paralelas: las dos son óptimas en todo [a, b]
+                continue
+            # intersección de las rectas (a tiene más efectivo inmovilizado que b)
+            tasa = (b[1] - a[1]) / (a[2] - b[2])
+            if not a[0] < tasa < b[0] or analisis.resoluciones >= max_resoluciones:
+                quiebres.append(min(max(tasa, a[0]), b[0]))
+                continue
+            nueva = resolver(tasa)
+            if nueva is None:
+                return AnalisisParametrico(resoluciones=analisis.resoluciones, estado=analisis.estado)
+            recta = a[1] + tasa * a[2]
+            if nueva[1] + tasa * nueva[2] >= recta - tol * abs(recta):
+                quiebres.append(tasa)
+                continue
+            rectas.append(nueva)
+            pendientes += [(a, nueva), (nueva, b)]
+
+    # envolvente inferior: en cada intervalo entre quiebres, la recta más baja en el medio
+    bordes = [tasa_min] + sorted(q for q in quiebres if tasa_min < q < tasa_max) + [tasa_max]
+    for desde, hasta in zip(bordes[:-1], bordes[1:]):
+        if hasta <= desde and len(bordes) > 2:
+            continue
+        medio = (desde + hasta) / 2
+        _, logistico, inmovilizado, resultado = min(rectas, key=lambda recta: (recta[1] + medio * recta[2], recta[2]))
+        anterior = analisis.tramos[-1] if analisis.tramos else None
+        if anterior is not None and np.isclose(anterior.costo(hasta), logistico + hasta * inmovilizado, rtol=tol, atol=0.0):
+            # la misma recta (otro cronograma con los mismos costos)
+            anterior.hasta = hasta
+        else:
+            analisis.tramos.append(Tramo(desde, hasta, logistico, inmovilizado, resultado))
+    return analisis
@@ -0,0 +1,112 @@
+"""
+Escenarios aleatorios de recaudación (perfiles C y V de experimento_2).
+
+Cada semilla k es un escenario: recaudaciones (sucursales x días) y efectivo inicial
+(sucursales) con ruido gamma de media 0 sobre el perfil (ver perfil_recaudacion). Con
+Escenarios el ruido de la semilla k sale de su propio stream,
+np.random.SeedSequence(entropia, spawn_key=(k,)), que es el hijo k de
+SeedSequence(entropia).spawn: cualquier semilla se regenera en O(1) sin recorrer las
+anteriores y los procesos del pool reciben streams independientes y deterministas.
+
+    escenarios = Escenarios(collection_profile, std, entropia=0)
+    collections, e_zero = escenarios.lote(range(10, 20))    # (10, s, d), (10, s)
+    recortadas, e_zero_recortado = recortar(collections, e_zero, BUZONES_SIZES)  # (10, 5, s, d), (10, 5, s)
+
+Con entropia=None se usa el generador anterior (np.random.default_rng(k), primero las
+recaudaciones y después el efectivo inicial), con el que se generaron las corridas
+existentes: al retomarlas las semillas nuevas siguen saliendo igual (ver
+helpers.escenarios_corrida).
+"""
+import numpy as np
+
+# desvío por defecto de cada perfil (--std -1 en experimento_2)
+STD_POR_DEFECTO = {'C': .525, 'V': .3444}
+
+
+def perfil_recaudacion(profile, dias_habiles_profile, n_s, V_profile_max=2.0, V_max_day=10, collection_mult=1.0):
+    """
+    Perfil de recaudación (sucursales x días), igual en todas las sucursales y con total
+    collection_mult por sucursal. profile: 'C' (constante en los días hábiles) o 'V'
+    (crece de 1 a V_profile_max hasta el día V_max_day y vuelve a 1).
+    """
+    habiles = np.asarray(dias_habiles_profile, dtype=float)
+    if profile == "C":
+        perfil = habiles / np.sum(habiles)
+    elif profile == "V":
+        n_d = habiles.size
+        perfil = np.hstack([np.linspace(1, V_profile_max, V_max_day-1, endpoint=False),
+                            np.linspace(V_profile_max, 1, n_d-V_max_day+1, endpoint=False)])
+        perfil = perfil * habiles
+        perfil /= np.sum(perfil)
+    else:
+        raise ValueError("Perfil no válido")
+    return np.tile(perfil, (n_s, 1)) * collection_mult
+
+
+class Escenarios:
+    """
+    Generador de escenarios por semilla.
+    - collection_profile: Perfil (sucursales x días); su primera columna es la media del
+      efectivo inicial.
+    - std: Desvío relativo del ruido (gamma de forma 1/std² y media la del primer día,
+      centrado); 0 = sin ruido.
+    - entropia: Entropía de la SeedSequence de la corrida (None = generador anterior).
+    """
+
+    def __init__(self, collection_profile, std, entropia=0):
+        self.collection_profile = np.asarray(collection_profile, dtype=float)
+        self.std = float(std)
+        self.entropia = entropia
+
+    def rng(self, semilla):
+        """Generador de la semilla (O(1): no depende de las otras semillas)."""
+        if self.entropia is None:
+            return np.random.default_rng(seed=semilla)
+        return np.random.default_rng(np.random.SeedSequence(self.entropia, spawn_key=(int(semilla),)))
+
+    def _ruido(self, semilla):
+        # (sucursales x (días + 1)): recaudaciones y, en la última columna, efectivo inicial
+        n_s, n_d = self.collection_profile.shape
+        if self.std == 0:
+            return np.zeros((n_s, n_d + 1))
+        mu = self.collection_profile[0, 0]
+        alpha = 1/(self.std**2)
+        theta = mu/alpha
+        rng = self.rng(semilla)
+        if self.entropia is None:
+            # mismo orden de sorteos que el generador anterior
+            return np.hstack([rng.gamma(alpha, theta, size=(n_s, n_d)), rng.gamma(alpha, theta, size=(n_s, 1))]) - mu
+        return rng.gamma(alpha, theta, size=(n_s, n_d + 1)) - mu
+
+    def lote(self, semillas):
+        """
+        Escenarios (sin recortar) de varias semillas: (collections, e_zero) de forma
+        (semillas x sucursales x días) y (semillas x sucursales).
+        """
+        semillas = list(semillas)
+        n_s, n_d = self.collection_profile.shape
+        ruido = np.empty((len(semillas), n_s, n_d + 1))
+        for i, semilla in enumerate(semillas):
+            ruido[i] = self._ruido(semilla)
+        collections = self.collection_profile[None] + ruido[..., :n_d]
+        e_zero = self.collection_profile[None, :, 0] + ruido[..., n_d]
+        return collections, e_zero
+
+    def semilla(self, semilla):
+        """(collections, e_zero) de una semilla."""
+        collections, e_zero = self.lote([semilla])
+        return collections[0], e_zero[0]
+
+
+def recortar(collections, e_zero, buzones):
+    """
+    Recaudaciones y efectivo inicial recortados a [0, buzón] para todos los buzones a la
+    vez: agrega un eje de buzones después del de semillas ((..., buzones, sucursales, días)
+    y (..., buzones, sucursales)).
+    """
+    buzones = np.asarray(buzones, dtype=float)
+    collections = np.asarray(collections, dtype=float)
+    e_zero = np.asarray(e_zero, dtype=float)
+    tope = buzones[:, None, None]
+    return (np.clip(collections[..., None, :, :], 0.0, tope),
+            np.clip(e_zero[..., None, :], 0.0, buzones[:, None]))
@@ -0,0 +1,214 @@
+"""
+Cache en disco de resoluciones, direccionado por contenido.
+
+Las mismas instancias se resuelven una y otra vez (perfiles con std=0, corridas
+repetidas de data/experiments.csv, el caso de interés 0 en calculo_ganancia). La
+llave de cada resolución es un hash (SHA-256) de una codificación canónica de todos
+los datos del modelo (arrays, tasa, buzones), del solver y de las opciones; el valor
+es un .npz con los arrays de la solución y un JSON con el estado y los costos.
+
+- Cada entrada se escribe en un archivo temporal y se renombra: varios procesos
+  pueden compartir el directorio.
+- LRU: cada acierto actualiza la fecha de modificación del archivo; cuando el
+  directorio supera max_bytes se borran las entradas más viejas hasta bajar al 90%.
+- Por defecto no hay cache. set_solve_cache(directorio) lo activa para el proceso y
+  para los procesos hijos (variable de entorno CASH_SOLVE_CACHE); model_problem_arrays
+  y ModelTemplate.solve lo consultan antes de llamar al solver.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import zipfile
+
+import numpy as np
+
+from .result import SolveResult
+
+# cambiar si cambia el significado de las entradas (invalida el cache anterior)
+CACHE_VERSION = 1
+DEFAULT_MAX_BYTES = 512 * 2**20
+ENV_DIR = 'CASH_SOLVE_CACHE'
+ENV_MAX_BYTES = 'CASH_SOLVE_CACHE_MAX_BYTES'
+
+_DEFAULT = None
+
+
+def _update(h, value):
+    # codificación canónica: tipo, largo y contenido de cada valor
+    if isinstance(value, dict):
+        h.update(b'd%d;' % len(value))
+        for key in sorted(value):
+            _update(h, str(key))
+            _update(h, value[key])
+    elif isinstance(value, (list, tuple)):
+        h.update(b'l%d;' % len(value))
+        for item in value:
+            _update(h, item)
+    elif isinstance(value, np.ndarray):
+        array = np.ascontiguousarray(value, dtype=float)
+        h.update(b'a' + repr(array.shape).encode() + b';')
+        h.update(array.tobytes())
+    elif isinstance(value, str):
+        data = value.encode('utf-8')
+        h.update(b's%d;' % len(data) + data)
+    elif value is None or isinstance(value, (bool, np.bool_)):
+        h.update(b'c' + repr(None if value is None else bool(value)).encode() + b';')
+    elif isinstance(value, (int, np.integer)):
+        h.update(b'i' + repr(int(value)).encode() + b';')
+    elif isinstance(value, (float, np.floating)):
+        h.update(b'f' + float(value).hex().encode() + b';')
+    else:
+        raise TypeError(f"Valor no soportado en la llave del cache: {type(value)}")
+
+
+def cache_key(**inputs):
+    """Hash (hex) de los datos con nombre, independiente del orden de los argumentos."""
+    h = hashlib.sha256()
+    _update(h, {'_version': CACHE_VERSION, **inputs})
+    return h.hexdigest()
+
+
+class SolveCache:
+    """
+    Cache en el directorio directory (se crea si no existe), de a lo sumo max_bytes.
+    hits y misses cuentan los accesos de este proceso.
+    """
+
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = int(max_bytes)
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+        self._size = sum(size for _, size, _ in self._entries())
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + '.npz')
+
+    def _entries(self):
+        # (fecha de modificación, tamaño, ruta) de cada entrada
+        entries = []
+        for sub in os.scandir(self.directory):
+            if not sub.is_dir():
+                continue
+            for entry in os.scandir(sub.path):
+                if entry.name.endswith('.npz'):
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def get(self, key):
+        """(arrays, meta) de la entrada, o None si no está (o está dañada)."""
+        path = self._path(key)
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                arrays = {name: data[name] for name in data.files if name != '_meta'}
+                meta = json.loads(str(data['_meta']))
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+            # entrada a medio escribir por otro proceso o dañada: se descarta
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            self.misses += 1
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self.hits += 1
+        return arrays, meta
+
+    def put(self, key, arrays, meta):
+        """Guarda la entrada (arrays de NumPy y meta serializable a JSON)."""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez_compressed(f, _meta=np.array(json.dumps(meta)), **arrays)
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        self._size += os.path.getsize(path)
+        if self._size > self.max_bytes:
+            self.evict()
+
+    def evict(self, target=None):
+        """Borra las entradas usadas hace más tiempo hasta quedar en target bytes (90% de max_bytes)."""
+        target = int(0.9 * self.max_bytes) if target is None else target
+        entries = sorted(self._entries())
+        size = sum(size for _, size, _ in entries)
+        for _, entry_size, path in entries:
+            if size <= target:
+                break
+            try:
+                os.remove(path)
+                size -= entry_size
+            except FileNotFoundError:
+                size -= entry_size
+        self._size = size
+
+    def clear(self):
+        self.evict(target=0)
+
+    def get_result(self, key):
+        """SolveResult guardado con put_result, o None (sin objetos de PuLP)."""
+        entry = self.get(key)
+        if entry is None:
+            return None
+        arrays, meta = entry
+        return SolveResult(
+            status=meta['status'], x=arrays['x'], e=arrays['e'], t=arrays['t'], objective=meta['objective'],
+            logistic_cost=meta['logistic_cost'], idle_cash=meta['idle_cash'], financial_cost=meta['financial_cost'],
+            bound=meta.get('bound'), gap=meta.get('gap'))
+
+    def put_result(self, key, result):
+        self.put(key, {'x': result.x, 'e': result.e, 't': result.t}, {
+            'status': list(result.status), 'objective': result.objective, 'logistic_cost': result.logistic_cost,
+            'idle_cash': result.idle_cash, 'financial_cost': result.financial_cost,
+            'bound': result.bound, 'gap': result.gap})
+
+
+def set_solve_cache(directory=None, max_bytes=DEFAULT_MAX_BYTES):
+    """
+    Activa el cache por defecto en directory (None lo desactiva) para este proceso y
+    los procesos que se creen después. Devuelve el SolveCache (o None).
+    """
+    global _DEFAULT
+    if directory is None:
+        _DEFAULT = None
+        os.environ.pop(ENV_DIR, None)
+        os.environ.pop(ENV_MAX_BYTES, None)
+        return None
+    _DEFAULT = SolveCache(directory, max_bytes)
+    os.environ[ENV_DIR] = os.path.abspath(directory)
+    os.environ[ENV_MAX_BYTES] = str(int(max_bytes))
+    return _DEFAULT
+
+
+def get_solve_cache(cache=None):
+    """
+    Cache a usar: cache si se pasa un SolveCache, None si cache es False, y si no el
+    cache por defecto (set_solve_cache o la variable de entorno CASH_SOLVE_CACHE).
+    """
+    global _DEFAULT
+    if cache is False:
+        return None
+    if cache is not None:
+        return cache
+    directory = os.environ.get(ENV_DIR)
+    if directory and (_DEFAULT is None or os.path.abspath(_DEFAULT.directory) != directory):
+        _DEFAULT = SolveCache(directory, int(os.environ.get(ENV_MAX_BYTES, DEFAULT_MAX_BYTES)))
+    elif not directory:
+        _DEFAULT = None
+    return _DEFAULT
@@ -0,0 +1,184 @@
+"""
+Programación dinámica exacta para instancias separables con una ruta por sucursal.
+
+Con una sola ruta por sucursal el problema de cada sucursal es de una dimensión: hay
+que elegir los días de retiro. Dado el conjunto de días de retiro, lo óptimo es retirar
+lo máximo posible en cada uno: si W[d] es el retiro acumulado hasta el día d, el
+efectivo es e[d] = e0 + R[d] - W[d] (R = recaudación acumulada), las restricciones
+t[d] <= e[d-1] y e[d] >= 0 acotan W[d] <= U[d] = e0 + min(R[d-1], R[d]) y, como W no
+decrece, un retiro en el día k deja W = min <j >= k> U[j] sin importar los retiros
+anteriores. Con recaudaciones no negativas esto es retirar todo lo acumulado.
+
+El estado de la programación dinámica es el día del último retiro (más un indicador de
+si ya se pasó por algún día obligatorio), lo que da O(n_d²) transiciones por sucursal.
+"""
+import numpy as np
+import pulp
+
+# Tolerancia relativa para la capacidad del buzón y la no negatividad del efectivo
+_TOL = 1e-9
+
+
+def dp_branch(cost, e0, box, business_days, collection, last_days_collection=(), daily_interest_rate=0.0):
+    """
+    Resuelve una sucursal con una sola ruta que pasa por ella.
+    - cost: Costo de tomar la ruta.
+    - e0: Efectivo inicial.
+    - box: Efectivo máximo (ya incluido el porcentaje extra).
+    - business_days: Vector (días), 1 si el día es hábil para la ruta.
+    - collection: Vector (días) con la recaudación de cada día.
+    - last_days_collection: Días de los cuales al menos uno debe tener retiro.
+    - daily_interest_rate: Tasa diaria de interés.
+    Devuelve (factible, x, e, t, objetivo) con x, e, t vectores por día.
+    """
+    r = np.asarray(collection, dtype=float).reshape(-1)
+    n_d = r.size
+    allowed = np.asarray(business_days, dtype=float).reshape(-1)[:n_d] >= 1.0
+    mandatory = np.zeros(n_d, dtype=bool)
+    mandatory[np.asarray(list(last_days_collection), dtype=int)] = True
+    tol = _TOL * max(1.0, abs(box))
+
+    # level[d]: efectivo al final del día d si nunca se retira
+    level = e0 + np.cumsum(r)
+    previous = np.concatenate(([e0], level[:-1]))
+    cap = np.minimum.accumulate(np.minimum(previous, level)[::-1])[::-1]
+    if cap[0] < -tol:
+        return False, None, None, None, None
+    # Estado 0: sin retiros todavía. Estado k+1: último retiro el día k
+    start = np.concatenate(([0], np.arange(n_d)))
+    withdrawn = np.concatenate(([0.0], np.maximum(cap, 0.0)))
+
+    # Sumas acumuladas para el costo financiero (solo d < n_d-1) de un tramo [start, end)
+    weight = np.ones(n_d)
+    weight[-1] = 0.0
+    cum_level = np.concatenate(([0.0], np.cumsum(weight * level)))
+    cum_weight = np.concatenate(([0.0], np.cumsum(weight)))
+    # Máximo de level en [s, e] para s <= e (para controlar el buzón)
+    days = np.arange(n_d)
+    run_max = np.maximum.accumulate(np.where(days[None, :] >= days[:, None], level[None, :], -np.inf), axis=1)
+
+    def segment(states, end):
+        # costo financiero y factibilidad del tramo de cada estado hasta el día end (excluido)
+        s = start[states]
+        seg_cost = daily_interest_rate * ((cum_level[end] - cum_level[s]) - withdrawn[states] * (cum_weight[end] - cum_weight[s]))
+        top = np.where(end > s, run_max[s, max(end - 1, 0)], -np.inf)
+        return seg_cost, top - withdrawn[states] <= box + tol
+
+    # F[estado, f]: mínimo costo hasta el último retiro, f = 1 si ya se cumplió un día obligatorio
+    first_flag = 0 if mandatory.any() else 1
+    F = np.full((n_d + 1, 2), np.inf)
+    F[0, first_flag] = 0.0
+    pred = np.full((n_d + 1, 2, 2), -1, dtype=int)
+    for k in range(n_d):
+        if not allowed[k]:
+            continue
+        states = np.arange(k + 1)
+        seg_cost, feasible = segment(states, k)
+        for f in (0, 1):
+            cand = np.where(feasible, F[states, f] + seg_cost, np.inf)
+            best = int(np.argmin(cand))
+            new_f = 1 if mandatory[k] else f
+            if cand[best] + cost < F[k + 1, new_f]:
+                F[k + 1, new_f] = cand[best] + cost
+                pred[k + 1, new_f] = (best, f)
+
+    states = np.arange(n_d + 1)
+    seg_cost, feasible = segment(states, n_d)
+    total = np.where(feasible, F[:, 1] + seg_cost, np.inf)
+    last = int(np.argmin(total))
+    if not np.isfinite(total[last]):
+        return False, None, None, None, None
+
+    # Reconstrucción de los días de retiro
+    x = np.zeros(n_d)
+    state, f = last, 1
+    while state > 0:
+        x[state - 1] = 1.0
+        state, f = pred[state, f]
+    W = np.maximum.accumulate(np.where(x > 0, withdrawn[1:], 0.0))
+    t = np.diff(np.concatenate(([0.0], W)))
+    e = level - W
+    objective = cost * x.sum() + daily_interest_rate * (e0 + e[:-1].sum())
+    return True, x, e, t, objective
+
+
+def dp_solution(
+    route_branches, cost_routes, cash_in_branch, box_amounts, business_days, collection,
+    last_days_collection=(), extra_box_percent=0.0, daily_interest_rate=0.0, big_m=None):
+    """
+    Resuelve una instancia separable (matriz de rutas diagonal, ruta p = sucursal p) con
+    programación dinámica. Mismos datos que model_problem_arrays.
+    Devuelve (lp_status, x, e, t) con x (días x rutas), e (sucursales x días) y
+    t (sucursales x días x rutas), o None si la instancia no es de este tipo (matriz no
+    diagonal, alguna sucursal sin ruta o costos negativos) y hay que usar el MIP.
+    """
+    m = np.atleast_2d(np.asarray(route_branches, dtype=float))
+    n_p, n_s = m.shape
+    cost = np.asarray(cost_routes, dtype=float).reshape(-1)[:n_p]
+    if n_p != n_s or not np.array_equal(m, np.eye(n_s)) or np.any(cost < 0):
+        return None
+    e0 = np.asarray(cash_in_branch, dtype=float).reshape(-1)[:n_s]
+    box = np.asarray(box_amounts, dtype=float).reshape(-1)[:n_s] * (1.0 + extra_box_percent)
+    r = np.atleast_2d(np.asarray(collection, dtype=float))[:n_s]
+    n_d = r.shape[1]
+    h = np.atleast_2d(np.asarray(business_days, dtype=float))[:n_p, :n_d]
+
+    x = np.zeros((n_d, n_p))
+    e = np.zeros((n_s, n_d))
+    t = np.zeros((n_s, n_d, n_p))
+    for s in range(n_s):
+        feasible, x_s, e_s, t_s, _ = dp_branch(
+            cost[s], e0[s], box[s], h[s], r[s], last_days_collection, daily_interest_rate)
+        if not feasible:
+            return pulp.LpStatusInfeasible, None, None, None
+        if big_m is not None and t_s.max(initial=0.0) > big_m:
+            return None
+        x[:, s], e[s], t[s, :, s] = x_s, e_s, t_s
+    return pulp.LpStatusOptimal, x, e, t
+
+
+def solution_values(arrays, x, e, t):
+    """
+    Valores de las columnas de ModelArrays (matrix.py) para una solución densa (x, e, t),
+    por ejemplo para usarla como solución inicial del MIP (ver template.py).
+    """
+    values = np.zeros(arrays.A.shape[1])
+    reduction = arrays.reduction
+    if reduction is not None:
+        # modelo con presolve: solo los días que empiezan un paso y las rutas que quedan
+        steps, routes = reduction.steps, reduction.routes
+        x, e, t = x[np.ix_(steps, routes)], e[:, steps], t[:, steps][:, :, routes]
+    for cols, dense in ((arrays.x_cols, x), (arrays.e_cols, e), (arrays.t_cols, t)):
+        # en la formulación compacta no existen e ni las t fuera de ruta (columna -1)
+        mask = cols >= 0
+        values[cols[mask]] = dense[mask]
+    return values
+
+
+def solution_outcome(arrays, lp_status, x=None, e=None, t=None, sol_status=None):
+    """
+    (lp_status, sol_status, values) de una solución obtenida sin solver, como quedarían
+    en PuLP después de assign_solution; values por columna de ModelArrays (NaN si no
+    hay solución).
+    """
+    if sol_status is None:
+        sol_status = pulp.LpStatusToSolution.get(lp_status, pulp.LpSolutionNoSolutionFound)
+    if lp_status != pulp.LpStatusOptimal:
+        return lp_status, sol_status, np.full(arrays.A.shape[1], np.nan)
+    return lp_status, sol_status, solution_values(arrays, x, e, t)
+
+
+def assign_solution(problem, variables, arrays, lp_status, x=None, e=None, t=None, sol_status=None):
+    """
+    Carga en el problema de PuLP (armado con to_pulp) el estado y los valores de una
+    solución obtenida sin solver, para que se lea igual que una resolución del MIP.
+    - sol_status: Estado de la solución de PuLP (LpSolutionIntegerFeasible para una
+      solución factible sin garantía de optimalidad, ver heuristic.py).
+    """
+    problem.assignStatus(lp_status, sol_status)
+    if lp_status != pulp.LpStatusOptimal:
+        return problem
+    values = solution_values(arrays, x, e, t)
+    for var, value in zip(variables, values.tolist()):
+        var.varValue = value
+    return problem
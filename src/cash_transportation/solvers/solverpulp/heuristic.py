@@ -0,0 +1,364 @@
+"""
+Heurística de cronogramas: evaluación vectorizada, construcción golosa y búsqueda local.
+
+Dado el cronograma x[d,p], el efectivo queda determinado: en un día con retiro lo
+óptimo es retirar todo lo posible (ver dp.py), así que si cap[s,k] es lo máximo que se
+puede haber retirado de s hasta un retiro el día k, el retiro acumulado es
+W[s,d] = max <k <= d, s visitada el día k> cap[s,k] y el efectivo e = e0 + R - W (R =
+recaudación acumulada). ScheduleEvaluator calcula eso con sumas y máximos acumulados
+para un lote de cronogramas a la vez (N x días x rutas), junto con el costo (logístico
+más financiero) y la violación de las restricciones (exceso sobre el buzón, efectivo
+negativo y sucursales sin retiro en los días obligatorios).
+
+heuristic_solution arma varios cronogramas en paralelo con una construcción golosa
+aleatorizada (agregar el retiro que más reduce la violación por unidad de costo hasta
+que el cronograma es factible) y los mejora con búsqueda local de mejor mejora sobre
+todos los vecinos a la vez (agregar o quitar un retiro, cambiar uno de lugar o de ruta
+o juntar dos), iterada: se borran los retiros de una ventana de días, se reconstruyen
+y se vuelve a la búsqueda local mientras el mejor cronograma mejore.
+
+Sirve como solver aproximado (solver='heuristic' en model_problem_arrays y las
+plantillas, con estado 'Factible (heurística)') y como solución inicial del MIP
+(warm_start='heuristic', ver template.py). No da cota: la calidad se mide contra el
+MIP con scripts/bench_heuristic.py.
+"""
+import numpy as np
+import pulp
+
+# Tolerancia relativa para la capacidad del buzón y la no negatividad del efectivo
+_TOL = 1e-9
+# Cronogramas evaluados a la vez en la búsqueda local (acota la memoria)
+_LOTE = 4096
+
+HEURISTIC_SOLVERS = ('heuristic',)
+
+
+def is_heuristic(solver):
+    return solver in HEURISTIC_SOLVERS
+
+
+class ScheduleEvaluator:
+    """
+    Evaluador de cronogramas para una instancia. Mismos datos que model_problem_arrays.
+    Los cronogramas son arrays booleanos (..., días x rutas).
+    - routes: Índices de las rutas que se pueden tomar (None = todas); las demás cuentan
+      como no hábiles.
+    """
+
+    def __init__(self, route_branches, cost_routes, cash_in_branch, box_amounts, business_days, collection,
+                 last_days_collection=(), extra_box_percent=0.0, daily_interest_rate=0.0, routes=None):
+        self.m = np.atleast_2d(np.asarray(route_branches, dtype=float))
+        n_p, n_s = self.m.shape
+        self.cost = np.asarray(cost_routes, dtype=float).reshape(-1)[:n_p]
+        self.e0 = np.asarray(cash_in_branch, dtype=float).reshape(-1)[:n_s]
+        self.box = np.asarray(box_amounts, dtype=float).reshape(-1)[:n_s] * (1.0 + extra_box_percent)
+        r = np.atleast_2d(np.asarray(collection, dtype=float))[:n_s]
+        self.n_d = r.shape[1]
+        # x[d,p] <= h[p,d]: solo los días hábiles de cada ruta
+        self.allowed = np.atleast_2d(np.asarray(business_days, dtype=float))[:n_p, :self.n_d].T >= 1.0
+        if routes is not None:
+            self.allowed[:, np.setdiff1d(np.arange(n_p), routes)] = False
+        self.mandatory = np.asarray(list(last_days_collection), dtype=int)
+        self.rate = float(daily_interest_rate)
+        self.tol = _TOL * max(1.0, float(np.max(np.abs(self.box), initial=0.0)))
+        # level[d,s]: efectivo al final del día d si nunca se retira; cap[k,s]: retiro
+        # acumulado máximo con un retiro el día k (como en dp_branch). Por día y sucursal
+        # (no al revés) para que los máximos acumulados recorran memoria contigua.
+        level = self.e0[:, None] + np.cumsum(r, axis=1)
+        previous = np.concatenate((self.e0[:, None], level[:, :-1]), axis=1)
+        cap = np.maximum(np.minimum.accumulate(np.minimum(previous, level)[:, ::-1], axis=1)[:, ::-1], 0.0)
+        self.level, self.cap = level.T.copy(), cap.T.copy()
+        # con efectivo negativo sin retirar nada ningún cronograma es factible (e <= level)
+        self.infeasible = bool((level < -self.tol).any())
+        self._m = self.m.astype(np.float32)
+        # peso de un día sin retiro en la violación de los días obligatorios
+        self.penalty = float(max(np.max(self.box, initial=0.0), 1.0))
+
+    @property
+    def shape(self):
+        return self.allowed.shape
+
+    def _cash(self, x):
+        # (visitas, efectivo) por (..., días x sucursales)
+        visited = (np.asarray(x, dtype=bool).astype(np.float32) @ self._m) > 0
+        return visited, self.level - np.maximum.accumulate(visited * self.cap, axis=-2)
+
+    def visited(self, x):
+        """(..., sucursales x días): True si alguna ruta del cronograma pasa por la sucursal ese día."""
+        return np.swapaxes(self._cash(x)[0], -1, -2)
+
+    def cash(self, x):
+        """Efectivo e (..., sucursales x días) retirando todo lo posible en cada visita."""
+        return np.swapaxes(self._cash(x)[1], -1, -2)
+
+    def _scan(self, x, first=False):
+        # recorre los días con arrays (..., sucursales): un máximo acumulado a mano es
+        # bastante más rápido que np.maximum.accumulate sobre el lote entero
+        x = np.asarray(x, dtype=bool)
+        xf = x.astype(np.float32)
+        lead = x.shape[:-2]
+        n_s = self.e0.size
+        withdrawn = np.zeros(lead + (n_s,))
+        excess = np.zeros(lead + (n_s,))
+        idle = np.zeros(lead + (n_s,))
+        first_bad = np.full(lead + (n_s,), self.n_d) if first else None
+        seen = np.zeros(lead + (n_s,), dtype=bool) if self.mandatory.size else None
+        mandatory = set((self.mandatory % self.n_d).tolist())
+        top = self.box + self.tol
+        for d in range(self.n_d):
+            visit = (xf[..., d, :] @ self._m) > 0
+            np.maximum(withdrawn, visit * self.cap[d], out=withdrawn)
+            e = self.level[d] - withdrawn
+            over = e - top
+            excess += np.maximum(over, 0.0)
+            if d < self.n_d - 1:
+                idle += e
+            if first:
+                first_bad[(over > 0) & (first_bad == self.n_d)] = d
+            if d in mandatory:
+                seen |= visit
+        return excess.sum(axis=-1), idle.sum(axis=-1), first_bad, seen
+
+    def evaluate(self, x):
+        """(costo, violación) de cada cronograma (...); factible si la violación es 0."""
+        x = np.asarray(x, dtype=bool)
+        excess, idle, _, seen = self._scan(x)
+        violation = excess + self.penalty * (x & ~self.allowed).sum(axis=(-1, -2))
+        if seen is not None:
+            violation = violation + self.penalty * (~seen).sum(axis=-1)
+        cost = x.sum(axis=-2) @ self.cost + self.rate * (self.e0.sum() + idle)
+        return cost, violation
+
+    def first_violation(self, x):
+        """
+        (..., sucursales): primer día en que se excede el buzón de la sucursal (n_d si
+        nunca). Sin retiro en los días obligatorios, a más tardar el último de ellos.
+        """
+        _, _, first, seen = self._scan(x, first=True)
+        if seen is not None:
+            first = np.where(seen, first, np.minimum(first, self.mandatory.max() % self.n_d))
+        return first
+
+    def solution(self, x):
+        """(x, e, t) densos de un cronograma, con x (días x rutas), e (sucursales x días) y t (sucursales x días x rutas)."""
+        x = np.asarray(x, dtype=bool)
+        visited = self.visited(x)
+        withdrawn = np.maximum.accumulate(visited * self.cap.T, axis=-1)
+        e = self.level.T - withdrawn
+        amount = np.diff(withdrawn, axis=-1, prepend=0.0)
+        # el retiro de cada visita se asigna a la primera ruta del día que pasa por la sucursal
+        on_route = x[None, :, :] & (self.m.T[:, None, :] > 0)
+        first = np.argmax(on_route, axis=-1)
+        t = np.zeros(e.shape + (x.shape[1],))
+        s_idx, d_idx = np.nonzero(visited)
+        t[s_idx, d_idx, first[s_idx, d_idx]] = amount[s_idx, d_idx]
+        return x.astype(float), e, t
+
+
+def greedy(evaluator, n_starts=8, rng=None, x=None):
+    """
+    Construcción golosa hacia adelante de n_starts cronogramas. En cada paso, si d* es el
+    primer día con alguna restricción violada, se agrega el retiro (día <= d*, ruta) que
+    más atrasa la primera violación de cada sucursal (sumado sobre las sucursales) por
+    unidad de costo: se visita lo más tarde posible y se prefieren las rutas que pasan
+    por varias sucursales próximas a llenarse. El primero es determinista; en el resto
+    el puntaje se multiplica por un ruido lognormal. Devuelve un array (n_starts x días
+    x rutas); los cronogramas que no llegan a ser factibles quedan con violación > 0.
+    - x: Cronogramas (n_starts x días x rutas) a completar en lugar de los vacíos.
+    """
+    rng = np.random.default_rng(rng)
+    n_d, n_p = evaluator.shape
+    positions = np.flatnonzero(evaluator.allowed)
+    days = positions // n_p
+    route_cost = np.maximum(evaluator.cost[positions % n_p], 1e-12)
+    if x is None:
+        x = np.zeros((n_starts, n_d * n_p), dtype=bool)
+    else:
+        x = np.array(x, dtype=bool).reshape(n_starts, n_d * n_p)
+    first = evaluator.first_violation(x.reshape(n_starts, n_d, n_p))
+    active = first.min(axis=1) < n_d
+    while active.any():
+        rows = np.flatnonzero(active)
+        limit = first[rows].min(axis=1)
+        best_score = np.full(rows.size, -np.inf)
+        best_position = np.zeros(rows.size, dtype=int)
+        best_first = first[rows].copy()
+        # a lo sumo _LOTE cronogramas candidatos por evaluación
+        step = max(1, _LOTE // rows.size)
+        for start in range(0, positions.size, step):
+            chunk = positions[start:start + step]
+            candidates = np.repeat(x[rows, None, :], chunk.size, axis=1)
+            candidates[:, np.arange(chunk.size), chunk] = True
+            new_first = evaluator.first_violation(candidates.reshape(rows.size, chunk.size, n_d, n_p))
+            progress = (new_first - first[rows, None, :]).sum(axis=-1).astype(float)
+            # solo retiros nuevos hasta el primer día con violación
+            usable = (days[None, start:start + step] <= limit[:, None]) & ~x[rows][:, chunk] & (progress > 0)
+            noise = rng.lognormal(0.0, 0.5, size=progress.shape)
+            noise[rows == 0] = 1.0
+            score = np.where(usable, progress / route_cost[None, start:start + step] * noise, -np.inf)
+            best = np.argmax(score, axis=1)
+            index = np.arange(rows.size)
+            better = score[index, best] > best_score
+            best_score[better] = score[index, best][better]
+            best_position[better] = chunk[best[better]]
+            best_first[better] = new_first[index[better], best[better]]
+        found = np.isfinite(best_score)
+        x[rows[found], best_position[found]] = True
+        first[rows[found]] = best_first[found]
+        active[rows[~found]] = False
+        active &= first.min(axis=1) < n_d
+    return x.reshape(n_starts, n_d, n_p)
+
+
+def _moves(evaluator, on, window):
+    # movimientos (quitar, quitar, agregar) de un cronograma con retiros en las posiciones
+    # on (día * rutas + ruta), -1 = nada: agregar, quitar, mover un retiro hasta window
+    # días con la misma ruta, cambiarle la ruta y juntar dos retiros cercanos en uno
+    n_d, n_p = evaluator.shape
+    allowed = evaluator.allowed.reshape(-1)
+    taken = np.zeros(n_d * n_p, dtype=bool)
+    taken[on] = True
+    free = allowed & ~taken
+    add = np.flatnonzero(free)
+    day, route = on // n_p, on % n_p
+    # mover de día
+    deltas = np.concatenate((np.arange(-window, 0), np.arange(1, window + 1)))
+    new_day = day[:, None] + deltas[None, :]
+    shifted = np.clip(new_day, 0, n_d - 1) * n_p + route[:, None]
+    ok = (new_day >= 0) & (new_day < n_d) & free[shifted]
+    shift_from, shift_to = np.broadcast_to(on[:, None], ok.shape)[ok], shifted[ok]
+    # cambiar de ruta
+    rerouted = day[:, None] * n_p + np.arange(n_p)[None, :]
+    ok = free[rerouted]
+    reroute_from, reroute_to = np.broadcast_to(on[:, None], ok.shape)[ok], rerouted[ok]
+    # juntar dos retiros en uno, el día del primero
+    a, b = np.triu_indices(on.size, 1)
+    close = np.abs(day[a] - day[b]) <= window
+    a, b = a[close], b[close]
+    merged = np.minimum(day[a], day[b])[:, None] * n_p + np.arange(n_p)[None, :]
+    ok = allowed[merged]
+    merge_a, merge_b = np.broadcast_to(on[a][:, None], ok.shape)[ok], np.broadcast_to(on[b][:, None], ok.shape)[ok]
+    merge_to = merged[ok]
+    none = lambda n: np.full(n, -1)
+    first = np.concatenate((none(add.size), on, shift_from, reroute_from, merge_a))
+    second = np.concatenate((none(add.size), none(on.size), none(shift_from.size), none(reroute_from.size), merge_b))
+    added = np.concatenate((add, none(on.size), shift_to, reroute_to, merge_to))
+    return first, second, added
+
+
+def local_search(evaluator, x, max_iter=200, window=7):
+    """
+    Búsqueda local de mejor mejora sobre cada cronograma del lote x (N x días x rutas).
+    En cada paso se evalúan a la vez todos los vecinos de todos los cronogramas (agregar
+    o quitar un retiro, moverlo hasta window días, cambiarle la ruta o juntar dos
+    retiros cercanos en uno) y cada cronograma pasa a su mejor vecino si baja la
+    violación o, con la misma violación, el costo. Devuelve (x, costo, violación).
+    """
+    x = np.array(x, dtype=bool)
+    n, n_d, n_p = x.shape
+    flat = x.reshape(n, n_d * n_p)
+    cost, violation = evaluator.evaluate(x)
+    running = np.ones(n, dtype=bool)
+    for _ in range(max_iter):
+        if not running.any():
+            break
+        rows = np.flatnonzero(running)
+        moves = [_moves(evaluator, np.flatnonzero(flat[i]), window) for i in rows]
+        owner = np.repeat(np.arange(rows.size), [move[0].size for move in moves])
+        first, second, added = (np.concatenate(parts) for parts in zip(*moves))
+        best_cost = np.full(rows.size, np.inf)
+        best_violation = np.full(rows.size, np.inf)
+        best = np.zeros((rows.size, n_d * n_p), dtype=bool)
+        for start in range(0, owner.size, _LOTE):
+            chunk = slice(start, start + _LOTE)
+            candidates = flat[rows[owner[chunk]]].copy()
+            index = np.arange(candidates.shape[0])
+            for positions, value in ((first[chunk], False), (second[chunk], False), (added[chunk], True)):
+                candidates[index[positions >= 0], positions[positions >= 0]] = value
+            c, v = evaluator.evaluate(candidates.reshape(-1, n_d, n_p))
+            # mejor vecino de cada cronograma: primero la violación, después el costo
+            order = np.lexsort((c, v, owner[chunk]))
+            head = order[np.concatenate(([True], np.diff(owner[chunk][order]) != 0))]
+            k = owner[chunk][head]
+            better = (v[head] < best_violation[k]) | ((v[head] == best_violation[k]) & (c[head] < best_cost[k]))
+            k, head = k[better], head[better]
+            best_cost[k], best_violation[k], best[k] = c[head], v[head], candidates[head]
+        tol = evaluator.tol * np.maximum(1.0, np.abs(cost[rows]))
+        improved = (best_violation < violation[rows] - evaluator.tol) | (
+            (best_violation <= violation[rows]) & (best_cost < cost[rows] - tol))
+        flat[rows[improved]] = best[improved]
+        cost[rows[improved]] = best_cost[improved]
+        violation[rows[improved]] = best_violation[improved]
+        running[rows[~improved]] = False
+    return flat.reshape(n, n_d, n_p), cost, violation
+
+
+def iterated_search(evaluator, x, rounds=10, patience=3, window=7, rng=None, max_iter=200):
+    """
+    Búsqueda local iterada sobre el lote x (N x días x rutas): en cada ronda se borran
+    los retiros de una ventana aleatoria de hasta 2 * window días de cada cronograma, se
+    completan con la construcción golosa y se vuelve a la búsqueda local; cada
+    cronograma se queda con el nuevo si es mejor (menos violación o menor costo). Corta
+    después de patience rondas seguidas sin mejorar el mejor cronograma factible.
+    Devuelve (x, costo, violación).
+    """
+    rng = np.random.default_rng(rng)
+    x, cost, violation = local_search(evaluator, x, max_iter=max_iter, window=window)
+    n, n_d, _ = x.shape
+    best, idle_rounds = _best(cost, violation), 0
+    for _ in range(rounds):
+        if idle_rounds >= patience:
+            break
+        start = rng.integers(0, n_d, size=n)
+        length = rng.integers(1, 2 * window + 1, size=n)
+        days = np.arange(n_d)
+        ruin = (days[None, :] >= start[:, None]) & (days[None, :] < (start + length)[:, None])
+        candidate = x & ~ruin[:, :, None]
+        candidate = greedy(evaluator, n_starts=n, rng=rng, x=candidate)
+        candidate, c, v = local_search(evaluator, candidate, max_iter=max_iter, window=window)
+        better = (v < violation) | ((v <= violation) & (c < cost))
+        x[better], cost[better], violation[better] = candidate[better], c[better], v[better]
+        current = _best(cost, violation)
+        idle_rounds = 0 if current < best else idle_rounds + 1
+        best = min(best, current)
+    return x, cost, violation
+
+
+def _best(cost, violation):
+    # menor costo entre los cronogramas factibles (inf si no hay)
+    return float(np.min(cost[violation <= 0], initial=np.inf))
+
+
+def heuristic_solution(
+    route_branches, cost_routes, cash_in_branch, box_amounts, business_days, collection,
+    last_days_collection=(), extra_box_percent=0.0, daily_interest_rate=0.0, big_m=None,
+    routes=None, n_starts=8, rounds=10, seed=0, max_iter=200):
+    """
+    Mejor cronograma de n_starts construcciones golosas mejoradas con búsqueda local
+    iterada. Mismos datos que model_problem_arrays (ver dp_solution).
+    - big_m: Cota de los retiros por día y ruta (None = sin cota).
+    - routes: Rutas que se pueden tomar (None = todas), por ejemplo las que quedan
+      después del presolve.
+    - n_starts: Cronogramas iniciales (el primero sin aleatorizar).
+    - rounds: Rondas máximas de la búsqueda local iterada (ver iterated_search).
+    - seed: Semilla de la aleatorización.
+    Devuelve (lp_status, x, e, t) como dp_solution: LpStatusOptimal con la solución (no
+    necesariamente óptima: factible), LpStatusInfeasible si la instancia no es factible
+    con ningún cronograma o LpStatusNotSolved si no se encontró uno factible que respete
+    big_m (la instancia puede serlo igual).
+    """
+    evaluator = ScheduleEvaluator(
+        route_branches, cost_routes, cash_in_branch, box_amounts, business_days, collection,
+        last_days_collection, extra_box_percent, daily_interest_rate, routes)
+    if evaluator.infeasible:
+        return pulp.LpStatusInfeasible, None, None, None
+    rng = np.random.default_rng(seed)
+    x = greedy(evaluator, n_starts=n_starts, rng=rng)
+    x, cost, violation = iterated_search(evaluator, x, rounds=rounds, rng=rng, max_iter=max_iter)
+    for best in np.argsort(np.where(violation <= 0, cost, np.inf)):
+        if violation[best] > 0:
+            break
+        x_best, e, t = evaluator.solution(x[best])
+        if big_m is None or (t * evaluator.m.T[:, None, :]).sum(axis=0).max(initial=0.0) <= big_m:
+            return pulp.LpStatusOptimal, x_best, e, t
+    return pulp.LpStatusNotSolved, None, None, None
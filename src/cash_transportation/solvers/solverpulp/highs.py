@@ -0,0 +1,161 @@
+"""
+HiGHS en el mismo proceso a partir de las matrices del modelo.
+
+Con solver='HiGHS' PuLP escribe el modelo (o lo pasa variable por variable) y lee la
+solución por nombre. Con solver='highs-inproc' la matriz CSR, las cotas, los costos y la
+integralidad de ModelArrays (matrix.py) se pasan directamente a HiGHS a través de
+scipy.optimize.milp, sin subprocesos ni archivos temporales, y la solución vuelve como
+un array de valores por columna (el orden de ModelArrays).
+
+milp no acepta soluciones iniciales ni cantidad de hilos: warm_start y n_thr se ignoran.
+
+Con el scipy actual el presolve de HiGHS devolvió en una instancia con linking
+'disaggregated' estado óptimo con un objetivo mayor que el óptimo (41.625 contra
+40.893 de CBC y de HiGHS sin presolve), y sin presolve HiGHS deja en big_m='global'
+enteros como x = 1.8e-9 que dentro de su tolerancia de integralidad habilitan retiros
+t <= M x. Por eso solve_arrays no confía solo en el estado: redondea los enteros y
+verifica la solución que devuelve (A x contra las cotas de las filas y cotas de las
+columnas, con x redondeado) y la cota dual contra el objetivo. Si no cierra vuelve a
+resolver cambiando el presolve (sin presolve si se pidió con presolve y al revés) y, si
+tampoco, con CBC a través de PuLP (CBC no da cota dual: solo se verifica la
+factibilidad); una solución que no verifica nunca se devuelve (queda LpStatusNotSolved).
+"""
+import numpy as np
+import pulp
+
+from ... import instrument
+from .matrix import to_pulp
+
+INPROC_SOLVERS = ('highs-inproc',)
+# tolerancias de la verificación (relativas a 1 + |cota| de cada fila o columna)
+_TOL_FACTIBLE = 1e-6
+_TOL_ENTERO = 1e-5
+# gap relativo de HiGHS por defecto (mip_rel_gap)
+_GAP_HIGHS = 1e-4
+
+# estado de scipy.optimize.milp -> estado de PuLP
+_STATUS = {
+    0: pulp.LpStatusOptimal,
+    1: pulp.LpStatusNotSolved,  # límite de tiempo o de iteraciones
+    2: pulp.LpStatusInfeasible,
+    3: pulp.LpStatusUnbounded,
+}
+
+
+def is_inproc(solver):
+    return solver in INPROC_SOLVERS
+
+
+def solve_arrays(arrays, msg=False, time_limit=None, gap_rel=None, presolve=True):
+    """
+    Resuelve el modelo matricial con HiGHS (scipy.optimize.milp).
+    - time_limit: Segundos máximos (None = sin límite), por cada intento (ver la nota
+      del módulo).
+    - gap_rel: Gap relativo con el que se detiene (None = el de HiGHS, 1e-4).
+    - presolve: Usar el presolve de HiGHS en el primer intento.
+    Devuelve (lp_status, sol_status, values, objective, bound): estados de PuLP, valores
+    de las columnas (NaN si no hay solución), valor objetivo y cota dual incluyendo c0
+    (None si no hay). Si se alcanza time_limit con una solución factible, lp_status es
+    LpStatusOptimal y sol_status LpSolutionIntegerFeasible, como en PuLP.
+    """
+    outcome = _outcome(arrays, _milp(arrays, msg, time_limit, gap_rel, presolve), gap_rel)
+    if outcome is None:
+        print(f"WARNING: La solución de HiGHS {'con' if presolve else 'sin'} presolve no verifica; "
+              f"se resuelve {'sin' if presolve else 'con'} presolve")
+        instrument.count('highs_sin_presolve' if presolve else 'highs_con_presolve')
+        outcome = _outcome(arrays, _milp(arrays, msg, time_limit, gap_rel, not presolve), gap_rel)
+    if outcome is None:
+        print("WARNING: La solución de HiGHS no verifica; se resuelve con CBC")
+        instrument.count('highs_cbc')
+        outcome = _cbc(arrays, msg, time_limit, gap_rel)
+    if outcome is None:
+        print("WARNING: Ninguna solución verifica; el problema queda sin resolver")
+        return pulp.LpStatusNotSolved, pulp.LpSolutionNoSolutionFound, np.full(arrays.c.shape[0], np.nan), None, None
+    return outcome
+
+
+def _outcome(arrays, res, gap_rel):
+    # resultado de solve_arrays para la salida de milp; None si la solución no verifica
+    lp_status = _STATUS.get(res.status, pulp.LpStatusUndefined)
+    if res.status == 0:
+        sol_status = pulp.LpSolutionOptimal
+    elif res.status == 1 and res.x is not None:
+        lp_status, sol_status = pulp.LpStatusOptimal, pulp.LpSolutionIntegerFeasible
+    else:
+        return lp_status, pulp.LpSolutionNoSolutionFound, np.full(arrays.c.shape[0], np.nan), None, None
+    values = np.asarray(res.x, dtype=float)
+    # los enteros vuelven con ruido de la tolerancia de integralidad
+    integer = arrays.integrality.astype(bool)
+    values[integer] = np.round(values[integer])
+    objective = float(arrays.c @ values)
+    bound = getattr(res, 'mip_dual_bound', None)
+    bound = float(bound) if bound is not None and np.isfinite(bound) else None
+    # la cota solo prueba optimalidad con estado óptimo
+    if not consistent(arrays, values, objective, bound if res.status == 0 else None, gap_rel):
+        return None
+    return lp_status, sol_status, values, objective + arrays.c0, None if bound is None else bound + arrays.c0
+
+
+def _cbc(arrays, msg, time_limit, gap_rel):
+    # (lp_status, sol_status, values, objective, None) con CBC sobre to_pulp(arrays);
+    # None si la solución no verifica
+    problem, variables, _ = to_pulp(arrays)
+    limits = {}
+    if time_limit is not None:
+        limits['timeLimit'] = time_limit
+    if gap_rel is not None:
+        limits['gapRel'] = gap_rel
+    problem.solve(pulp.PULP_CBC_CMD(msg=bool(msg), **limits))
+    if problem.status != pulp.LpStatusOptimal:
+        return problem.status, pulp.LpSolutionNoSolutionFound, np.full(arrays.c.shape[0], np.nan), None, None
+    values = np.array([np.nan if var.varValue is None else var.varValue for var in variables])
+    integer = arrays.integrality.astype(bool)
+    values[integer] = np.round(values[integer])
+    objective = float(arrays.c @ values)
+    if not consistent(arrays, values, objective):
+        return None
+    return problem.status, problem.sol_status, values, objective + arrays.c0, None
+
+
+def consistent(arrays, values, objective, bound=None, gap_rel=None):
+    """
+    True si values (con los enteros ya redondeados, los que se devuelven) cumple las
+    filas, las cotas de las columnas y la integralidad de arrays, y la cota dual (sin
+    c0, None = no se verifica) no está por encima del objetivo (sin c0) ni más lejos que
+    el gap.
+    """
+    x = np.asarray(values, dtype=float)
+    if not np.all(np.isfinite(x)):
+        return False
+    Ax = arrays.A @ x
+    for low, high, value in ((arrays.row_lb, arrays.row_ub, Ax), (arrays.lb, arrays.ub, x)):
+        excess = np.maximum(low - value, value - high)
+        scale = 1.0 + np.maximum(np.abs(np.where(np.isfinite(low), low, 0.0)), np.abs(np.where(np.isfinite(high), high, 0.0)))
+        if np.any(excess > _TOL_FACTIBLE * scale):
+            return False
+    integer = arrays.integrality.astype(bool)
+    if np.any(np.abs(x[integer] - np.round(x[integer])) > _TOL_ENTERO):
+        return False
+    if bound is not None and np.isfinite(bound):
+        # con estado óptimo, objective - bound <= gap * |objective| (margen por redondeo y
+        # por el gap absoluto de HiGHS, 1e-6)
+        gap = gap_rel if gap_rel is not None else _GAP_HIGHS
+        margin = _TOL_FACTIBLE * (1.0 + abs(objective))
+        if bound > objective + margin or objective - bound > gap * abs(objective) + margin:
+            return False
+    return True
+
+
+def _milp(arrays, msg, time_limit, gap_rel, presolve):
+    from scipy.optimize import Bounds, LinearConstraint, milp
+
+    options = {'disp': bool(msg), 'presolve': bool(presolve)}
+    if time_limit is not None:
+        options['time_limit'] = float(time_limit)
+    if gap_rel is not None:
+        options['mip_rel_gap'] = float(gap_rel)
+    constraints = []
+    if arrays.A.shape[0]:
+        constraints.append(LinearConstraint(arrays.A, arrays.row_lb, arrays.row_ub))
+    return milp(arrays.c, integrality=arrays.integrality, bounds=Bounds(arrays.lb, arrays.ub),
+                constraints=constraints, options=options)
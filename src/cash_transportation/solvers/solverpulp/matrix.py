@@ -0,0 +1,473 @@
+"""
+Armado vectorizado del modelo de envío de camiones.
+
+En lugar de construir el MIP restricción por restricción con expresiones de PuLP,
+se arma la matriz de restricciones como una matriz dispersa (CSR) junto con los
+vectores de costos, cotas de filas, cotas de columnas e integralidad. Los índices
+de cada bloque se generan con broadcasting de NumPy sobre las grillas (s, d, p).
+
+Orden de las columnas:
+    x[d,p] (binarias), e[s,d] (efectivo) y t[s,d,p] (efectivo retirado).
+
+Las filas se expresan como row_lb <= A @ v <= row_ub. Las restricciones
+e[s,d] <= b[s]*(1+extra) y x[d,p] <= h[d,p] se expresan como cotas de columnas.
+
+Formulaciones alternativas (mismo óptimo, para comparar contra la estándar):
+- 'compact': t[s,d,p] solo existe si m[s,p] = 1, por lo que desaparecen las filas
+  sum (1-m)*t == 0. Además, por el balance, sum <p> t[s,d,p] <= e[s,d-1] equivale a
+  e[s,d] >= r[s,d], que pasa a ser una cota de columna. Quedan solo el balance y el
+  enlace con x.
+- 'cumulative': como 'compact' pero sin variables e. Con R[s,d] la recaudación
+  acumulada y T[s,d] el retiro acumulado, e[s,d] = e0[s] + R[s,d] - T[s,d], y el
+  buzón, la no negatividad de e y el retiro máximo quedan en una fila por (s,d):
+      e0[s] + R[s,d] - b[s]*(1+extra) <= T[s,d] <= e0[s] + min(R[s,d-1], R[s,d])
+  Tiene menos filas y columnas pero más no nulos (T es una suma acumulada, O(n_d²)).
+Con expand_solution se recuperan x, e y t densos en cualquiera de las formulaciones.
+
+Enlace de retiros con rutas (big-M): con big_m='tight' la constante sale de los datos.
+Lo que se puede retirar de s el día d está acotado por
+    U[s,d] = min(b[s]*(1+extra), e0[s] + sum <j < d> max(r[s,j], 0))   (U[s,0] = e0[s])
+y la fila agregada usa M[d,p] = sum <s> m[s,p]*U[s,d]. Con linking='disaggregated' hay
+una fila por sucursal, t[s,d,p] <= U[s,d]*x[d,p], que da una relajación más ajustada.
+Los coeficientes de x en esas filas dependen de los datos y se actualizan en fill_values.
+
+Con reduction (ver presolve.py) el modelo se arma sobre las rutas que quedan y los pasos
+de tiempo, sin las x de días no hábiles. Los datos se siguen pasando por día y
+fill_values los agrega por paso; expand_solution devuelve la solución en días y rutas
+originales.
+"""
+from dataclasses import dataclass, field
+
+import numpy as np
+import pulp
+from scipy import sparse
+
+
+@dataclass
+class ModelArrays:
+    """
+    Modelo en forma matricial: min c @ v + c0, row_lb <= A @ v <= row_ub, lb <= v <= ub.
+    - x_cols, e_cols, t_cols: índice de columna de cada variable (-1 si no existe).
+    - rows: índices de fila de cada bloque de restricciones, por nombre.
+    - branch_ids, route_ids: índices originales de sucursales y rutas (para los nombres).
+    - formulation: 'standard', 'compact' o 'cumulative' (ver el comienzo del módulo).
+    - cash_offset: e0[s] + R[s,d] (solo en 'cumulative', para reconstruir e).
+    - route_branches: Matriz (rutas x sucursales) del modelo.
+    - big_m: Constante global del enlace, o None si se calcula de los datos ('tight').
+    - link_x_pos: Posición en A.data del coeficiente de x en cada fila de enlace (-1 si no hay fila).
+    - reduction: Reducción de presolve.structural_presolve, o None (modelo completo).
+    - step_offset: Recaudación acumulada de cada día desde el comienzo de su paso (solo
+      con reduction, para reconstruir e en los días de arrastre).
+    """
+    A: sparse.csr_matrix
+    c: np.ndarray
+    c0: float
+    row_lb: np.ndarray
+    row_ub: np.ndarray
+    lb: np.ndarray
+    ub: np.ndarray
+    integrality: np.ndarray
+    x_cols: np.ndarray
+    e_cols: np.ndarray
+    t_cols: np.ndarray
+    rows: dict = field(default_factory=dict)
+    branch_ids: np.ndarray = None
+    route_ids: np.ndarray = None
+    formulation: str = 'standard'
+    cash_offset: np.ndarray = None
+    route_branches: np.ndarray = None
+    big_m: float = None
+    link_x_pos: np.ndarray = None
+    reduction: object = None
+    step_offset: np.ndarray = None
+
+    @property
+    def shape(self):
+        return self.A.shape
+
+    def column_names(self):
+        """Nombres de las columnas con la misma convención que model.py (x_d_p, e_s_d, t_s_d_p)."""
+        names = np.empty(self.A.shape[1], dtype=object)
+        n_s, n_d, n_p = self.t_cols.shape
+        days = range(n_d) if self.reduction is None else self.reduction.steps.tolist()
+        for didx, d in enumerate(days):
+            for pidx, p in enumerate(self.route_ids):
+                if self.x_cols[didx, pidx] >= 0:
+                    names[self.x_cols[didx, pidx]] = "x_{}_{}".format(d, p)
+        for sidx, s in enumerate(self.branch_ids):
+            for didx, d in enumerate(days):
+                if self.e_cols[sidx, didx] >= 0:
+                    names[self.e_cols[sidx, didx]] = "e_{}_{}".format(s, d)
+                for pidx, p in enumerate(self.route_ids):
+                    if self.t_cols[sidx, didx, pidx] >= 0:
+                        names[self.t_cols[sidx, didx, pidx]] = "t_{}_{}_{}".format(s, d, p)
+        return names.tolist()
+
+
+FORMULATIONS = ('standard', 'compact', 'cumulative')
+
+
+def _grid(*shape, offset=0):
+    return offset + np.arange(int(np.prod(shape))).reshape(shape)
+
+
+def _number(order, offset=0):
+    # numera en forma consecutiva las posiciones con order >= 0, respetando el orden de order
+    out = np.full(order.shape, -1)
+    flat = np.flatnonzero(order >= 0)
+    flat = flat[np.argsort(order.ravel()[flat], kind='stable')]
+    out.ravel()[flat] = offset + np.arange(flat.size)
+    return out
+
+
+def build_model_arrays(
+    route_branches, cost_routes, cash_in_branch,
+    box_amounts, business_days, collection,
+    big_m, last_days_collection=(), extra_box_percent=0.0, daily_interest_rate=0.0,
+    branch_ids=None, route_ids=None, formulation='standard', linking='aggregated', reduction=None):
+    """
+    Arma el modelo en forma matricial a partir de los arrays de datos.
+    - route_branches: Matriz (rutas x sucursales), m[s,p] transpuesta.
+    - cost_routes, cash_in_branch, box_amounts, business_days, collection: como en model_problem_arrays.
+    - big_m: Constante M de la restricción sum <s> m[s,p]*t[s,d,p] <= M * x[d,p], o 'tight'
+      para calcularla por (día, ruta) a partir de los datos (ver el comienzo del módulo).
+    - branch_ids, route_ids: índices originales (por defecto 0..n-1), solo afectan los nombres.
+    - formulation: 'standard', 'compact' (t solo en ruta) o 'cumulative' (además sin e).
+    - linking: 'aggregated' (una fila por día y ruta) o 'disaggregated' (una por sucursal).
+    - reduction: Resultado de presolve.structural_presolve sobre estos datos, o None.
+    """
+    if formulation not in FORMULATIONS:
+        raise ValueError(f"Formulación desconocida: {formulation}")
+    if linking not in ('aggregated', 'disaggregated'):
+        raise ValueError(f"Enlace desconocido: {linking}")
+    if not (big_m == 'tight' or np.isscalar(big_m) and float(big_m) > 0):
+        raise ValueError(f"big_m debe ser 'tight' o un número positivo: {big_m}")
+    m = np.atleast_2d(np.asarray(route_branches, dtype=float)).T  # m[s,p]
+    n_d = np.atleast_2d(np.asarray(collection, dtype=float)).shape[1]
+    if route_ids is None:
+        route_ids = np.arange(m.shape[1])
+    if reduction is None:
+        active = np.ones((n_d, m.shape[1]), dtype=bool)
+    else:
+        # pasos de tiempo, rutas que quedan y x que existen (ver presolve.py)
+        m = m[:, reduction.routes]
+        route_ids = np.asarray(route_ids)[reduction.routes]
+        active = reduction.active
+        n_d = reduction.steps.size
+    n_s, n_p = m.shape
+    standard = formulation == 'standard'
+    cumulative = formulation == 'cumulative'
+
+    # Columnas (sin x ni t de los días no hábiles de cada ruta si hay reduction)
+    x_cols = _number(np.where(active, _grid(n_d, n_p), -1))
+    n_cols = int(active.sum())
+    if cumulative:
+        e_cols = np.full((n_s, n_d), -1)
+    else:
+        e_cols = _grid(n_s, n_d, offset=n_cols)
+        n_cols += e_cols.size
+    if standard:
+        order = _grid(n_s, n_d, n_p)
+    else:
+        order = np.full((n_s, n_d, n_p), -1)
+        s_idx, p_idx = np.nonzero(m)
+        order[s_idx, :, p_idx] = _grid(s_idx.size, n_d)
+    order[:, ~active] = -1
+    t_cols = _number(order, offset=n_cols)
+    n_cols += int(np.count_nonzero(t_cols >= 0))
+
+    rows = {}
+    data, row_idx, col_idx = [], [], []
+    n_rows = 0
+
+    def add(r, c, v):
+        # las entradas de filas o columnas que no existen (-1) se descartan
+        r, c, v = np.broadcast_arrays(r, c, v)
+        keep = (r >= 0) & (c >= 0)
+        row_idx.append(r[keep])
+        col_idx.append(c[keep])
+        data.append(v[keep].astype(float))
+
+    if cumulative:
+        # e0[s] + R[s,d] - b[s] <= sum <p, d' <= d> t[s,d',p] <= e0[s] + min(R[s,d-1], R[s,d])
+        cash = _grid(n_s, n_d, offset=n_rows)
+        n_rows += cash.size
+        day, prev_day = np.tril_indices(n_d)
+        add(cash[s_idx][:, day], t_cols[s_idx[:, None], prev_day[None, :], p_idx[:, None]], 1.0)
+        rows['cash'] = cash
+    else:
+        # e[s,d] - e[s,d-1] + sum <p> t[s,d,p] == r[s,d]   (con e[s,-1] = e0[s])
+        balance = _grid(n_s, n_d, offset=n_rows)
+        n_rows += balance.size
+        add(balance, e_cols, 1.0)
+        add(balance[:, 1:], e_cols[:, :-1], -1.0)
+        if standard:
+            add(balance[:, :, None], t_cols, 1.0)
+        else:
+            add(balance[s_idx], t_cols[s_idx, :, p_idx], 1.0)
+        rows['balance'] = balance
+
+    s_idx, p_idx = np.nonzero(m)
+    if linking == 'aggregated':
+        # sum <s> m[s,p]*t[s,d,p] - M[d,p] * x[d,p] <= 0
+        link = _number(np.where(active, _grid(n_d, n_p), -1), offset=n_rows)
+        n_rows += int(active.sum())
+        add(link[:, p_idx], t_cols[s_idx, :, p_idx].T, m[s_idx, p_idx][None, :])
+        link_x = x_cols
+    else:
+        # m[s,p]*t[s,d,p] - U[s,d] * x[d,p] <= 0   (solo sucursales de la ruta)
+        order = np.full((n_s, n_d, n_p), -1)
+        order[s_idx, :, p_idx] = _grid(s_idx.size, n_d)
+        order[:, ~active] = -1
+        link = _number(order, offset=n_rows)
+        n_rows += int(np.count_nonzero(link >= 0))
+        add(link[s_idx, :, p_idx], t_cols[s_idx, :, p_idx], m[s_idx, p_idx][:, None])
+        link_x = np.broadcast_to(x_cols[None, :, :], link.shape)
+    # coeficiente provisorio (1.0 para que la entrada exista); fill_values pone -M
+    add(link[link >= 0], link_x[link >= 0], 1.0)
+    rows['link'] = link
+
+    if standard:
+        # sum <s> (1-m[s,p])*t[s,d,p] == 0 (solo rutas que no pasan por todas las sucursales)
+        off_route = 1.0 - m
+        partial = np.nonzero(np.any(off_route != 0, axis=0))[0]
+        order = np.full((n_d, n_p), -1)
+        order[:, partial] = _grid(n_d, partial.size)
+        order[~active] = -1
+        zero = _number(order, offset=n_rows)
+        n_rows += int(np.count_nonzero(zero >= 0))
+        s_idx, p_idx = np.nonzero(off_route)
+        add(zero[:, p_idx], t_cols[s_idx, :, p_idx].T, off_route[s_idx, p_idx][None, :])
+        rows['zero'] = zero
+
+        # sum <p> t[s,d,p] - e[s,d-1] <= 0   (sum <p> t[s,0,p] <= e0[s])
+        withdraw = _grid(n_s, n_d, offset=n_rows)
+        n_rows += withdraw.size
+        add(withdraw[:, :, None], t_cols, 1.0)
+        add(withdraw[:, 1:], e_cols[:, :-1], -1.0)
+        rows['withdraw'] = withdraw
+
+    # sum <p,d in D_q> m[s,p]*x[d,p] >= 1
+    last_days = np.asarray(list(last_days_collection), dtype=int)
+    if reduction is not None and last_days.size > 0:
+        # los días obligatorios sin rutas no aportan x; el resto es el comienzo de un paso
+        last_days = np.nonzero(np.isin(reduction.steps, last_days % reduction.n_days))[0]
+    if np.asarray(list(last_days_collection)).size > 0:
+        last = _grid(n_s, offset=n_rows)
+        n_rows += last.size
+        s_idx, p_idx = np.nonzero(m)
+        add(last[s_idx][:, None], x_cols[last_days][:, p_idx].T, m[s_idx, p_idx][:, None])
+        rows['last_days'] = last
+
+    A = sparse.coo_matrix(
+        (np.concatenate(data), (np.concatenate(row_idx), np.concatenate(col_idx))),
+        shape=(n_rows, n_cols)
+    ).tocsr()
+    A.sum_duplicates()
+
+    # Posición en A.data de los coeficientes de x del enlace (CSR canónica: claves ordenadas)
+    keys = np.repeat(np.arange(n_rows), np.diff(A.indptr)) * n_cols + A.indices
+    link_x_pos = np.full(link.shape, -1)
+    link_x_pos[link >= 0] = np.searchsorted(keys, link[link >= 0] * n_cols + link_x[link >= 0])
+
+    integrality = np.zeros(n_cols, dtype=np.int8)
+    integrality[x_cols[x_cols >= 0]] = 1
+
+    arrays = ModelArrays(
+        A=A, c=np.zeros(n_cols), c0=0.0,
+        row_lb=np.zeros(n_rows), row_ub=np.zeros(n_rows),
+        lb=np.zeros(n_cols), ub=np.full(n_cols, np.inf), integrality=integrality,
+        x_cols=x_cols, e_cols=e_cols, t_cols=t_cols, rows=rows,
+        branch_ids=np.arange(n_s) if branch_ids is None else np.asarray(branch_ids),
+        route_ids=np.asarray(route_ids),
+        formulation=formulation,
+        route_branches=m.T, big_m=None if big_m == 'tight' else float(big_m), link_x_pos=link_x_pos,
+        reduction=reduction,
+    )
+    fill_values(
+        arrays, cost_routes, cash_in_branch, box_amounts, business_days, collection,
+        extra_box_percent=extra_box_percent, daily_interest_rate=daily_interest_rate)
+    return arrays
+
+
+def fill_values(
+    arrays, cost_routes, cash_in_branch, box_amounts, business_days, collection,
+    extra_box_percent=0.0, daily_interest_rate=0.0):
+    """
+    Completa (o actualiza) los datos numéricos del modelo sin tocar la estructura:
+    costos, cotas de filas y cotas de columnas.
+    """
+    n_s, n_d, n_p = arrays.t_cols.shape
+    reduction = arrays.reduction
+    n_days = n_d if reduction is None else reduction.n_days
+    e0 = np.asarray(cash_in_branch, dtype=float).reshape(-1)[:n_s]
+    r = np.atleast_2d(np.asarray(collection, dtype=float))[:n_s, :n_days]
+    h = np.atleast_2d(np.asarray(business_days, dtype=float))[:, :n_days]
+    box = np.asarray(box_amounts, dtype=float).reshape(-1)[:n_s] * (1.0 + extra_box_percent)
+    cost = np.asarray(cost_routes, dtype=float).reshape(-1)
+    rows = arrays.rows
+
+    # Datos por paso de tiempo: cotas de e, peso de e en el objetivo, recaudación del
+    # balance y recaudación de los días de arrastre del paso anterior (retiro máximo)
+    cum_r = np.cumsum(r, axis=1)
+    if reduction is None:
+        steps = np.arange(n_d)
+        h, cost = h[:n_p], cost[:n_p]
+        low, high = np.zeros((n_s, n_d)), np.broadcast_to(box[:, None], (n_s, n_d))
+        weight = np.ones(n_d)
+        weight[-1] = 0.0
+        step_r, carried, carried_cost = r, np.zeros((n_s, n_d)), 0.0
+    else:
+        steps = reduction.steps
+        h, cost = h[reduction.routes], cost[reduction.routes]
+        # recaudación de cada día desde el comienzo de su paso: e[s,d] = e[s,paso] + offset
+        offset = cum_r - cum_r[:, steps][:, reduction.step_of_day]
+        arrays.step_offset = offset
+        low = np.maximum(np.maximum.reduceat(-offset, steps, axis=1), 0.0)
+        high = box[:, None] - np.maximum(np.maximum.reduceat(offset, steps, axis=1), 0.0)
+        weight = np.add.reduceat((np.arange(n_days) < n_days - 1).astype(float), steps)
+        step_r = np.add.reduceat(r[:, :steps[-1] + 1], np.concatenate(([0], steps[:-1] + 1)), axis=1)
+        carried, carried_cost = step_r - r[:, steps], offset[:, :-1].sum()
+
+    # Función objetivo: sum c[p]*x[d,p] + i*(e0 + sum <d < n_d-1> e[s,d])
+    arrays.c[:] = 0.0
+    x_mask = arrays.x_cols >= 0
+    arrays.c[arrays.x_cols[x_mask]] = np.broadcast_to(cost[None, :], x_mask.shape)[x_mask]
+    arrays.ub[arrays.x_cols[x_mask]] = np.minimum(h[:, steps].T, 1.0)[x_mask]
+
+    if arrays.formulation == 'cumulative':
+        # e[s,d] = e0[s] + R[s,d] - T[s,d]: t[s,d,p] resta en e de los días d..n_d-2
+        step_cum_r = cum_r[:, steps]
+        prev_cum_r = np.concatenate((np.zeros((n_s, 1)), cum_r[:, steps[1:] - 1]), axis=1)
+        on_route = arrays.t_cols >= 0
+        days_left = np.maximum(n_days - 1 - steps, 0).astype(float)
+        arrays.c[arrays.t_cols[on_route]] = np.broadcast_to(
+            -daily_interest_rate * days_left[None, :, None], on_route.shape)[on_route]
+        arrays.c0 = float(daily_interest_rate * (n_days * e0.sum() + cum_r[:, :-1].sum()))
+        arrays.cash_offset = e0[:, None] + step_cum_r
+        arrays.row_lb[rows['cash']] = arrays.cash_offset - high
+        arrays.row_ub[rows['cash']] = e0[:, None] + np.minimum(prev_cum_r, step_cum_r - low)
+    else:
+        arrays.c[arrays.e_cols] = daily_interest_rate * weight[None, :]
+        arrays.c0 = float(daily_interest_rate * (e0.sum() + carried_cost))
+        arrays.ub[arrays.e_cols] = high
+        arrays.lb[arrays.e_cols] = low
+        if arrays.formulation == 'compact':
+            # sum <p> t[s,d,p] <= e[s,d-1] (con el balance) como cota inferior de e
+            arrays.lb[arrays.e_cols] = np.maximum(low, r[:, steps])
+
+        rhs = step_r.copy()
+        rhs[:, 0] += e0
+        arrays.row_lb[rows['balance']] = rhs
+        arrays.row_ub[rows['balance']] = rhs
+
+    if 'zero' in rows:
+        zero = rows['zero'][rows['zero'] >= 0]
+        arrays.row_lb[zero] = 0.0
+        arrays.row_ub[zero] = 0.0
+
+    if 'withdraw' in rows:
+        arrays.row_lb[rows['withdraw']] = -np.inf
+        arrays.row_ub[rows['withdraw']] = carried
+        arrays.row_ub[rows['withdraw'][:, 0]] = e0
+
+    link = rows['link'][rows['link'] >= 0]
+    arrays.row_lb[link] = -np.inf
+    arrays.row_ub[link] = 0.0
+    pos = arrays.link_x_pos
+    if arrays.big_m is not None:
+        arrays.A.data[pos[pos >= 0]] = -arrays.big_m
+    else:
+        # U[s,d]: cota de lo que se puede retirar de s el día d (efectivo del día anterior)
+        inflow = e0[:, None] + np.concatenate(
+            (np.zeros((n_s, 1)), np.cumsum(np.maximum(r, 0.0), axis=1)[:, :-1]), axis=1)
+        bound = np.minimum(inflow, box[:, None])
+        bound[:, 0] = e0
+        bound = np.maximum(bound, 0.0)[:, steps]
+        if pos.ndim == 2:
+            arrays.A.data[pos[pos >= 0]] = -(bound.T @ arrays.route_branches.T)[pos >= 0]
+        else:
+            arrays.A.data[pos[pos >= 0]] = -np.broadcast_to(bound[:, :, None], pos.shape)[pos >= 0]
+
+    if 'last_days' in rows:
+        arrays.row_lb[rows['last_days']] = 1.0
+        arrays.row_ub[rows['last_days']] = np.inf
+    return arrays
+
+
+def expand_solution(arrays, values):
+    """
+    Valores densos (x[d,p], e[s,d], t[s,d,p]) a partir de los valores de las columnas,
+    en cualquiera de las formulaciones (las t que no existen valen 0). Con presolve la
+    solución se devuelve en la grilla original de días y rutas.
+    """
+    values = np.asarray(values, dtype=float)
+
+    def dense(cols):
+        out = np.zeros(cols.shape)
+        mask = cols >= 0
+        out[mask] = values[cols[mask]]
+        return out
+
+    x = dense(arrays.x_cols)
+    t = dense(arrays.t_cols)
+    if arrays.formulation == 'cumulative':
+        e = arrays.cash_offset - np.cumsum(t.sum(axis=2), axis=1)
+    else:
+        e = dense(arrays.e_cols)
+    reduction = arrays.reduction
+    if reduction is not None:
+        # las rutas dominadas y los días sin rutas no tienen retiros
+        steps, routes = reduction.steps, reduction.routes
+        x_full = np.zeros((reduction.n_days, reduction.n_routes))
+        x_full[np.ix_(steps, routes)] = x
+        t_full = np.zeros((t.shape[0], reduction.n_days, reduction.n_routes))
+        t_full[:, steps[:, None], routes[None, :]] = t
+        x, t = x_full, t_full
+        e = e[:, reduction.step_of_day] + arrays.step_offset
+    return x, e, t
+
+
+def to_pulp(arrays, name="MinimizeCosts"):
+    """
+    Genera un pulp.LpProblem equivalente al modelo matricial.
+    Devuelve (problem, variables, constraints): variables es la lista de LpVariable por
+    columna y constraints la lista de restricciones de PuLP por fila (una o dos si la
+    fila tiene ambas cotas distintas).
+    """
+    problem = pulp.LpProblem(name, pulp.LpMinimize)
+    names = arrays.column_names()
+    lb = [None if np.isinf(l) else l for l in arrays.lb.tolist()]
+    ub = [None if np.isinf(u) else u for u in arrays.ub.tolist()]
+    integrality = arrays.integrality.tolist()
+    variables = [
+        pulp.LpVariable(names[j], lowBound=lb[j], upBound=ub[j],
+                        cat=pulp.LpInteger if integrality[j] else pulp.LpContinuous)
+        for j in range(len(names))
+    ]
+
+    c = arrays.c
+    nz = np.nonzero(c)[0].tolist()
+    problem += pulp.LpAffineExpression([(variables[j], c[j]) for j in nz], constant=arrays.c0)
+
+    A = arrays.A
+    indptr, indices, values = A.indptr.tolist(), A.indices.tolist(), A.data.tolist()
+    row_lb, row_ub = arrays.row_lb.tolist(), arrays.row_ub.tolist()
+    constraints = []
+    for i in range(A.shape[0]):
+        start, end = indptr[i], indptr[i + 1]
+        expr = pulp.LpAffineExpression(
+            [(variables[indices[k]], values[k]) for k in range(start, end)])
+        lo, hi = row_lb[i], row_ub[i]
+        if lo == hi:
+            row = [pulp.LpConstraint(expr, pulp.LpConstraintEQ, rhs=lo)]
+        else:
+            row = []
+            if not np.isinf(hi):
+                row.append(pulp.LpConstraint(expr, pulp.LpConstraintLE, rhs=hi))
+            if not np.isinf(lo):
+                row.append(pulp.LpConstraint(pulp.LpAffineExpression(expr), pulp.LpConstraintGE, rhs=lo))
+        for constraint in row:
+            problem += constraint
+        constraints.append(row)
+    return problem, variables, constraints
@@ -3,15 +3,30 @@ import pandas as pd
 import pulp
 import time
 
+from ... import instrument
+from .cache import cache_key, get_solve_cache
+from .dp import dp_solution, solution_outcome
+from .heuristic import heuristic_solution, is_heuristic
+from .highs import is_inproc, solve_arrays
+from .matrix import build_model_arrays, expand_solution, to_pulp
+from .presolve import structural_presolve
+from .result import SolveResult, make_result
+
 BIG_M = 30000000
 TN_DAILY_INTEREST_RATE = 0.00092
+# estado de una solución factible no probada óptima (límite de tiempo o de gap)
+LIMIT_STATUS = 'Factible (límite alcanzado)'
+# solución de heuristic.py: factible, sin límite alcanzado ni cota
+HEURISTIC_STATUS = 'Factible (heurística)'
 
 def model_problem(
     amount_of_days, amount_of_branches, amount_of_routes,
     route_branches_csv, cost_routes_csv, cash_in_branch_csv,
     box_amounts_csv, business_days_csv, collection_csv,
     last_days_collection=list(), extra_box_percent=0.0, daily_interest_rate=0.0,
-    debug=False, solver='cbc', n_thr=4):
+    debug=False, solver='cbc', n_thr=4, dp=True, formulation='standard',
+    big_m='tight', linking='aggregated', presolve=False, keep_problems=True, cache=None,
+    time_limit=None, gap_rel=None):
     """
     Función que modela y resuelve el problema de envío de camiones de acuerdo a los datos
     de entrada, que vienen en forma de CSVs.
@@ -19,268 +34,414 @@ def model_problem(
     - amount_of_branches: Cantidad de sucursales en la planificación.
     - amount_of_routes: Cantidad de rutas diferentes comprendidas en la planificación.
     - *_csv: CSVs con los datos que deben incorporarse, ejemplos en carpeta 'data/'
+    - El resto de los parámetros se documentan en model_problem_arrays.
+
+    Solo lee los CSVs y delega en model_problem_arrays.
+    """
+    try:
+        with instrument.timer('leer_csv'):
+            route_branches = pd.read_csv(route_branches_csv, header=None).to_numpy(dtype=float)
+            cost_routes = pd.read_csv(cost_routes_csv, header=None).to_numpy(dtype=float)[:, 0]
+            cash_in_branch = pd.read_csv(cash_in_branch_csv, header=None).to_numpy(dtype=float)[:, 0]
+            box_amounts = pd.read_csv(box_amounts_csv, header=None).to_numpy(dtype=float)[:, 0]
+            business_days = pd.read_csv(business_days_csv, header=None).to_numpy(dtype=float)
+            collection = pd.read_csv(collection_csv, header=None, sep="\t").to_numpy(dtype=float)
+    except Exception as e:
+        print(f"ERROR: No se pudieron cargar los datos desde los archivos CSV: {str(e)}")
+        return SolveResult()
+
+    return model_problem_arrays(
+        route_branches[:amount_of_routes, :amount_of_branches],
+        cost_routes[:amount_of_routes],
+        cash_in_branch[:amount_of_branches],
+        box_amounts[:amount_of_branches],
+        business_days[:amount_of_routes, :amount_of_days],
+        collection[:amount_of_branches, :amount_of_days],
+        last_days_collection=last_days_collection, extra_box_percent=extra_box_percent,
+        daily_interest_rate=daily_interest_rate, debug=debug, solver=solver, n_thr=n_thr, dp=dp,
+        formulation=formulation, big_m=big_m, linking=linking, presolve=presolve,
+        keep_problems=keep_problems, cache=cache, time_limit=time_limit, gap_rel=gap_rel)
+
+
+def model_problem_arrays(
+    route_branches, cost_routes, cash_in_branch,
+    box_amounts, business_days, collection,
+    last_days_collection=list(), extra_box_percent=0.0, daily_interest_rate=0.0,
+    debug=False, solver='cbc', n_thr=4, dp=True, formulation='standard',
+    big_m='tight', linking='aggregated', presolve=False, keep_problems=True, cache=None,
+    time_limit=None, gap_rel=None):
+    """
+    Función que modela y resuelve el problema de envío de camiones de acuerdo a los datos
+    de entrada, que vienen como arrays de NumPy (no se lee ni escribe nada en disco).
+    - route_branches: Matriz (rutas x sucursales), 1 si la sucursal está en la ruta.
+    - cost_routes: Vector (rutas) con el costo de tomar cada ruta.
+    - cash_in_branch: Vector (sucursales) con el efectivo inicial en cada sucursal.
+    - box_amounts: Vector (sucursales) con el efectivo máximo de cada buzón.
+    - business_days: Matriz (rutas x días), 1 si el día es hábil para la ruta.
+    - collection: Matriz (sucursales x días) con la recaudación por sucursal por día.
     - last_days_collection: Lista de los días en los que se debe ir a buscar dinero. Suelen ser los últimos n
     - extra_box_percent: Porcentaje extra que se permite guardar de dinero en cada sucursal.
     - daily_interest_rate: Tasa diaria de interés, para incorporar costo financiero.
     - debug: Permite imprimir todas las variables del problema, default False.
-    - scip: True si se utilizará SCIP para resolver, False si se usará CBC.
+    - solver: Solver a utilizar ('cbc', 'scip', 'fscip', 'cuopt', 'gurobi', 'HiGHS',
+      'highs-inproc', HiGHS en el mismo proceso sobre las matrices, ver highs.py, o
+      'heuristic', cronograma factible sin garantía de optimalidad, ver heuristic.py; su
+      estado es 'Factible (heurística)' y no tiene cota).
+    - n_thr: Cantidad de hilos del solver.
+    - dp: Si la instancia es separable con una ruta por sucursal, resolver cada sucursal
+      por programación dinámica (ver dp.py) en lugar de llamar al solver.
+    - formulation: 'standard', 'compact' (sin retiros fuera de ruta ni filas de retiro
+      máximo) o 'cumulative' (además sin variables e, el efectivo se obtiene con
+      matrix.expand_solution). Ver matrix.py.
+    - big_m: 'tight' (constante del enlace por día y ruta a partir de buzones y
+      recaudaciones, ver matrix.py) o 'global' (BIG_M para todas las filas).
+    - linking: 'aggregated' (una fila de enlace por día y ruta) o 'disaggregated' (una
+      por sucursal de la ruta, relajación más ajustada con más filas).
+    - presolve: Armar el modelo sin rutas dominadas, sin x de días no hábiles y con los
+      días sin rutas agrupados en pasos (ver presolve.py). Las variables devueltas son
+      las del modelo reducido; matrix.expand_solution las lleva a la grilla original.
+    - keep_problems: Guardar los problemas y variables de PuLP en el resultado. Con False
+      el modelo de PuLP solo se arma para los solvers de PuLP y se suelta apenas se lee
+      la solución (barridos largos); con 'highs-inproc', 'heuristic' o programación
+      dinámica no se arma y el objetivo sale de las matrices.
+    - cache: SolveCache donde buscar el resultado antes de resolver (y guardarlo después),
+      False para no usar cache, None para el cache por defecto (ver cache.py). Un
+      resultado tomado del cache no tiene objetos de PuLP (como con keep_problems=False).
+    - time_limit: Segundos máximos por subproblema (None = sin límite).
+    - gap_rel: Gap relativo con el que se detiene el solver (None = el del solver).
+      Si se alcanza un límite con una solución factible, el estado del subproblema es
+      'Factible (límite alcanzado)' y la solución es la incumbente; bound y gap del
+      resultado tienen la cota dual si el solver la informa (ver limit_outcome).
+
+    Devuelve un SolveResult (ver result.py) con x, e y t densos y los costos logístico y
+    financiero; se desempaqueta como (status, variables, Problems).
     """
     
     if daily_interest_rate < 0.0:
         print("ERROR: Tasa de interes no puede ser menor a cero (al menos en Argentina...)")
-        return None, [], []
+        return SolveResult()
     
     # Validar datos de entrada
     try:
-        routes_matrix = np.loadtxt(route_branches_csv, delimiter=",")
+        routes_matrix = np.atleast_2d(np.asarray(route_branches, dtype=float))
         separable = (routes_matrix.size == 1) or np.array_equal(routes_matrix, np.diag(np.diag(routes_matrix)))
+        amount_of_routes, amount_of_branches = routes_matrix.shape
+        amount_of_days = np.atleast_2d(np.asarray(collection, dtype=float)).shape[1]
     except Exception as e:
-        print(f"ERROR: No se pudo cargar la matriz de rutas desde {route_branches_csv}: {str(e)}")
-        return None, [], []
+        print(f"ERROR: Matriz de rutas inválida: {str(e)}")
+        return SolveResult()
     
     problems = range(amount_of_branches) if separable else [0]
-    days = range(amount_of_days)
-    branches = range(amount_of_branches)
-    routes = range(amount_of_routes)
     
     #### DATOS
     try:
-        # Sucursales en cada ruta        
-        route_branches_df = pd.read_csv(route_branches_csv, header=None)
-        route_branches = {
-            ridx: list(route_branches_df.iloc[ridx]) for ridx in routes
-        }
+        # Sucursales en cada ruta
+        route_branches = routes_matrix
         if debug:
             print("route_branches = {}".format(route_branches))
         
         # Costo de tomar cada ruta
-        cost_routes_df = pd.read_csv(cost_routes_csv, header=None)
-        cost_routes = {
-            ridx: float(cost_routes_df.iloc[ridx,0]) for ridx in routes
-        }
+        cost_routes = np.asarray(cost_routes, dtype=float).reshape(-1)[:amount_of_routes]
         if debug:
             print("cost_routes = {}".format(cost_routes))
         
         # Efectivo inicial en cada sucursal
-        cash_branches_df = pd.read_csv(cash_in_branch_csv, header=None)
-        first_cash_in_branch = [
-            float(cash_branches_df.iloc[bidx,0]) for bidx in branches
-        ]
+        first_cash_in_branch = np.asarray(cash_in_branch, dtype=float).reshape(-1)[:amount_of_branches]
         if debug:
             print("first_cash_in_branch = {}".format(first_cash_in_branch))
         
         # Efectivo máximo de cada buzón
-        box_amounts_df = pd.read_csv(box_amounts_csv, header=None)
-        box_max = [
-            float(box_amounts_df.iloc[bidx,0]) for bidx in branches
-        ]
+        box_max = np.asarray(box_amounts, dtype=float).reshape(-1)[:amount_of_branches]
         if debug:
             print("box_max = {}".format(box_max))
         
         # Días hábiles por ruta
-        business_days_df = pd.read_csv(business_days_csv, header=None)
-        business_days = {
-            ridx: list(business_days_df.iloc[ridx]) for ridx in routes
-        }
+        business_days = np.atleast_2d(np.asarray(business_days, dtype=float))[:amount_of_routes, :amount_of_days]
         if debug:
             print("business_days = {}".format(business_days))
         
         # Recaudacion por sucursal por dia
-        collection_df = pd.read_csv(collection_csv, header=None, sep="\t")
-        collection = {
-            bidx: list(collection_df.iloc[bidx]) for bidx in branches
-        }
+        collection = np.atleast_2d(np.asarray(collection, dtype=float))[:amount_of_branches, :amount_of_days]
         if debug:
             print("collection = {}".format(collection))
 
     except Exception as e:
-        print(f"ERROR: No se pudieron cargar los datos desde los archivos CSV: {str(e)}")
-        return None, [], []
+        print(f"ERROR: No se pudieron cargar los datos de entrada: {str(e)}")
+        return SolveResult()
     
     msg_flag = False
     if debug:
         start = time.time()
         msg_flag = True
+
+    # Resultado en el cache (llave: todos los datos, el solver y las opciones)
+    cache = get_solve_cache(cache)
+    key = None
+    if cache is not None:
+        key = cache_key(
+            kind='model_problem_arrays', route_branches=route_branches, cost_routes=cost_routes,
+            cash_in_branch=first_cash_in_branch, box_amounts=box_max, business_days=business_days,
+            collection=collection, last_days_collection=list(last_days_collection),
+            extra_box_percent=extra_box_percent, daily_interest_rate=daily_interest_rate, solver=solver,
+            n_thr=n_thr, dp=dp, formulation=formulation, big_m=big_m, linking=linking, presolve=presolve,
+            time_limit=time_limit, gap_rel=gap_rel)
+        with instrument.timer('cache'):
+            cached = cache.get_result(key)
+        instrument.count('cache_fallos' if cached is None else 'cache_aciertos')
+        if cached is not None:
+            if debug:
+                print("Resultado tomado del cache {}".format(key[:12]))
+            return cached
     
     status = []
     variables = []
     Problems = []
+    bounds = []
+    objectives = []
+    # solución densa (NaN en los subproblemas sin solución óptima)
+    x_all = np.zeros((amount_of_days, amount_of_routes))
+    e_all = np.zeros((amount_of_branches, amount_of_days))
+    t_all = np.zeros((amount_of_branches, amount_of_days, amount_of_routes))
 
     for prob in problems:
         try:
-            problem = pulp.LpProblem("MinimizeCosts", pulp.LpMinimize)
-            
-            #### INCOGNITAS
-            if separable:
-                branches = [prob]
-                routes = [prob]
-            
-            # Variables X: retira o no por día y por ruta.
-            days_routes = {
-                ridx: {
-                    didx: pulp.LpVariable(
-                        "x_{}_{}".format(str(didx), str(ridx)),
-                        cat=pulp.LpBinary,
-                    ) for didx in days
-                } for ridx in routes
-            }
-            if debug:
-                print("days_routes = {}".format(days_routes))
-            
-            # Variables E: efectivo por sucursal y por día
-            # lowBound=0 --->  0 <= e[s,d]
-            branch_cash = {
-                bidx: {didx: pulp.LpVariable(
-                        "e_{}_{}".format(str(bidx), str(didx)),
-                        lowBound=0,
-                        cat=pulp.LpContinuous,
-                    ) for didx in days
-                } for bidx in branches
-            }
-            if debug:
-                print("branch_cash = {}".format(branch_cash))
+            branches = [prob] if separable else list(range(amount_of_branches))
+            routes = [prob] if separable else list(range(amount_of_routes))
             
-            # Variables T: efectivo retirado por sucursal por dia por ruta
-            # lowBound=0 ---> 0 <= t[s,d,p]
-            withdrawn_cash = {
-                bidx: {
-                    didx: {
-                        ridx: pulp.LpVariable(
-                            "t_{}_{}_{}".format(bidx, didx, ridx),
-                            lowBound=0,
-                            cat=pulp.LpContinuous,
-                        ) for ridx in routes
-                     } for didx in days
-                } for bidx in branches
-            }
-            if debug:
-                print("withdrawn_cash = {}".format(withdrawn_cash))
-            
-            #### FUNCION OBJETIVO
-            cost_function = None
-            for index in days_routes.keys():
-                cost_function += sum(days_routes[index].values()) * cost_routes[index]
-            
-            if daily_interest_rate > 0.0:
-                cost_function += sum([first_cash_in_branch[bidx] * daily_interest_rate for bidx in branches])
-                cost_function += sum([branch_cash[bidx][day] * daily_interest_rate for bidx in branches for day in days[:-1]])
-            
-            problem += cost_function
-            
-            #### RESTRICCIONES
+            reduction = None
+            if presolve:
+                with instrument.timer('presolve'):
+                    reduction = structural_presolve(
+                        route_branches[np.ix_(routes, branches)], cost_routes[routes], business_days[routes])
+                if debug:
+                    print(reduction.report())
 
-            # e[s,1] == e0[s,1] + r[s,1] - sum <p> in P: (t[s,1,p])
-            # e[s,d] == e[s,d-1] + r[s,d] - sum <p> in P: (t[s,d,p])
-            for bidx in branches:
-                problem += branch_cash[bidx][0] == first_cash_in_branch[bidx] + collection[bidx][0] - sum([withdrawn_cash[bidx][0][route] for route in routes])
-                for day in days[1:]:
-                    problem += (
-                        branch_cash[bidx][day]
-                        == 
-                        branch_cash[bidx][day - 1] + collection[bidx][day] - sum([withdrawn_cash[bidx][day][route] for route in routes])
-                    )
-            
-            # forall <d,p> in D*P:
-            #     sum <s> in S: (m[s,p]*t[s,d,p]) <= M * x[d,p];
-            for day in days:
-                for route in routes:
-                    problem += sum([route_branches[route][bidx] * withdrawn_cash[bidx][day][route] for bidx in branches]) <= BIG_M * days_routes[route][day]
-            
-            # forall <d,p> in D*P:
-            #     sum <s> in S: ((1-m[s,p])*t[s,d,p]) == 0;
-            for day in days:
-                for route in routes:
-                    problem += sum([(1 - route_branches[route][bidx]) * withdrawn_cash[bidx][day][route] for bidx in branches]) == 0
-            
-            # forall <s,d> in S*D:
-            #     e[s,d] <= b[s]*1.17;
-            for day in days:
-                for bidx in branches:
-                    problem += branch_cash[bidx][day] <= box_max[bidx] * (1.0 + extra_box_percent)
-            
-            # forall <s,d,p> in S*(D-{1})*P:
-            #    t[s,d,p] <= e[s,d-1];
-            for branch in branches:
-                problem += sum([withdrawn_cash[branch][0][route] for route in routes]) <= first_cash_in_branch[branch]
-                for day in days[1:]:
-                    problem += sum([withdrawn_cash[branch][day][route] for route in routes]) <= branch_cash[branch][day - 1]
-            
-            # forall <d,p> in D*P:
-            #     x[d,p] <= h[d,p];
-            for day in days:
-                for route in routes:
-                    problem += days_routes[route][day] <= business_days[route][day]
-            
-            # recollection on D_q days
-            if len(last_days_collection) > 0:
-                for bidx in branches:
-                    problem += sum([
-                        route_branches[route][bidx] * days_routes[route][day]
-                        for route in routes for day in last_days_collection
-                    ]) >= 1
-            
-            solv = None
+            # Modelo en forma matricial (ver matrix.py)
+            with instrument.timer('armar_matrices'):
+                arrays = build_model_arrays(
+                    route_branches[np.ix_(routes, branches)], cost_routes[routes],
+                    first_cash_in_branch[branches], box_max[branches],
+                    business_days[routes], collection[branches], link_big_m(big_m),
+                    last_days_collection=last_days_collection, extra_box_percent=extra_box_percent,
+                    daily_interest_rate=daily_interest_rate, branch_ids=branches, route_ids=routes,
+                    formulation=formulation, linking=linking, reduction=reduction)
+            if debug:
+                print("A: {} filas x {} columnas, {} no nulos".format(*arrays.shape, arrays.A.nnz))
+            # el modelo de PuLP solo se arma para los solvers de PuLP o con keep_problems
+            problem = pulp_variables = None
+            instrument.count('subproblemas')
             
-            if solver=='scip':
-                 solv = pulp.apis.SCIP_CMD(msg=msg_flag)
-            elif solver == 'fscip':
-                solv = pulp.apis.FSCIP_CMD(msg=msg_flag)
-            elif solver == 'cbc':
-                solv = pulp.PULP_CBC_CMD(strong=1, msg=msg_flag, presolve=1, threads=n_thr)
-            elif solver == "cuopt":
-                solv = pulp.CUOPT(msg=msg_flag)
-            elif solver == "gurobi":
-                #solv = pulp.GUROBI(msg=msg_flag, threads=n_thr)
-                solv = pulp.GUROBI(msg=msg_flag, threads=n_thr, PoolSolutions=100, PoolSearchMode=2, PoolGap=0.0)
-            elif solver == "HiGHS":
-                solv = pulp.HiGHS(msg=msg_flag, threads=n_thr)
-            else:
-                print("WARNING: Unkown solver, defaulting to cbc")
-                solv = pulp.PULP_CBC_CMD(strong=1, msg=msg_flag, presolve=1, threads=n_thr)
+            dp_result = None
+            if separable and dp:
+                with instrument.timer('dp'):
+                    dp_result = dp_solution(
+                        route_branches[np.ix_(routes, branches)], cost_routes[routes],
+                        first_cash_in_branch[branches], box_max[branches], business_days[routes],
+                        collection[branches], last_days_collection=last_days_collection,
+                        extra_box_percent=extra_box_percent, daily_interest_rate=daily_interest_rate,
+                        big_m=BIG_M if big_m == 'global' else None)
             
             try:
-                problem.solve(solver=solv)
-                # Verificar el estado de resolución
-                if problem.status == pulp.LpStatusOptimal:
-                    cur_status = 'Resuelto (Óptimo)'
-                elif problem.status == pulp.LpStatusInfeasible:
-                    cur_status = 'No factible'
-                elif problem.status == pulp.LpStatusUnbounded:
-                    cur_status = 'No acotado'
-                elif problem.status == pulp.LpStatusUndefined:
-                    cur_status = 'Error no definido (Undefined)'
-                elif problem.status == pulp.LpStatusNotSolved:
-                    cur_status = 'No resuelto'
+                bound = objective = None
+                if dp_result is not None:
+                    if debug:
+                        print("Problema {} resuelto por programación dinámica".format(prob))
+                    lp_status, sol_status, values = solution_outcome(arrays, *dp_result)
+                elif is_heuristic(solver):
+                    with instrument.timer('heuristica'):
+                        heuristic_result = heuristic_solution(
+                            route_branches[np.ix_(routes, branches)], cost_routes[routes],
+                            first_cash_in_branch[branches], box_max[branches], business_days[routes],
+                            collection[branches], last_days_collection=last_days_collection,
+                            extra_box_percent=extra_box_percent, daily_interest_rate=daily_interest_rate,
+                            big_m=BIG_M if big_m == 'global' else None,
+                            routes=None if reduction is None else reduction.routes)
+                    lp_status, sol_status, values = solution_outcome(
+                        arrays, *heuristic_result, sol_status=pulp.LpSolutionIntegerFeasible)
+                elif is_inproc(solver):
+                    # HiGHS en el proceso sobre las matrices (highs.py)
+                    with instrument.timer('resolver'):
+                        lp_status, sol_status, values, _, bound = solve_arrays(
+                            arrays, msg=msg_flag, time_limit=time_limit, gap_rel=gap_rel)
                 else:
-                    cur_status = f'Estado desconocido ({problem.status})'
-                
-                # Verificar si hay errores en las restricciones
-                for bidx in branches:
-                    if max(collection[bidx]) > box_max[bidx] * (1.0 + extra_box_percent):
-                        cur_status += ', capacidad de buzón superada'
-                        break
-                
-                if len(routes)==1:
-                    last_days_business = [d for d in last_days_collection if business_days[routes[0]][d]==1]
-                    if len(last_days_collection)>0 and len(last_days_business)==0:
-                        cur_status += ', día/s obligatorio/s infactible/s'
-                
+                    with instrument.timer('armar_pulp'):
+                        problem, pulp_variables, _ = to_pulp(arrays)
+                    # con los solvers *_CMD incluye escribir y leer los archivos temporales
+                    with instrument.timer('resolver'):
+                        problem.solve(solver=make_solver(solver, msg_flag, n_thr, time_limit=time_limit, gap_rel=gap_rel))
+                    bound = limit_outcome(problem, solver)
+                    lp_status, sol_status = problem.status, problem.sol_status
+                    values = np.array([np.nan if var.varValue is None else var.varValue for var in pulp_variables])
+                    objective = problem.objective.value() if lp_status == pulp.LpStatusOptimal else None
+                if problem is None and keep_problems:
+                    # la solución se carga en PuLP, para leerla como una resolución del MIP
+                    with instrument.timer('armar_pulp'):
+                        problem, pulp_variables, _ = to_pulp(arrays)
+                    problem.assignStatus(lp_status, sol_status)
+                    for var, value in zip(pulp_variables, values.tolist()):
+                        var.varValue = None if np.isnan(value) else value
+                if objective is None and lp_status == pulp.LpStatusOptimal:
+                    objective = float(arrays.c @ values + arrays.c0)
+                if bound is None and lp_status == pulp.LpStatusOptimal and sol_status != pulp.LpSolutionIntegerFeasible:
+                    # resuelto al óptimo (dentro del gap): la cota es el objetivo
+                    bound = objective
+                bounds.append(bound)
+                objectives.append(objective)
+                cur_status = status_string(
+                    lp_status, collection[branches], box_max[branches], extra_box_percent,
+                    business_days[routes], last_days_collection, sol_status,
+                    heuristic=dp_result is None and is_heuristic(solver))
                 status.append(cur_status)
-                Problems.append(problem)
-                variables += problem.variables()
+                if problem is not None:
+                    Problems.append(problem)
+                    variables += problem.variables()
+                if lp_status == pulp.LpStatusOptimal:
+                    with instrument.timer('extraer'):
+                        x, e, t = expand_solution(arrays, values)
+                else:
+                    x, e, t = (np.full(a.shape, np.nan) for a in (
+                        x_all[:, routes], e_all[branches], t_all[np.ix_(branches, range(amount_of_days), routes)]))
+                x_all[:, routes] = x
+                e_all[branches] = e
+                t_all[np.ix_(branches, range(amount_of_days), routes)] = t
             
             except Exception as e:
                 print(f"ERROR: Fallo al resolver el problema con solver {solver}: {str(e)}")
                 status.append('Error de resolución')
-                Problems.append(problem)
-                variables += problem.variables()
-                return status, variables, Problems
+                if problem is not None:
+                    Problems.append(problem)
+                    variables += problem.variables()
+                return SolveResult(status=status, variables=variables, problems=Problems)
         
         except Exception as e:
             print(f"ERROR: Fallo al construir el problema {prob}: {str(e)}")
-            return None, [], []
+            return SolveResult()
     
     if debug:
         print("Solver took {} seconds.".format(time.time() - start))
     
-    return status, variables, Problems
+    with instrument.timer('extraer'):
+        result = make_result(status, x_all, e_all, t_all, cost_routes, first_cash_in_branch,
+                             daily_interest_rate, Problems, variables,
+                             bound=None if None in bounds else float(sum(bounds)),
+                             objective=None if None in objectives else float(sum(objectives)))
+    if cache is not None:
+        with instrument.timer('cache'):
+            cache.put_result(key, result)
+    return result if keep_problems else result.drop_problems()
+
+
+def link_big_m(big_m):
+    """
+    Traduce la opción big_m ('tight' o 'global') al argumento de build_model_arrays.
+    """
+    if big_m == 'global':
+        return BIG_M
+    if big_m == 'tight':
+        return 'tight'
+    raise ValueError(f"big_m debe ser 'tight' o 'global': {big_m}")
+
+
+def make_solver(solver, msg_flag=False, n_thr=4, warm_start=False, time_limit=None, gap_rel=None):
+    """
+    Devuelve el solver de PuLP correspondiente al nombre dado.
+    - warm_start: True para usar como solución inicial los valores iniciales de las
+      variables (setInitialValue). Solo lo aceptan cbc, gurobi, cuopt y HiGHS (este
+      último a través de HiGHS_CMD si está disponible); el resto lo ignora.
+    - time_limit: Segundos máximos de la resolución (None = sin límite).
+    - gap_rel: Gap relativo con el que el solver se detiene (None = el del solver).
+    'highs-inproc' y 'heuristic' no pasan por un solver de PuLP: model_problem_arrays y
+    las plantillas los resuelven con highs.solve_arrays y heuristic.heuristic_solution.
+    """
+    # solo se pasan los límites dados (HiGHS_CMD escribe gapRel aunque sea None)
+    limits = {}
+    if time_limit is not None:
+        limits['timeLimit'] = time_limit
+    if gap_rel is not None:
+        limits['gapRel'] = gap_rel
+    if solver == 'scip':
+        return pulp.apis.SCIP_CMD(msg=msg_flag, **limits)
+    elif solver == 'fscip':
+        return pulp.apis.FSCIP_CMD(msg=msg_flag, **limits)
+    elif solver == 'cbc':
+        return pulp.PULP_CBC_CMD(strong=1, msg=msg_flag, presolve=1, threads=n_thr, warmStart=warm_start, **limits)
+    elif solver == "cuopt":
+        return pulp.CUOPT(msg=msg_flag, warmStart=warm_start, **limits)
+    elif solver == "gurobi":
+        #return pulp.GUROBI(msg=msg_flag, threads=n_thr)
+        return pulp.GUROBI(msg=msg_flag, threads=n_thr, PoolSolutions=100, PoolSearchMode=2, PoolGap=0.0, warmStart=warm_start, **limits)
+    elif solver == "HiGHS":
+        if warm_start:
+            highs_cmd = pulp.HiGHS_CMD(msg=msg_flag, threads=n_thr, warmStart=True, **limits)
+            if highs_cmd.available():
+                return highs_cmd
+        return pulp.HiGHS(msg=msg_flag, threads=n_thr, **limits)
+    print("WARNING: Unkown solver, defaulting to cbc")
+    return pulp.PULP_CBC_CMD(strong=1, msg=msg_flag, presolve=1, threads=n_thr, warmStart=warm_start, **limits)
+
+
+def limit_outcome(problem, solver):
+    """
+    Normaliza el estado de PuLP después de resolver con límites. Si el solver se detuvo
+    por un límite con una solución factible (incumbente), el problema queda con estado
+    LpStatusOptimal y sol_status LpSolutionIntegerFeasible (como lo deja PuLP con CBC y
+    HiGHS; con Gurobi el estado es LpStatusNotSolved con los valores cargados).
+    Devuelve la cota dual del solver (con la constante del objetivo), o None si el solver
+    no la informa (CBC a través de archivos) o no se detuvo por un límite.
+    """
+    if problem.status == pulp.LpStatusNotSolved and problem.variables() and all(
+            var.varValue is not None for var in problem.variables()):
+        problem.assignStatus(pulp.LpStatusOptimal, pulp.LpSolutionIntegerFeasible)
+    if problem.status != pulp.LpStatusOptimal or problem.sol_status != pulp.LpSolutionIntegerFeasible:
+        return None
+    try:
+        if solver == 'gurobi':
+            bound = problem.solverModel.ObjBound
+        elif solver == 'HiGHS':
+            bound = problem.solverModel.getInfo().mip_dual_bound
+        else:
+            return None
+    except Exception:
+        # HiGHS_CMD y otros solvers por archivos no tienen solverModel
+        return None
+    return float(bound) + float(problem.objective.constant)
+
+
+def status_string(lp_status, collection, box_max, extra_box_percent, business_days, last_days_collection, sol_status=None,
+                  heuristic=False):
+    """
+    Traduce el estado de PuLP y agrega las advertencias sobre los datos de entrada.
+    - collection, box_max, business_days: datos del (sub)problema resuelto.
+    - sol_status: problem.sol_status; con LpSolutionIntegerFeasible la solución es la
+      incumbente de una resolución detenida por un límite (ver limit_outcome).
+    - heuristic: La solución es de heuristic.py (con LpSolutionIntegerFeasible el estado
+      es HEURISTIC_STATUS en lugar de LIMIT_STATUS).
+    """
+    # Verificar el estado de resolución
+    if lp_status == pulp.LpStatusOptimal and sol_status == pulp.LpSolutionIntegerFeasible:
+        cur_status = HEURISTIC_STATUS if heuristic else LIMIT_STATUS
+    elif lp_status == pulp.LpStatusOptimal:
+        cur_status = 'Resuelto (Óptimo)'
+    elif lp_status == pulp.LpStatusInfeasible:
+        cur_status = 'No factible'
+    elif lp_status == pulp.LpStatusUnbounded:
+        cur_status = 'No acotado'
+    elif lp_status == pulp.LpStatusUndefined:
+        cur_status = 'Error no definido (Undefined)'
+    elif lp_status == pulp.LpStatusNotSolved:
+        cur_status = 'No resuelto'
+    else:
+        cur_status = f'Estado desconocido ({lp_status})'
+    
+    # Verificar si hay errores en las restricciones
+    collection = np.atleast_2d(collection)
+    if np.any(collection.max(axis=1) > np.asarray(box_max) * (1.0 + extra_box_percent)):
+        cur_status += ', capacidad de buzón superada'
+    
+    business_days = np.atleast_2d(business_days)
+    if business_days.shape[0] == 1:
+        last_days_business = [d for d in last_days_collection if business_days[0][d] == 1]
+        if len(last_days_collection) > 0 and len(last_days_business) == 0:
+            cur_status += ', día/s obligatorio/s infactible/s'
+    
+    return cur_status
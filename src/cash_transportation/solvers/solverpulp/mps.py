@@ -0,0 +1,322 @@
+"""
+Lectura rápida de archivos MPS a matrices.
+
+pulp.LpProblem.fromMPS arma un objeto de Python por fila, columna y coeficiente (unos
+0.3 s por archivo del corpus cash_transportation/problems). read_mps lee el archivo de
+una vez y arma directamente la matriz CSR, los costos, las cotas y la integralidad: cada
+sección se parte en campos con un solo bytes.split, los nombres se pasan a índices con
+búsquedas en dicts (map, sin bucles de Python por coeficiente) y los valores a un array
+de NumPy. El resultado tiene los mismos campos que ModelArrays (matrix.py), así que se
+puede pasar directamente a highs.solve_arrays; MpsModel.to_pulp arma el LpProblem solo
+si hace falta.
+
+Formato: MPS libre (campos separados por espacios, nombres sin espacios), como lo
+escriben PuLP y la mayoría de los solvers. Secciones NAME, OBJSENSE, ROWS, COLUMNS (con
+los marcadores INTORG/INTEND), RHS, RANGES, BOUNDS y ENDATA; el comentario *SENSE: que
+escribe PuLP también indica el sentido. El RHS de la fila objetivo es el término
+constante con el signo cambiado (c0 = -rhs). Sin cotas las columnas son >= 0, también
+las enteras; MI deja la cota superior como está y UP negativo con cota inferior 0 la
+pasa a -inf. Las filas N además de la primera se descartan. SOS, QUADOBJ y las cotas
+SC no se soportan (ValueError).
+"""
+from dataclasses import dataclass, replace
+
+import numpy as np
+import pulp
+from scipy import sparse
+
+from .matrix import to_pulp
+
+_SECTIONS = ('NAME', 'OBJSENSE', 'ROWS', 'COLUMNS', 'RHS', 'RANGES', 'BOUNDS', 'ENDATA')
+_WITH_VALUE = (b'UP', b'LO', b'FX', b'LI', b'UI')
+_WITHOUT_VALUE = (b'FR', b'MI', b'PL', b'BV')
+_MARKER = b"'MARKER'"
+# índice de fila de los marcadores INTORG/INTEND en COLUMNS (-1 es el objetivo, -2 las otras filas N)
+_MARKER_ROW = -3
+
+
+@dataclass
+class MpsModel:
+    """
+    Modelo leído de un MPS: min (o max) c @ v + c0, row_lb <= A @ v <= row_ub, lb <= v <= ub.
+    - names, row_names: Nombres de las columnas (en el orden en que aparecen en COLUMNS) y de las filas.
+    - sense: pulp.LpMinimize (1) o pulp.LpMaximize (-1). c es el del archivo: solve_arrays
+      minimiza, para maximizar hay que pasarle -c (y cambiar el signo del objetivo).
+    """
+    name: str
+    A: sparse.csr_matrix
+    c: np.ndarray
+    c0: float
+    row_lb: np.ndarray
+    row_ub: np.ndarray
+    lb: np.ndarray
+    ub: np.ndarray
+    integrality: np.ndarray
+    names: list
+    row_names: list
+    sense: int = pulp.LpMinimize
+
+    @property
+    def shape(self):
+        return self.A.shape
+
+    def column_names(self):
+        return np.array(self.names, dtype=object)
+
+    def as_minimization(self):
+        """Modelo equivalente a minimizar (c y c0 con el signo cambiado si es de máximo)."""
+        if self.sense == pulp.LpMinimize:
+            return self
+        return replace(self, c=-self.c, c0=-self.c0, sense=pulp.LpMinimize)
+
+    def to_pulp(self):
+        """LpProblem equivalente (ver matrix.to_pulp; las filas quedan como _C1, _C2, ...)."""
+        problem, _, _ = to_pulp(self, self.name or 'MPS')
+        problem.sense = self.sense
+        return problem
+
+
+def _headers(data):
+    """(inicio, fin) de las líneas que no empiezan con espacio (encabezados de sección y comentarios)."""
+    raw = np.frombuffer(data, dtype=np.uint8)
+    starts = np.flatnonzero(raw == 10) + 1
+    starts = np.concatenate(([0], starts[starts < len(raw)]))
+    first = raw[starts]
+    starts = starts[(first != 32) & (first != 9) & (first != 10) & (first != 13)].tolist()
+    for start in starts:
+        end = data.find(b'\n', start)
+        yield start, len(data) if end < 0 else end
+
+
+def _lookup(names, index):
+    """Índices (array) de names (lista de bytes) en el dict index; KeyError si falta alguno."""
+    return np.fromiter(map(index.__getitem__, names), dtype=np.int64, count=len(names))
+
+
+def _rows_values(names, values, row_index):
+    lookup = dict(row_index)
+    lookup[_MARKER] = _MARKER_ROW
+    rows = _lookup(names, lookup)
+    for i in np.flatnonzero(rows == _MARKER_ROW).tolist():
+        values[i] = b'1' if values[i] == b"'INTORG'" else b'-1'
+    return rows, np.array(list(map(float, values)))
+
+
+def _triples(body, row_index):
+    """
+    Campos de las líneas 'clave fila valor [fila valor]' de COLUMNS, RHS y RANGES: claves
+    (lista de bytes), índices de las filas en row_index y valores. Los marcadores de
+    COLUMNS quedan con fila _MARKER_ROW y valor 1 (INTORG) o -1 (INTEND). Si todas las
+    líneas tienen tres campos se arma de una vez; si no (o si los campos quedaron corridos
+    por alguna línea con dos pares), línea por línea.
+    """
+    tokens = body.split()
+    if len(tokens) % 3 == 0:
+        try:
+            return (tokens[0::3], *_rows_values(tokens[1::3], tokens[2::3], row_index))
+        except (KeyError, ValueError):
+            pass
+    keys, names, values = [], [], []
+    for line in body.splitlines():
+        parts = line.split()
+        if not parts:
+            continue
+        if len(parts) == 3 and parts[1] == _MARKER:
+            keys.append(parts[0])
+            names.append(parts[1])
+            values.append(parts[2])
+            continue
+        if len(parts) not in (3, 5):
+            raise ValueError(f"Línea de MPS inválida: {line.decode(errors='replace').strip()}")
+        for k in range(1, len(parts), 2):
+            keys.append(parts[0])
+            names.append(parts[k])
+            values.append(parts[k + 1])
+    try:
+        return (keys, *_rows_values(names, values, row_index))
+    except KeyError as e:
+        raise ValueError(f"Fila no declarada en el MPS: {e.args[0].decode(errors='replace')}") from None
+
+
+def _bounds_at_once(body, col_index, lb, ub, integrality):
+    """
+    BOUNDS de una vez si todas las líneas son 'tipo conjunto columna [valor]' con el mismo
+    conjunto y cada columna aparece una sola vez (el orden de las líneas no importa).
+    Devuelve False si no es el caso y hay que leerlas de a una.
+    """
+    tokens = body.split()
+    for width, kinds in ((3, _WITHOUT_VALUE), (4, _WITH_VALUE)):
+        if not tokens or len(tokens) % width:
+            continue
+        kind = np.char.upper(np.array(tokens[0::width], dtype=bytes))
+        if not np.isin(kind, kinds).all() or len(set(tokens[1::width])) > 1:
+            continue
+        try:
+            j = _lookup(tokens[2::width], col_index)
+        except KeyError:
+            return False
+        if len(np.unique(j)) < len(j):
+            return False
+        if width == 3:
+            lb[j[(kind == b'FR') | (kind == b'MI')]] = -np.inf
+            ub[j[(kind == b'FR') | (kind == b'PL')]] = np.inf
+            binary = j[kind == b'BV']
+            lb[binary], ub[binary] = 0.0, 1.0
+            integrality[binary] = 1
+        else:
+            try:
+                value = np.array(list(map(float, tokens[3::width])))
+            except ValueError:
+                return False
+            upper = (kind == b'UP') | (kind == b'UI') | (kind == b'FX')
+            lower = (kind == b'LO') | (kind == b'LI') | (kind == b'FX')
+            ub[j[upper]] = value[upper]
+            lb[j[lower]] = value[lower]
+            lb[j[(kind != b'FX') & upper & (value < 0)]] = -np.inf
+            integrality[j[(kind == b'LI') | (kind == b'UI')]] = 1
+        return True
+    return False
+
+
+def parse_mps(data, sense=None):
+    """MpsModel a partir del contenido (bytes) de un MPS. sense: 'min', 'max' o None (el del archivo)."""
+    # secciones: líneas que no empiezan con espacio; los comentarios (*) no cortan la sección
+    sections = {}
+    name = ''
+    file_sense = pulp.LpMinimize
+    current = None
+    position = 0
+    for start, end in _headers(data):
+        if current is not None:
+            sections.setdefault(current, []).append(data[position:start])
+        position = end
+        header = data[start:end].split()
+        keyword = header[0].decode()
+        if keyword.startswith('*'):
+            if keyword.upper() == '*SENSE:MAXIMIZE':
+                file_sense = pulp.LpMaximize
+            continue
+        if keyword not in _SECTIONS:
+            raise ValueError(f"Sección de MPS no soportada: {keyword}")
+        if keyword == 'ENDATA':
+            current = None
+            break
+        current = keyword
+        if keyword == 'NAME':
+            name = header[1].decode() if len(header) > 1 else ''
+        elif keyword == 'OBJSENSE' and len(header) > 1:
+            file_sense = pulp.LpMaximize if header[1].upper().startswith(b'MAX') else pulp.LpMinimize
+    if current is not None:
+        sections.setdefault(current, []).append(data[position:])
+    body = {key: b''.join(chunks) for key, chunks in sections.items()}
+    if body.get('OBJSENSE', b'').split():
+        file_sense = pulp.LpMaximize if body['OBJSENSE'].split()[0].upper().startswith(b'MAX') else pulp.LpMinimize
+    if sense is not None:
+        file_sense = pulp.LpMinimize if sense.lower() in ('min', 'minimize', 'minimise') else pulp.LpMaximize
+
+    # ROWS: la primera fila N es el objetivo (índice -1), las demás N se descartan (-2)
+    tokens = body.get('ROWS', b'').split()
+    if len(tokens) % 2:
+        raise ValueError("Sección ROWS inválida")
+    types = np.char.upper(np.array(tokens[0::2], dtype=bytes))
+    if not np.isin(types, (b'N', b'E', b'L', b'G')).all():
+        raise ValueError("Tipo de fila de MPS inválido")
+    objective = types == b'N'
+    ids = np.cumsum(~objective) - 1
+    ids[objective] = -2
+    if objective.any():
+        ids[np.argmax(objective)] = -1
+    row_index = dict(zip(tokens[1::2], ids.tolist()))
+    kept_types = types[~objective]
+    n_rows = len(kept_types)
+
+    # COLUMNS de una vez: una columna es entera si al aparecer por primera vez hay más
+    # marcadores INTORG que INTEND antes
+    keys, rows, vals = _triples(body.get('COLUMNS', b''), row_index)
+    marker = rows == _MARKER_ROW
+    inside = np.cumsum(np.where(marker, vals, 0.0)) > 0
+    if marker.any():
+        keep = ~marker
+        keys = np.array(keys, dtype=object)[keep].tolist()
+        rows, vals, inside = rows[keep], vals[keep], inside[keep]
+    col_index = dict(zip(dict.fromkeys(keys), range(len(keys))))
+    cols = _lookup(keys, col_index)
+    n_cols = len(col_index)
+    integer_flags = np.zeros(n_cols, dtype=np.int8)
+    # primera aparición de cada columna (las columnas se numeran en orden de aparición)
+    first = np.unique(cols, return_index=True)[1]
+    integer_flags[cols[first]] = inside[first]
+    c = np.zeros(n_cols)
+    in_objective = rows == -1
+    np.add.at(c, cols[in_objective], vals[in_objective])
+    in_matrix = rows >= 0
+    A = sparse.csr_matrix((vals[in_matrix], (rows[in_matrix], cols[in_matrix])), shape=(n_rows, n_cols))
+
+    # RHS y RANGES
+    rhs = np.zeros(n_rows)
+    c0 = 0.0
+    _, ids, values = _triples(body.get('RHS', b''), row_index)
+    rhs[ids[ids >= 0]] = values[ids >= 0]
+    if (ids == -1).any():
+        c0 = -float(values[ids == -1][-1])
+    row_lb = np.where((kept_types == b'E') | (kept_types == b'G'), rhs, -np.inf)
+    row_ub = np.where((kept_types == b'E') | (kept_types == b'L'), rhs, np.inf)
+    _, ids, values = _triples(body.get('RANGES', b''), row_index)
+    for i, r in zip(ids.tolist(), values.tolist()):
+        if i < 0:
+            continue
+        row_type = kept_types[i]
+        if row_type == b'L' or (row_type == b'E' and r < 0):
+            row_lb[i], row_ub[i] = rhs[i] - abs(r), rhs[i]
+        else:
+            row_lb[i], row_ub[i] = rhs[i], rhs[i] + abs(r)
+
+    # BOUNDS (el nombre del conjunto de cotas puede faltar)
+    lb = np.zeros(n_cols)
+    ub = np.full(n_cols, np.inf)
+    integrality = integer_flags
+    bounds = body.get('BOUNDS', b'')
+    if _bounds_at_once(bounds, col_index, lb, ub, integrality):
+        bounds = b''
+    for line in bounds.splitlines():
+        parts = line.split()
+        if not parts:
+            continue
+        kind = parts[0].decode().upper()
+        with_value = kind in ('UP', 'LO', 'FX', 'LI', 'UI')
+        if kind not in ('UP', 'LO', 'FX', 'LI', 'UI', 'FR', 'MI', 'PL', 'BV'):
+            raise ValueError(f"Cota de MPS no soportada: {kind}")
+        column = parts[2] if len(parts) >= (4 if with_value else 3) else parts[1]
+        j = col_index.get(column)
+        if j is None:
+            raise ValueError(f"Columna no declarada en BOUNDS: {column.decode(errors='replace')}")
+        value = float(parts[-1]) if with_value else None
+        if kind in ('UP', 'UI'):
+            ub[j] = value
+            if value < 0 and lb[j] == 0:
+                lb[j] = -np.inf
+        elif kind in ('LO', 'LI'):
+            lb[j] = value
+        elif kind == 'FX':
+            lb[j] = ub[j] = value
+        elif kind == 'FR':
+            lb[j], ub[j] = -np.inf, np.inf
+        elif kind == 'MI':
+            lb[j] = -np.inf
+        elif kind == 'PL':
+            ub[j] = np.inf
+        elif kind == 'BV':
+            lb[j], ub[j] = 0.0, 1.0
+        if kind in ('LI', 'UI', 'BV'):
+            integrality[j] = 1
+
+    return MpsModel(
+        name=name, A=A, c=c, c0=c0, row_lb=row_lb, row_ub=row_ub, lb=lb, ub=ub, integrality=integrality,
+        names=[key.decode() for key in col_index], row_names=[key.decode() for key, i in row_index.items() if i >= 0],
+        sense=file_sense)
+
+
+def read_mps(path, sense=None):
+    """MpsModel del archivo path (ver parse_mps)."""
+    with open(path, 'rb') as f:
+        return parse_mps(f.read(), sense)
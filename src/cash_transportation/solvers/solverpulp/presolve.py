@@ -0,0 +1,94 @@
+"""
+Presolve estructural: reducciones que dependen solo de la matriz de rutas, los costos
+de las rutas y los días hábiles, antes de armar el modelo (ver matrix.py).
+
+- Días sin rutas: si ninguna ruta se puede tomar un día, no hay retiros y el efectivo
+  de ese día queda determinado por el del día anterior más la recaudación. Cada día
+  con alguna ruta hábil abre un paso de tiempo que se extiende hasta el día anterior al
+  próximo; el efectivo de los días de arrastre se escribe como el del primer día del
+  paso más la recaudación acumulada (cotas de e y pesos en el objetivo, ver fill_values).
+- Variables x[d,p] con business_days[p][d] == 0: no se crean (ni sus retiros t ni la
+  fila de enlace), en lugar de agregarlas con cota superior 0.
+- Rutas dominadas: la ruta p se elimina si otra ruta q pasa por todas sus sucursales,
+  cuesta lo mismo o menos y es hábil todos los días en que lo es p (los retiros de p
+  se pueden hacer con q). Entre rutas iguales se mantiene la de menor índice.
+
+expand_solution (matrix.py) devuelve la solución en la grilla original de días y rutas.
+"""
+from dataclasses import dataclass, field
+
+import numpy as np
+
+
+@dataclass
+class Reduction:
+    """
+    Resultado del presolve.
+    - routes: Índices de las rutas que quedan en el modelo.
+    - steps: Primer día de cada paso de tiempo (el paso sigue hasta el día anterior al próximo).
+    - active: Matriz (pasos x rutas que quedan), True si existe x (la ruta es hábil ese día).
+    - n_days, n_routes: Cantidad de días y rutas originales.
+    - dominated_by: Para cada ruta eliminada, una ruta que queda y la domina.
+    """
+    routes: np.ndarray
+    steps: np.ndarray
+    active: np.ndarray
+    n_days: int
+    n_routes: int
+    dominated_by: dict = field(default_factory=dict)
+
+    @property
+    def step_of_day(self):
+        """Paso al que pertenece cada día original."""
+        return np.searchsorted(self.steps, np.arange(self.n_days), side='right') - 1
+
+    def report(self):
+        """Resumen de la reducción lograda."""
+        n_x = self.n_days * self.n_routes
+        lines = [
+            "Presolve: rutas {} -> {}, días {} -> {} pasos, variables x {} -> {} ({:.0%} menos)".format(
+                self.n_routes, self.routes.size, self.n_days, self.steps.size, n_x,
+                int(self.active.sum()), 1.0 - self.active.sum() / max(n_x, 1)),
+        ]
+        if self.dominated_by:
+            lines.append("  rutas dominadas: " + ", ".join(
+                "{} (por {})".format(p, q) for p, q in sorted(self.dominated_by.items())))
+        merged = [(int(a), int(b) - 1) for a, b in zip(self.steps, np.append(self.steps[1:], self.n_days)) if b - a > 1]
+        if merged:
+            lines.append("  pasos de más de un día: " + ", ".join("{}-{}".format(a, b) for a, b in merged))
+        return "\n".join(lines)
+
+
+def structural_presolve(route_branches, cost_routes, business_days):
+    """
+    Calcula la reducción estructural del modelo (ver el comienzo del módulo).
+    - route_branches: Matriz (rutas x sucursales), 1 si la sucursal está en la ruta.
+    - cost_routes: Vector (rutas) con el costo de tomar cada ruta.
+    - business_days: Matriz (rutas x días), 1 si el día es hábil para la ruta.
+    """
+    m = np.atleast_2d(np.asarray(route_branches, dtype=float))
+    n_p = m.shape[0]
+    cost = np.asarray(cost_routes, dtype=float).reshape(-1)[:n_p]
+    h = np.atleast_2d(np.asarray(business_days, dtype=float))[:n_p]
+    n_d = h.shape[1]
+
+    # dominates[q, p]: q pasa por las sucursales de p, cuesta menos o igual y es hábil cuando p lo es
+    covers = np.all((m[:, None, :] > 0) | ~(m[None, :, :] > 0), axis=2)
+    cheaper = cost[:, None] <= cost[None, :]
+    available = np.all(h[:, None, :] >= h[None, :, :], axis=2)
+    dominates = covers & cheaper & available
+    # orden estricto: entre rutas iguales domina la de menor índice
+    equal = dominates & dominates.T
+    dominates &= ~equal | (np.arange(n_p)[:, None] < np.arange(n_p)[None, :])
+    np.fill_diagonal(dominates, False)
+    keep = ~np.any(dominates, axis=0)
+    routes = np.nonzero(keep)[0]
+    # el orden es transitivo, así que toda ruta eliminada es dominada por alguna que queda
+    dominated_by = {int(p): int(routes[np.argmax(dominates[routes, p])]) for p in np.nonzero(~keep)[0]}
+
+    alive = np.any(h[routes] > 0, axis=0)
+    alive[0] = True
+    steps = np.nonzero(alive)[0]
+    active = h[routes][:, steps].T > 0
+    return Reduction(routes=routes, steps=steps, active=active, n_days=n_d, n_routes=n_p,
+                     dominated_by=dominated_by)
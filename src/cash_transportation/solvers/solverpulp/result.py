@@ -0,0 +1,97 @@
+"""
+Resultado de una resolución como arrays densos.
+
+En lugar de recorrer problem.variables() y reconstruir e[s,d] y t[s,d,p] a partir de
+los nombres, model_problem_arrays y las plantillas devuelven un SolveResult con la
+solución en la grilla original (días x rutas, sucursales x días, sucursales x días x
+rutas) y los componentes del costo. Se desempaqueta como la terna anterior
+(status, variables, Problems), por lo que el código existente sigue funcionando.
+"""
+from dataclasses import dataclass, field
+
+import numpy as np
+
+
+@dataclass
+class SolveResult:
+    """
+    - status: Lista de estados (uno por subproblema), o None si no se pudo armar el modelo.
+    - x: Matriz (días x rutas), e: Matriz (sucursales x días), t: Tensor (sucursales x
+      días x rutas). NaN en las partes de subproblemas sin solución óptima.
+    - objective: Suma de los valores objetivo reportados por el solver.
+    - logistic_cost: sum <d,p> c[p]*x[d,p].
+    - idle_cash: Efectivo inmovilizado, e0 + sum <d < n_d-1> e[s,d] (costo financiero sin interés).
+    - financial_cost: Tasa diaria por idle_cash.
+    - bound: Cota dual informada por el solver (None si no la informa); gap: Gap relativo
+      (objective - bound) / |objective|. Interesan sobre todo cuando status es
+      'Factible (límite alcanzado)': x, e, t y los costos son los de la incumbente.
+    - variables, problems: Objetos de PuLP (vacíos si no se guardaron, ver drop_problems).
+    """
+    status: list = None
+    x: np.ndarray = None
+    e: np.ndarray = None
+    t: np.ndarray = None
+    objective: float = None
+    logistic_cost: float = None
+    idle_cash: float = None
+    financial_cost: float = None
+    bound: float = None
+    gap: float = None
+    variables: list = field(default_factory=list)
+    problems: list = field(default_factory=list)
+
+    def __iter__(self):
+        return iter((self.status, self.variables, self.problems))
+
+    def __getitem__(self, index):
+        return tuple(self)[index]
+
+    def __len__(self):
+        return 3
+
+    @property
+    def limit_reached(self):
+        """True si algún subproblema se detuvo por un límite con una solución factible."""
+        return self.status is not None and any(s.startswith('Factible (límite') for s in self.status)
+
+    @property
+    def optimal(self):
+        return self.status is not None and all(s.startswith('Resuelto') for s in self.status)
+
+    def drop_problems(self):
+        """Suelta los objetos de PuLP (los arrays y costos se mantienen)."""
+        self.variables = []
+        self.problems = []
+        return self
+
+
+def make_result(status, x, e, t, cost_routes, cash_in_branch, daily_interest_rate, problems=(), variables=(), bound=None,
+                objective=None):
+    """
+    Arma el SolveResult a partir de la solución densa y los datos del costo.
+    - bound: Cota dual (suma sobre los subproblemas), o None.
+    - objective: Valor objetivo (suma sobre los subproblemas); None para tomarlo de problems.
+    """
+    cost = np.asarray(cost_routes, dtype=float).reshape(-1)[:x.shape[1]]
+    e0 = np.asarray(cash_in_branch, dtype=float).reshape(-1)[:e.shape[0]]
+    logistic_cost = float(x.sum(axis=0) @ cost)
+    idle_cash = float(e0.sum() + e[:, :-1].sum())
+    if objective is None:
+        try:
+            objective = float(sum(problem.objective.value() for problem in problems)) if problems else None
+        except TypeError:
+            objective = None
+    return SolveResult(
+        status=status, x=x, e=e, t=t, objective=objective, logistic_cost=logistic_cost,
+        idle_cash=idle_cash, financial_cost=daily_interest_rate * idle_cash,
+        bound=bound, gap=relative_gap(objective, bound),
+        variables=list(variables), problems=list(problems))
+
+
+def relative_gap(objective, bound):
+    """(objective - bound) / |objective| (0 si ambos son 0), o None si falta alguno."""
+    if objective is None or bound is None:
+        return None
+    if objective == 0:
+        return 0.0 if bound == 0 else float('inf')
+    return max(0.0, (objective - bound) / abs(objective))
@@ -0,0 +1,354 @@
+"""
+Plantilla paramétrica del modelo.
+
+En un barrido de experimentos (semillas x intereses x buzones) la estructura del MIP
+no cambia: solo cambian los datos. Las recaudaciones y e0 cambian lados derechos, el
+buzón cambia las cotas de e y el interés cambia coeficientes del objetivo. La
+plantilla arma el modelo (matrices y problema de PuLP) una sola vez por estructura y
+en cada celda actualiza solo esos valores antes de volver a resolver.
+"""
+import numpy as np
+import pulp
+
+from ... import instrument
+from .cache import cache_key, get_solve_cache
+from .dp import assign_solution, dp_solution, solution_values
+from .heuristic import heuristic_solution, is_heuristic
+from .highs import is_inproc, solve_arrays
+from .matrix import build_model_arrays, expand_solution, fill_values, to_pulp
+from .model import BIG_M, limit_outcome, link_big_m, make_solver, status_string
+from .presolve import structural_presolve
+from .result import SolveResult, make_result
+
+_TEMPLATES = {}
+
+
+class ModelTemplate:
+    """
+    Modelo reutilizable para una estructura dada (matriz de rutas, días hábiles y horizonte).
+    - route_branches: Matriz (rutas x sucursales), 1 si la sucursal está en la ruta.
+    - business_days: Matriz (rutas x días), 1 si el día es hábil para la ruta.
+    - last_days_collection: Lista de los días en los que se debe ir a buscar dinero.
+    - extra_box_percent: Porcentaje extra que se permite guardar de dinero en cada sucursal.
+    - formulation: 'standard', 'compact' o 'cumulative' (ver matrix.py).
+    - big_m, linking: enlace de retiros con rutas, como en model_problem_arrays.
+    - presolve: Armar el modelo reducido (ver presolve.py). Las rutas dominadas dependen
+      de los costos, por lo que el modelo se vuelve a armar si al cambiar cost_routes
+      cambia el conjunto de rutas que quedan.
+
+    A diferencia de model_problem_arrays, las instancias separables se resuelven como un
+    único problema (diagonal por bloques), por lo que se devuelve un solo estado.
+    """
+
+    def __init__(self, route_branches, business_days, last_days_collection=(), extra_box_percent=0.0,
+                 formulation='standard', big_m='tight', linking='aggregated', presolve=False):
+        route_branches = np.atleast_2d(np.asarray(route_branches, dtype=float))
+        business_days = np.atleast_2d(np.asarray(business_days, dtype=float))
+        n_p, n_s = route_branches.shape
+        n_d = business_days.shape[1]
+        self.route_branches = route_branches
+        self.separable = np.array_equal(route_branches, np.diag(np.diag(route_branches)))
+        self.last_days_collection = list(last_days_collection)
+        self.extra_box_percent = extra_box_percent
+        self.formulation = formulation
+        self.big_m = big_m
+        self.linking = linking
+        self.presolve = presolve
+        self.data = {
+            'cost_routes': np.zeros(n_p),
+            'cash_in_branch': np.zeros(n_s),
+            'box_amounts': np.ones(n_s),
+            'business_days': business_days,
+            'collection': np.zeros((n_s, n_d)),
+            'daily_interest_rate': 0.0,
+        }
+        self._build()
+
+    def _build(self):
+        # arma las matrices y el problema de PuLP con los datos actuales
+        self.reduction = None
+        if self.presolve:
+            self.reduction = structural_presolve(
+                self.route_branches, self.data['cost_routes'], self.data['business_days'])
+        self.arrays = build_model_arrays(
+            self.route_branches, self.data['cost_routes'], self.data['cash_in_branch'],
+            self.data['box_amounts'], self.data['business_days'], self.data['collection'],
+            link_big_m(self.big_m), last_days_collection=self.last_days_collection,
+            extra_box_percent=self.extra_box_percent,
+            daily_interest_rate=self.data['daily_interest_rate'], formulation=self.formulation,
+            linking=self.linking, reduction=self.reduction)
+        self.problem, self.variables, self.constraints = to_pulp(self.arrays)
+        # cota dual de la última resolución (None si el solver no la informó)
+        self.bound = None
+        # la última resolución fue con solver='heuristic'
+        self.heuristic = False
+
+    def update(self, collections=None, e0=None, box=None, rate=None, cost_routes=None):
+        """
+        Actualiza los datos del modelo en el lugar. Los parámetros en None no cambian.
+        - collections: Matriz (sucursales x días) de recaudaciones (lado derecho del balance).
+        - e0: Vector de efectivo inicial (lado derecho del balance y del primer retiro).
+        - box: Vector de buzones (cota superior de e).
+        - rate: Tasa diaria de interés (coeficientes de e en el objetivo).
+        - cost_routes: Vector de costos de rutas (coeficientes de x en el objetivo).
+        """
+        for key, value in (('collection', collections), ('cash_in_branch', e0), ('box_amounts', box),
+                           ('cost_routes', cost_routes)):
+            if value is not None:
+                self.data[key] = np.asarray(value, dtype=float)
+        if rate is not None:
+            if rate < 0.0:
+                raise ValueError("Tasa de interes no puede ser menor a cero")
+            self.data['daily_interest_rate'] = float(rate)
+        if self.presolve and cost_routes is not None:
+            reduction = structural_presolve(
+                self.route_branches, self.data['cost_routes'], self.data['business_days'])
+            if not np.array_equal(reduction.routes, self.reduction.routes):
+                self._build()
+                return self
+
+        arrays = self.arrays
+        old_row_lb, old_row_ub = arrays.row_lb.copy(), arrays.row_ub.copy()
+        old_lb, old_ub, old_c = arrays.lb.copy(), arrays.ub.copy(), arrays.c.copy()
+        link_rows = arrays.rows['link'][arrays.rows['link'] >= 0]
+        link_pos = arrays.link_x_pos[arrays.link_x_pos >= 0]
+        old_link = arrays.A.data[link_pos].copy()
+        fill_values(arrays, extra_box_percent=self.extra_box_percent, **self.data)
+
+        # Lados derechos
+        changed = np.nonzero((arrays.row_lb != old_row_lb) | (arrays.row_ub != old_row_ub))[0]
+        row_lb, row_ub = arrays.row_lb, arrays.row_ub
+        kind_changed = (((row_lb == row_ub) != (old_row_lb == old_row_ub))
+                        | (np.isinf(row_lb) != np.isinf(old_row_lb)) | (np.isinf(row_ub) != np.isinf(old_row_ub)))
+        if kind_changed[changed].any():
+            # una fila pasa de igualdad a rango (o al revés) o gana o pierde un lado: to_pulp
+            # la armaría con otras restricciones, así que se vuelve a armar el modelo
+            self._build()
+            return self
+        for i in changed.tolist():
+            for constraint in self.constraints[i]:
+                if constraint.sense == pulp.LpConstraintGE:
+                    constraint.changeRHS(float(row_lb[i]))
+                else:
+                    constraint.changeRHS(float(row_ub[i]))
+
+        # Coeficientes de x en el enlace (big-M calculado de los datos)
+        new_link = arrays.A.data[link_pos]
+        for k in np.nonzero(new_link != old_link)[0].tolist():
+            constraint = self.constraints[link_rows[k]][0]
+            # PuLP >= 3 guarda la expresión en .expr; en versiones anteriores la restricción es la expresión
+            expr = getattr(constraint, 'expr', constraint)
+            expr[self.variables[arrays.A.indices[link_pos[k]]]] = float(new_link[k])
+
+        # Cotas de columnas
+        for j in np.nonzero(arrays.lb != old_lb)[0].tolist():
+            self.variables[j].lowBound = float(arrays.lb[j])
+        for j in np.nonzero(arrays.ub != old_ub)[0].tolist():
+            self.variables[j].upBound = None if np.isinf(arrays.ub[j]) else float(arrays.ub[j])
+
+        # Objetivo
+        objective = self.problem.objective
+        for j in np.nonzero(arrays.c != old_c)[0].tolist():
+            if arrays.c[j] == 0.0:
+                objective.pop(self.variables[j], None)
+            else:
+                objective[self.variables[j]] = float(arrays.c[j])
+        objective.constant = arrays.c0
+        return self
+
+    def solution(self):
+        """Valores de las columnas (orden de ModelArrays) de la última resolución."""
+        return np.array([0.0 if var.varValue is None else var.varValue for var in self.variables])
+
+    def expand(self, values=None):
+        """(x, e, t) densos de values (por defecto la última resolución), ver expand_solution."""
+        return expand_solution(self.arrays, self.solution() if values is None else values)
+
+    def cache_key(self, solver, n_thr, dp=True, pool_seed=None, time_limit=None, gap_rel=None):
+        """Llave del cache (ver cache.py) para los datos actuales, el solver y las opciones."""
+        return cache_key(
+            kind='template', route_branches=self.route_branches, last_days_collection=list(self.last_days_collection),
+            extra_box_percent=self.extra_box_percent, formulation=self.formulation, big_m=self.big_m,
+            linking=self.linking, presolve=self.presolve, solver=solver, n_thr=n_thr, dp=bool(dp and self.separable),
+            pool_seed=pool_seed, time_limit=time_limit, gap_rel=gap_rel, **self.data)
+
+    def load_solution(self, values, lp_status, sol_status=None, bound=None):
+        """
+        Carga en las variables de PuLP una solución (valores de las columnas, por ejemplo del
+        cache) y su estado, como si la hubiera devuelto el solver. Devuelve el SolveResult.
+        - sol_status, bound: problem.sol_status y cota dual (ver limit_outcome).
+        """
+        if sol_status is None:
+            self.problem.assignStatus(lp_status)
+        else:
+            self.problem.assignStatus(lp_status, sol_status)
+        self.bound = bound
+        for var, value in zip(self.variables, np.asarray(values, dtype=float).tolist()):
+            var.varValue = None if np.isnan(value) else value
+        return self.result()
+
+    def solve(self, solver='cbc', n_thr=4, debug=False, warm_start=None, dp=True, pool_seed=None, cache=None,
+              time_limit=None, gap_rel=None):
+        """
+        Resuelve el modelo con los datos actuales. Devuelve un SolveResult, como
+        model_problem_arrays (se desempaqueta como (status, variables, Problems)).
+        - solver: Como en model_problem_arrays; con 'heuristic' la solución es la de
+          heuristic.heuristic_solution, con estado 'Factible (heurística)' y sin cota.
+        - warm_start: Valores de las columnas (por ejemplo solution() de una celda vecina)
+          a usar como solución inicial, 'heuristic' para usar la de la heurística con los
+          datos actuales o None para resolver sin solución inicial.
+        - dp: Resolver por programación dinámica si la estructura es separable (ver dp.py).
+        - pool_seed: Con Gurobi y varias soluciones óptimas en el pool, devolver la número
+          pool_seed % SolCount en lugar de la primera.
+        - cache: SolveCache, False o None (cache por defecto), como en model_problem_arrays.
+          Con un acierto la solución se carga en las variables (solution() la devuelve).
+        - time_limit, gap_rel: Límites de la resolución, como en model_problem_arrays. Si se
+          alcanza el límite con una solución factible, el estado es 'Factible (límite
+          alcanzado)', la solución es la incumbente y self.bound la cota dual (si el solver
+          la informa).
+        """
+        cache = get_solve_cache(cache)
+        self.heuristic = is_heuristic(solver)
+        key = None
+        if cache is not None:
+            key = self.cache_key(solver, n_thr, dp, pool_seed if solver == 'gurobi' else None, time_limit, gap_rel)
+            with instrument.timer('cache'):
+                entry = cache.get(key)
+            instrument.count('cache_fallos' if entry is None else 'cache_aciertos')
+            if entry is not None and entry[0]['values'].shape == (len(self.variables),):
+                meta = entry[1]
+                return self.load_solution(entry[0]['values'], meta['lp_status'], meta.get('sol_status'), meta.get('bound'))
+
+        values = None
+        self.bound = None
+        dp_result = None
+        if dp and self.separable:
+            with instrument.timer('dp'):
+                dp_result = dp_solution(
+                    self.route_branches, last_days_collection=self.last_days_collection,
+                    extra_box_percent=self.extra_box_percent,
+                    big_m=BIG_M if self.big_m == 'global' else None, **self.data)
+        if dp_result is not None:
+            assign_solution(self.problem, self.variables, self.arrays, *dp_result)
+        elif is_heuristic(solver):
+            assign_solution(self.problem, self.variables, self.arrays, *self._heuristic(),
+                            sol_status=pulp.LpSolutionIntegerFeasible)
+        elif is_inproc(solver):
+            # HiGHS en el proceso sobre las matrices (sin solución inicial, ver highs.py)
+            try:
+                with instrument.timer('resolver'):
+                    lp_status, sol_status, values, _, self.bound = solve_arrays(
+                        self.arrays, msg=debug, time_limit=time_limit, gap_rel=gap_rel)
+                self.problem.assignStatus(lp_status, sol_status)
+            except Exception as e:
+                print(f"ERROR: Fallo al resolver el problema con solver {solver}: {str(e)}")
+                return SolveResult(status=['Error de resolución'], variables=self.problem.variables(), problems=[self.problem])
+            # queda cargada en las variables, para solution() y las soluciones iniciales
+            for var, value in zip(self.variables, values.tolist()):
+                var.varValue = None if np.isnan(value) else value
+        else:
+            if isinstance(warm_start, str) and warm_start == 'heuristic':
+                lp_status, x, e, t = self._heuristic()
+                warm_start = solution_values(self.arrays, x, e, t) if lp_status == pulp.LpStatusOptimal else None
+            if warm_start is not None and len(warm_start) != len(self.variables):
+                # solución de antes de volver a armar el modelo (presolve): no sirve
+                warm_start = None
+            if warm_start is not None:
+                # se recorta a las cotas actuales: si no es factible el solver la descarta
+                initial = np.clip(np.asarray(warm_start, dtype=float), self.arrays.lb, self.arrays.ub)
+                for var, value in zip(self.variables, initial.tolist()):
+                    var.setInitialValue(value, check=False)
+            try:
+                # con los solvers *_CMD incluye escribir y leer los archivos temporales
+                with instrument.timer('resolver'):
+                    self.problem.solve(solver=make_solver(
+                        solver, debug, n_thr, warm_start=warm_start is not None, time_limit=time_limit, gap_rel=gap_rel))
+            except Exception as e:
+                print(f"ERROR: Fallo al resolver el problema con solver {solver}: {str(e)}")
+                return SolveResult(status=['Error de resolución'], variables=self.problem.variables(), problems=[self.problem])
+            self.bound = limit_outcome(self.problem, solver)
+            if solver == 'gurobi' and pool_seed is not None and self.problem.status == pulp.LpStatusOptimal:
+                values = self._pool_solution(pool_seed)
+
+        with instrument.timer('extraer'):
+            result = self.result(values)
+        if cache is not None:
+            if values is None:
+                values = self.solution() if self.problem.status == pulp.LpStatusOptimal else np.full(len(self.variables), np.nan)
+            with instrument.timer('cache'):
+                cache.put(key, {'values': np.asarray(values, dtype=float)},
+                          {'lp_status': self.problem.status, 'sol_status': self.problem.sol_status, 'bound': self.bound})
+        return result
+
+    def _heuristic(self):
+        # (lp_status, x, e, t) de la heurística con los datos actuales (ver heuristic.py)
+        reduction = self.arrays.reduction
+        with instrument.timer('heuristica'):
+            return heuristic_solution(
+                self.route_branches, last_days_collection=self.last_days_collection,
+                extra_box_percent=self.extra_box_percent, big_m=BIG_M if self.big_m == 'global' else None,
+                routes=None if reduction is None else reduction.routes, **self.data)
+
+    def _pool_solution(self, pool_seed):
+        # otra solución óptima del pool de Gurobi, elegida por pool_seed (None si hay una sola)
+        try:
+            import gurobipy as gp
+            gurobi_model = self.problem.solverModel
+            num_solutions = gurobi_model.SolCount
+            if num_solutions <= 1:
+                return None
+            gurobi_model.setParam(gp.GRB.Param.SolutionNumber, pool_seed % num_solutions)
+            values = np.array([var.solverVar.Xn for var in self.variables])
+        except Exception as e:
+            print(f"ERROR: No se pudo leer el pool de soluciones de Gurobi: {str(e)}")
+            return None
+        # queda cargada en las variables, para solution() y las soluciones iniciales
+        for var, value in zip(self.variables, values.tolist()):
+            var.varValue = value
+        return values
+
+    def result(self, values=None):
+        """
+        SolveResult de la última resolución. Con values (valores de las columnas, por
+        ejemplo otra solución del pool de Gurobi) se arman x, e, t y los costos a partir
+        de esos valores en lugar de los de PuLP.
+        """
+        cur_status = status_string(
+            self.problem.status, self.data['collection'], self.data['box_amounts'],
+            self.extra_box_percent, self.data['business_days'], self.last_days_collection,
+            self.problem.sol_status, heuristic=self.heuristic)
+        if values is None and self.problem.status != pulp.LpStatusOptimal:
+            values = np.full(len(self.variables), np.nan)
+        x, e, t = self.expand(values)
+        bound = self.bound
+        if bound is None and self.problem.status == pulp.LpStatusOptimal and self.problem.sol_status != pulp.LpSolutionIntegerFeasible:
+            # resuelto al óptimo (dentro del gap): la cota es el objetivo
+            bound = self.problem.objective.value()
+        return make_result(
+            [cur_status], x, e, t, self.data['cost_routes'], self.data['cash_in_branch'],
+            self.data['daily_interest_rate'], [self.problem], self.problem.variables(), bound=bound)
+
+
+def get_template(route_branches, business_days, last_days_collection=(), extra_box_percent=0.0,
+                 formulation='standard', big_m='tight', linking='aggregated', presolve=False):
+    """
+    Devuelve la plantilla cacheada para la estructura dada (la crea si no existe).
+    """
+    route_branches = np.atleast_2d(np.asarray(route_branches, dtype=float))
+    business_days = np.atleast_2d(np.asarray(business_days, dtype=float))
+    key = (
+        route_branches.shape, route_branches.tobytes(),
+        business_days.shape, business_days.tobytes(),
+        tuple(last_days_collection), float(extra_box_percent), formulation, big_m, linking, presolve,
+    )
+    if key not in _TEMPLATES:
+        instrument.count('plantillas')
+        with instrument.timer('armar_plantilla'):
+            _TEMPLATES[key] = ModelTemplate(
+                route_branches, business_days, last_days_collection, extra_box_percent, formulation, big_m, linking, presolve)
+    return _TEMPLATES[key]
+
+
+def clear_templates():
+    """Vacía el cache de plantillas."""
+    _TEMPLATES.clear()
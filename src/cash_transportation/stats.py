@@ -0,0 +1,129 @@
+"""
+Estadísticas acumuladas (Welford) de un experimento para el criterio de parada.
+
+calcula_delta_std compara, en cada celda (interés, buzón) y para el costo total y el
+financiero, el desvío estándar de todas las semillas con el de todas menos la última.
+RunningStats mantiene por celda y métrica la cantidad, la media y M2 (suma de
+cuadrados de desvíos) actuales y las de antes del último valor, por lo que agregar una
+semilla y evaluar el criterio cuesta O(celdas) sin importar cuántas semillas haya.
+Con la asignación adaptativa (helpers.celdas_abiertas) el criterio es por celda: el
+semiancho relativo del intervalo de confianza de la media.
+Se serializa con to_dict en exp_dict['_meta']['running_stats'] (ver
+helpers.actualizar_estadisticas), así que al retomar una corrida no hay que recorrerla.
+"""
+import numpy as np
+
+# métricas de cada celda: costo total y costo financiero sin interés
+METRICAS = 2
+# cuantil de la normal para intervalos de confianza del 95%
+Z_95 = 1.959963984540054
+
+
+class RunningStats:
+    """
+    Acumulador por celda (intereses x buzones) y métrica.
+    - intereses: Tasas anuales (llaves de las semillas en exp_dict).
+    - n_buzones: Cantidad de buzones.
+    Una semilla aporta a una celda solo si tiene las dos métricas (como calcula_delta_std).
+    """
+
+    def __init__(self, intereses, n_buzones):
+        self.intereses = [float(i) for i in intereses]
+        self.n_buzones = int(n_buzones)
+        self.n_seeds = 0
+        forma = (len(self.intereses), self.n_buzones)
+        self.n = np.zeros(forma, dtype=np.int64)
+        self.mean = np.zeros(forma + (METRICAS,))
+        self.m2 = np.zeros(forma + (METRICAS,))
+        # estado antes del último valor de cada celda
+        self.n_prev = np.zeros_like(self.n)
+        self.mean_prev = np.zeros_like(self.mean)
+        self.m2_prev = np.zeros_like(self.m2)
+
+    def update(self, valores):
+        """Agrega una semilla. valores: (intereses x buzones x métricas), NaN si falta."""
+        valores = np.asarray(valores, dtype=float)
+        mask = ~np.isnan(valores).any(axis=-1)
+        self.n_prev[mask] = self.n[mask]
+        self.mean_prev[mask] = self.mean[mask]
+        self.m2_prev[mask] = self.m2[mask]
+        self.n[mask] += 1
+        x = valores[mask]
+        delta = x - self.mean[mask]
+        self.mean[mask] += delta / self.n[mask][:, None]
+        self.m2[mask] += delta * (x - self.mean[mask])
+        self.n_seeds += 1
+        return self
+
+    def valores_semilla(self, seed_dict):
+        """Array (intereses x buzones x métricas) de una semilla de exp_dict (NaN si falta)."""
+        valores = np.full((len(self.intereses), self.n_buzones, METRICAS), np.nan)
+        for i, interes in enumerate(self.intereses):
+            celdas = seed_dict.get(str(interes), {})
+            for b in range(self.n_buzones):
+                celda = celdas.get(str(b))
+                if celda is None or len(celda) < METRICAS or None in celda[:METRICAS]:
+                    continue
+                valores[i, b] = celda[:METRICAS]
+        return valores
+
+    def add_seed(self, seed_dict):
+        return self.update(self.valores_semilla(seed_dict))
+
+    def std(self, prev=False):
+        """Desvío estándar poblacional (como np.std) por celda y métrica."""
+        n = self.n_prev if prev else self.n
+        m2 = self.m2_prev if prev else self.m2
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.sqrt(m2 / n[..., None])
+
+    def delta_std(self, n_min=3):
+        """
+        Máxima variación relativa del desvío al agregar el último valor, sobre las celdas
+        con al menos n_min valores y las dos métricas (0 si un desvío es 0).
+        """
+        std_last = self.std()
+        std_prev = self.std(prev=True)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            delta = np.abs((std_last - std_prev) / std_last)
+        delta[(std_last == 0) | (std_prev == 0)] = 0.0
+        delta = delta[self.n >= n_min]
+        return float(delta.max()) if delta.size else 0.0
+
+    def semiancho_relativo(self, z=Z_95):
+        """
+        Semiancho del intervalo de confianza de la media (z · s / sqrt(n), con el desvío
+        muestral s) relativo a |media|, por celda: el mayor de las dos métricas. 0 si el
+        desvío es 0; inf con menos de dos valores o media 0 con desvío no nulo.
+        """
+        n = self.n[..., None]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            s = np.sqrt(self.m2 / (n - 1))
+            semiancho = z * s / np.sqrt(n) / np.abs(self.mean)
+        semiancho[s == 0] = 0.0
+        semiancho[np.broadcast_to(n < 2, semiancho.shape) | np.isnan(semiancho)] = np.inf
+        return semiancho.max(axis=-1)
+
+    def abiertas(self, ic_rel, n_min=3, z=Z_95):
+        """
+        Celdas (intereses x buzones) cuyo intervalo de confianza todavía es más ancho que
+        ic_rel (semiancho relativo, ver semiancho_relativo). Como en delta_std solo cuentan
+        las celdas con al menos n_min valores.
+        """
+        return (self.n >= n_min) & (self.semiancho_relativo(z) > ic_rel)
+
+    def to_dict(self):
+        return {
+            'n_seeds': self.n_seeds, 'intereses': self.intereses, 'n_buzones': self.n_buzones,
+            'n': self.n.tolist(), 'mean': self.mean.tolist(), 'm2': self.m2.tolist(),
+            'n_prev': self.n_prev.tolist(), 'mean_prev': self.mean_prev.tolist(), 'm2_prev': self.m2_prev.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, datos):
+        stats = cls(datos['intereses'], datos['n_buzones'])
+        stats.n_seeds = int(datos['n_seeds'])
+        for campo in ('n', 'mean', 'm2', 'n_prev', 'mean_prev', 'm2_prev'):
+            actual = getattr(stats, campo)
+            setattr(stats, campo, np.asarray(datos[campo], dtype=actual.dtype).reshape(actual.shape))
+        return stats
@@ -0,0 +1,437 @@
+"""
+Almacén columnar de los resultados de un experimento (semilla x interés x buzón).
+
+El JSON de experimento_2 se reescribe entero después de cada vuelta y para leerlo hay
+que parsearlo completo. El almacén es un directorio con un archivo .npy por campo, de
+forma (capacidad, intereses, buzones), que se abre como memmap: agregar una semilla
+escribe solo su fila y reescribe meta.json (tamaño fijo salvo la tabla de estados), y
+la capacidad se duplica al llenarse, así que agregar es O(1) amortizado. Leer es
+mapear los archivos: las estadísticas se calculan directamente sobre los arrays.
+
+Campos por celda (ver CAMPOS):
+- costo_total, costo_financiero: NaN si la celda no tiene solución.
+- estado: Índice en meta['estados'] (0 = 'Resuelto (Óptimo)'), -1 si no hay celda. Las
+  celdas con solución sin óptimo (ESTADO_LIMITE, ESTADO_HEURISTICA) tienen los costos.
+- runtime: Segundos de la celda (NaN en resultados convertidos de JSONs sin '_tiempos').
+- ahorro_warm_start: Segundos ahorrados con solución inicial (solo con --warm-start audit).
+- cota, gap: Cota dual y gap relativo de las celdas detenidas por el límite de tiempo
+  ('_limites' del JSON; NaN en el resto o si el solver no informa la cota).
+Por semilla: runtime_semilla (el '_runtime_seconds' del JSON) y limite_semilla (el
+'_limite_segundos', límite por celda de la vuelta).
+Los registros de instrumentación de '_meta' (experimento_2 --instrument) se agregan a
+instrumentacion.jsonl, una línea por registro, y el análisis paramétrico de cada semilla
+('_parametrico', experimento_2 --interest-mode parametric) a parametrico.jsonl, una
+línea {"seed", "parametrico"} por semilla.
+
+convertir_json pasa un JSON de experimento al almacén leyendo una semilla a la vez, y
+ResultStore.to_exp_dict arma el dict con la estructura del JSON (para calcula_delta_std
+y el resto del código que trabaja con dicts). Los JSONs con las semillas anidadas por
+perfil (seed[perfil][interes][buzon]) se convierten a un almacén por perfil.
+"""
+import json
+import os
+import shutil
+
+import numpy as np
+
+ESTADO_OK = 'Resuelto (Óptimo)'
+# celdas con la incumbente de una resolución detenida por el límite (model.LIMIT_STATUS)
+ESTADO_LIMITE = 'Factible (límite alcanzado)'
+# celdas resueltas con la heurística de cronogramas (model.HEURISTIC_STATUS), sin cota
+ESTADO_HEURISTICA = 'Factible (heurística)'
+SUFIJO = '.store'
+
+# campo -> (dtype, valor de relleno)
+CAMPOS = {
+    'costo_total': (np.float64, np.nan),
+    'costo_financiero': (np.float64, np.nan),
+    'estado': (np.int16, -1),
+    'runtime': (np.float64, np.nan),
+    'ahorro_warm_start': (np.float64, np.nan),
+    'cota': (np.float64, np.nan),
+    'gap': (np.float64, np.nan),
+}
+CAMPOS_SEMILLA = {
+    'runtime_semilla': (np.float64, np.nan),
+    'limite_semilla': (np.float64, np.nan),
+}
+
+
+def es_store(path):
+    """True si path es un almacén (directorio con meta.json) o termina en SUFIJO."""
+    return path.rstrip(os.sep).endswith(SUFIJO) or os.path.isfile(os.path.join(path, 'meta.json'))
+
+
+class ResultStore:
+    """
+    Almacén columnar en el directorio path (se crea si no existe).
+    - intereses: Tasas anuales del eje de intereses (por defecto INTERESES_ANUALES).
+    - n_buzones: Cantidad de buzones (por defecto len(BUZONES_SIZES)).
+    - capacidad: Semillas reservadas al crear el almacén (se duplica al llenarse).
+    - solo_lectura: Abrir un almacén existente sin permiso de escritura (para leer resultados).
+    Al abrir un almacén existente los ejes se leen de meta.json.
+    """
+
+    def __init__(self, path, intereses=None, n_buzones=None, capacidad=64, solo_lectura=False):
+        self.path = path
+        self.solo_lectura = solo_lectura
+        meta_path = os.path.join(path, 'meta.json')
+        if os.path.isfile(meta_path):
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                self.meta = json.load(f)
+        elif solo_lectura:
+            raise FileNotFoundError(f"Almacén no encontrado: {path}")
+        else:
+            if intereses is None or n_buzones is None:
+                from .helpers import BUZONES_SIZES, INTERESES_ANUALES
+                intereses = INTERESES_ANUALES if intereses is None else intereses
+                n_buzones = len(BUZONES_SIZES) if n_buzones is None else n_buzones
+            os.makedirs(path, exist_ok=True)
+            self.meta = {
+                'n_seeds': 0,
+                'capacidad': int(capacidad),
+                'intereses': [float(i) for i in intereses],
+                'n_buzones': int(n_buzones),
+                'estados': [ESTADO_OK],
+                'total_runtime_seconds': 0.0,
+            }
+            for campo in list(CAMPOS) + list(CAMPOS_SEMILLA):
+                self._crear(campo, self.meta['capacidad'])
+            self._guardar_meta()
+        self._claves = [str(i) for i in self.meta['intereses']]
+        # análisis paramétrico por semilla (se lee de parametrico.jsonl la primera vez)
+        self._parametrico = None
+        self._abrir()
+
+    @property
+    def n_seeds(self):
+        return self.meta['n_seeds']
+
+    @property
+    def intereses(self):
+        return np.array(self.meta['intereses'])
+
+    @property
+    def estados(self):
+        return self.meta['estados']
+
+    def __len__(self):
+        return self.n_seeds
+
+    def __getitem__(self, campo):
+        """Array (semillas x intereses x buzones) del campo, solo las semillas escritas (sin copiar)."""
+        return self._arrays[campo][:self.n_seeds]
+
+    def _archivo(self, campo):
+        return os.path.join(self.path, campo + '.npy')
+
+    def _forma(self, campo, capacidad):
+        if campo in CAMPOS_SEMILLA:
+            return (capacidad,)
+        return (capacidad, len(self.meta['intereses']), self.meta['n_buzones'])
+
+    def _crear(self, campo, capacidad, archivo=None):
+        dtype, relleno = {**CAMPOS, **CAMPOS_SEMILLA}[campo]
+        array = np.lib.format.open_memmap(
+            archivo or self._archivo(campo), mode='w+', dtype=dtype, shape=self._forma(campo, capacidad))
+        array[...] = relleno
+        return array
+
+    def _abrir(self):
+        self._arrays = {}
+        for campo in list(CAMPOS) + list(CAMPOS_SEMILLA):
+            if os.path.exists(self._archivo(campo)):
+                self._arrays[campo] = np.load(self._archivo(campo), mmap_mode='r' if self.solo_lectura else 'r+')
+            elif self.solo_lectura:
+                # campo agregado después de crear el almacén: vacío
+                dtype, relleno = {**CAMPOS, **CAMPOS_SEMILLA}[campo]
+                self._arrays[campo] = np.full(self._forma(campo, self.meta['capacidad']), relleno, dtype=dtype)
+            else:
+                self._arrays[campo] = self._crear(campo, self.meta['capacidad'])
+
+    def _guardar_meta(self):
+        # se escribe aparte y se reemplaza: una interrupción deja el meta.json anterior
+        meta_path = os.path.join(self.path, 'meta.json')
+        with open(meta_path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(self.meta, f, ensure_ascii=False)
+        os.replace(meta_path + '.tmp', meta_path)
+
+    def _crecer(self):
+        # duplica la capacidad copiando cada campo a un archivo nuevo
+        capacidad = 2 * self.meta['capacidad']
+        n = self.n_seeds
+        for campo, viejo in self._arrays.items():
+            tmp = self._archivo(campo) + '.tmp'
+            nuevo = self._crear(campo, capacidad, tmp)
+            nuevo[:n] = viejo[:n]
+            nuevo.flush()
+            del nuevo
+            os.replace(tmp, self._archivo(campo))
+        self._arrays = {}
+        self.meta['capacidad'] = capacidad
+        self._guardar_meta()
+        self._abrir()
+
+    def _codigo(self, estado):
+        if estado not in self.meta['estados']:
+            self.meta['estados'].append(estado)
+        return self.meta['estados'].index(estado)
+
+    def append_seed(self, seed_dict):
+        """
+        Agrega la semilla siguiente (índice n_seeds) a partir de su dict en el formato
+        del JSON: seed_dict[interes][buzon] = [costo_total, costo_financiero] o
+        [None, None, estado], más '_runtime_seconds', '_tiempos', '_warm_start', '_limites',
+        '_limite_segundos' y '_parametrico' opcionales.
+        Devuelve el índice de la semilla.
+        """
+        desconocidas = [k for k in seed_dict if not k.startswith('_') and k not in self._claves]
+        if desconocidas:
+            raise ValueError(f"Llaves de semilla que no son tasas de interés: {desconocidas[:3]}")
+        if self.n_seeds == self.meta['capacidad']:
+            self._crecer()
+        fila = {campo: np.full(self._forma(campo, 1)[1:], relleno, dtype=dtype)
+                for campo, (dtype, relleno) in CAMPOS.items()}
+        tiempos = seed_dict.get('_tiempos', {})
+        ahorros = seed_dict.get('_warm_start', {})
+        limites = seed_dict.get('_limites', {})
+        for i, interes in enumerate(self._claves):
+            for buzon, celda in seed_dict.get(interes, {}).items():
+                b = int(buzon)
+                if len(celda) >= 2 and celda[0] is not None and celda[1] is not None:
+                    fila['costo_total'][i, b] = celda[0]
+                    fila['costo_financiero'][i, b] = celda[1]
+                    fila['estado'][i, b] = self._codigo(celda[2] if len(celda) > 2 else ESTADO_OK)
+                else:
+                    fila['estado'][i, b] = self._codigo(str(celda[-1]) if celda else 'Sin datos')
+            for buzon, valor in tiempos.get(interes, {}).items():
+                fila['runtime'][i, int(buzon)] = valor
+            for buzon, valor in ahorros.get(interes, {}).items():
+                fila['ahorro_warm_start'][i, int(buzon)] = valor
+            for buzon, limite in limites.get(interes, {}).items():
+                for campo in ('cota', 'gap'):
+                    if limite.get(campo) is not None:
+                        fila[campo][i, int(buzon)] = limite[campo]
+
+        seed = self.n_seeds
+        for campo, valores in fila.items():
+            self._arrays[campo][seed] = valores
+        runtime = seed_dict.get('_runtime_seconds')
+        if runtime is not None:
+            self._arrays['runtime_semilla'][seed] = runtime
+            self.meta['total_runtime_seconds'] += runtime
+        if seed_dict.get('_limite_segundos') is not None:
+            self._arrays['limite_semilla'][seed] = seed_dict['_limite_segundos']
+        if seed_dict.get('_parametrico'):
+            # una línea de una escritura interrumpida se pisa con la siguiente de la misma semilla
+            with open(os.path.join(self.path, 'parametrico.jsonl'), 'a', encoding='utf-8') as f:
+                f.write(json.dumps({'seed': seed, 'parametrico': seed_dict['_parametrico']}, ensure_ascii=False) + '\n')
+            if self._parametrico is not None:
+                self._parametrico[seed] = seed_dict['_parametrico']
+        for array in self._arrays.values():
+            array.flush()
+        # la semilla cuenta recién cuando meta.json lo dice
+        self.meta['n_seeds'] = seed + 1
+        self._guardar_meta()
+        return seed
+
+    def append_new_seeds(self, exp_dict):
+        """
+        Agrega las semillas de exp_dict que todavía no están en el almacén (en orden).
+        Las estadísticas acumuladas de exp_dict['_meta'] (ver stats.py) y el generador de
+        escenarios (ver helpers.escenarios_corrida) se guardan en meta.json.
+        """
+        for clave in ('running_stats', 'escenarios'):
+            if clave in exp_dict.get('_meta', {}):
+                self.meta[clave] = exp_dict['_meta'][clave]
+        while str(self.n_seeds) in exp_dict:
+            self.append_seed(exp_dict[str(self.n_seeds)])
+        registros = exp_dict.get('_meta', {}).get('instrumentacion', [])
+        escritos = self.meta.get('n_instrumentacion', 0)
+        if len(registros) > escritos:
+            with open(os.path.join(self.path, 'instrumentacion.jsonl'), 'a', encoding='utf-8') as f:
+                for registro in registros[escritos:]:
+                    f.write(json.dumps(registro, ensure_ascii=False) + '\n')
+            self.meta['n_instrumentacion'] = len(registros)
+            self._guardar_meta()
+        return self
+
+    def seed_dict(self, seed):
+        """Dict de la semilla con la estructura del JSON de experimento_2."""
+        estados = self.meta['estados']
+        costo_total = self._arrays['costo_total'][seed].tolist()
+        costo_financiero = self._arrays['costo_financiero'][seed].tolist()
+        estado = self._arrays['estado'][seed].tolist()
+        runtime = self._arrays['runtime'][seed]
+        ahorro = self._arrays['ahorro_warm_start'][seed]
+        seed_dict = {}
+        for i, interes in enumerate(self._claves):
+            celdas = {}
+            for b, codigo in enumerate(estado[i]):
+                if codigo == 0:
+                    celdas[str(b)] = [costo_total[i][b], costo_financiero[i][b]]
+                elif codigo > 0:
+                    if np.isnan(costo_total[i][b]):
+                        celdas[str(b)] = [None, None, estados[codigo]]
+                    else:
+                        celdas[str(b)] = [costo_total[i][b], costo_financiero[i][b], estados[codigo]]
+            seed_dict[interes] = celdas
+        for clave, valores in (('_warm_start', ahorro), ('_tiempos', runtime)):
+            if not np.isnan(valores).all():
+                seed_dict[clave] = {
+                    interes: {str(b): float(v) for b, v in enumerate(valores[i]) if not np.isnan(v)}
+                    for i, interes in enumerate(self._claves)}
+        limites = {}
+        for i, interes in enumerate(self._claves):
+            for b, estado_celda in enumerate(estado[i]):
+                if estado_celda > 0 and estados[estado_celda] == ESTADO_LIMITE:
+                    cota, gap = self._arrays['cota'][seed, i, b], self._arrays['gap'][seed, i, b]
+                    limites.setdefault(interes, {})[str(b)] = {
+                        'cota': None if np.isnan(cota) else float(cota), 'gap': None if np.isnan(gap) else float(gap)}
+        if limites:
+            seed_dict['_limites'] = limites
+        runtime_semilla = self._arrays['runtime_semilla'][seed]
+        if not np.isnan(runtime_semilla):
+            seed_dict['_runtime_seconds'] = float(runtime_semilla)
+        limite_semilla = self._arrays['limite_semilla'][seed]
+        if not np.isnan(limite_semilla):
+            seed_dict['_limite_segundos'] = float(limite_semilla)
+        parametrico = self.parametrico().get(seed)
+        if parametrico is not None:
+            seed_dict['_parametrico'] = parametrico
+        return seed_dict
+
+    def parametrico(self):
+        """{semilla: '_parametrico' de la semilla} de las semillas escritas con análisis paramétrico."""
+        if self._parametrico is None:
+            self._parametrico = {}
+            path = os.path.join(self.path, 'parametrico.jsonl')
+            if os.path.exists(path):
+                with open(path, 'r', encoding='utf-8') as f:
+                    for linea in f:
+                        try:
+                            registro = json.loads(linea)
+                        except json.JSONDecodeError:
+                            # línea de una escritura interrumpida
+                            continue
+                        if registro['seed'] < self.n_seeds:
+                            self._parametrico[registro['seed']] = registro['parametrico']
+        return self._parametrico
+
+    def to_exp_dict(self):
+        """Dict con la estructura del JSON de experimento_2 ('_meta' y una llave por semilla)."""
+        exp_dict = {'_meta': {'total_runtime_seconds': self.meta['total_runtime_seconds']}} if self.n_seeds else {}
+        for clave in ('running_stats', 'escenarios'):
+            if exp_dict and clave in self.meta:
+                exp_dict['_meta'][clave] = self.meta[clave]
+        if exp_dict and self.meta.get('n_instrumentacion'):
+            with open(os.path.join(self.path, 'instrumentacion.jsonl'), 'r', encoding='utf-8') as f:
+                registros = [json.loads(linea) for linea in f if linea.strip()]
+            # una línea de más de una escritura interrumpida no cuenta
+            exp_dict['_meta']['instrumentacion'] = registros[:self.meta['n_instrumentacion']]
+        for seed in range(self.n_seeds):
+            exp_dict[str(seed)] = self.seed_dict(seed)
+        return exp_dict
+
+
+def _iterar_json(f, bloque=1 << 16):
+    """
+    Recorre las llaves del objeto de primer nivel de un JSON sin cargarlo entero:
+    devuelve pares (llave, valor) decodificando cada valor apenas está completo en el
+    buffer (en memoria queda a lo sumo una semilla).
+    """
+    decoder = json.JSONDecoder()
+    buffer = f.read(bloque)
+    pos = 0
+    fin = False
+
+    def saltar(pos, caracteres=' \t\r\n'):
+        while pos < len(buffer) and buffer[pos] in caracteres:
+            pos += 1
+        return pos
+
+    pos = saltar(pos)
+    if buffer[pos:pos + 1] != '{':
+        raise ValueError("El JSON del experimento no es un objeto")
+    pos += 1
+    while True:
+        inicio = saltar(pos, ' \t\r\n,')
+        try:
+            if buffer[inicio:inicio + 1] == '}':
+                return
+            llave, pos = decoder.raw_decode(buffer, inicio)
+            pos = saltar(pos)
+            if buffer[pos:pos + 1] != ':':
+                raise json.JSONDecodeError("Se esperaba ':'", buffer, pos)
+            valor, pos = decoder.raw_decode(buffer, saltar(pos + 1))
+        except (json.JSONDecodeError, IndexError):
+            # valor incompleto en el buffer: leer más y reintentar desde la llave
+            if fin:
+                raise
+            mas = f.read(bloque)
+            fin = not mas
+            buffer = buffer[inicio:] + mas
+            pos = 0
+            continue
+        yield llave, valor
+        # descartar lo ya decodificado
+        buffer = buffer[pos:]
+        pos = 0
+
+
+def perfiles_json(json_path):
+    """
+    Perfiles de un JSON con las semillas anidadas por perfil (seed[perfil][interes][buzon],
+    como los exp_2025-11-1*_gurobi_*.json), o [] si las tasas están en el primer nivel de
+    cada semilla (experimento_2 y la cola). Lee solo hasta la primera semilla.
+    """
+    with open(json_path, 'r', encoding='utf-8') as f:
+        for llave, valor in _iterar_json(f):
+            if llave == '_meta':
+                continue
+            return [k for k in valor if not k.startswith('_') and not _es_tasa(k)]
+    return []
+
+
+def _es_tasa(llave):
+    try:
+        float(llave)
+    except ValueError:
+        return False
+    return True
+
+
+def convertir_json(json_path, store_path, capacidad=64, perfil=None):
+    """
+    Convierte un JSON de experimento al almacén store_path, una semilla a la vez.
+    Las semillas deben ser contiguas desde 0 (como las escriben experimento_2 y la cola).
+    - perfil: En un JSON con las semillas anidadas por perfil (ver perfiles_json), el
+      perfil a convertir. El '_runtime_seconds' de esas semillas es de todos los perfiles
+      juntos, así que los tiempos del almacén quedan en NaN.
+    Devuelve el ResultStore.
+    """
+    if os.path.isfile(os.path.join(store_path, 'meta.json')):
+        raise FileExistsError(f"El almacén ya existe: {store_path}")
+    store = ResultStore(store_path, capacidad=capacidad)
+    total_runtime = None
+    try:
+        with open(json_path, 'r', encoding='utf-8') as f:
+            for llave, valor in _iterar_json(f):
+                if llave == '_meta':
+                    total_runtime = valor.get('total_runtime_seconds')
+                    continue
+                if llave != str(store.n_seeds):
+                    raise ValueError(f"Semillas no contiguas: se esperaba {store.n_seeds}, hay {llave}")
+                if perfil is not None:
+                    if perfil not in valor:
+                        raise ValueError(f"La semilla {llave} no tiene el perfil {perfil}")
+                    valor = valor[perfil]
+                store.append_seed(valor)
+    except (ValueError, OSError):
+        # no dejar un almacén a medias
+        shutil.rmtree(store_path, ignore_errors=True)
+        raise
+    if total_runtime is not None and perfil is None:
+        store.meta['total_runtime_seconds'] = total_runtime
+        store._guardar_meta()
+    return store